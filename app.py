@@ -1,9 +1,9 @@
 # --- Imports des modules nécessaires ---
 import streamlit as st  # Pour construire l'interface web
+import pandas as pd  # Tableau des temps de construction
 from config import Config  # Pour accéder aux paramètres de configuration
 from logger import setup_logger  # Pour configurer le système de logs
 from models.investor_preferences import InvestorPreferences  # Modèle des préférences utilisateur
-from helpers.finance_utils import construire_portefeuille  # Fonction pour construire le portefeuille
 from helpers.plot_utils import (  # Fonctions pour afficher les graphiques et données
     afficher_repartition,
     afficher_repartition_type,
@@ -12,13 +12,167 @@ from helpers.plot_utils import (  # Fonctions pour afficher les graphiques et do
     afficher_projections,
     afficher_stress_tests,
     afficher_analyse_quantitative,
+    afficher_analyse_risque,
 )
-from helpers.excel_utils import export_vers_excel  # Fonction pour exporter vers Excel
+from helpers.projections import trajectoires_medianes  # Trajectoires médianes des projections
+from helpers.aleatoire import tirer_graine  # Graine d'un tirage libre
+from helpers.pipeline import (  # Étapes du pipeline mises en cache
+    FICHIER_EXCEL,
+    FICHIER_WORD,
+    cle_pipeline,
+    portefeuille_pipeline,
+    projections_pipeline,
+    stress_pipeline,
+    analyse_pipeline,
+    soumettre_rapport,
+    statistiques_pipeline,
+)
+from helpers.jobs import ECHEC, TERMINE, file_jobs  # File des rapports générés en arrière-plan
+from repository.data_fetcher import statistiques_cache  # Compteurs du cache de prix
+from helpers.rendu import statistiques_rendu  # Compteurs du cache des graphiques
+from instrumentation import collecter, mesurer  # Temps de chaque étape d'une construction
 
 # Configuration du logger pour suivre ce qui se passe dans l'app
 logger = setup_logger()
 
 
+# Rapports téléchargeables : (type, libellé, nom du fichier, type MIME)
+RAPPORTS = (
+    ("excel", "l'analyse Excel", FICHIER_EXCEL, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    ("word", "la fiche Word", FICHIER_WORD, "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+)
+
+
+# --- Tableau des mesures d'une exécution, dans l'ordre de démarrage, étapes imbriquées en retrait ---
+def tableau_mesures(mesures):
+    lignes = [
+        {
+            "Étape": "\u00a0\u00a0" * mesure.profondeur + mesure.nom,
+            "Durée (ms)": mesure.duree * 1000,
+            "Détails": ", ".join(f"{nom}={valeur}" for nom, valeur in mesure.compteurs.items()),
+        }
+        for mesure in sorted(mesures, key=lambda mesure: mesure.debut)
+    ]
+    return pd.DataFrame(lignes, columns=["Étape", "Durée (ms)", "Détails"])
+
+
+# --- Exports : chaque rapport est un job en arrière-plan, dont l'état est relu chaque seconde pendant la génération ---
+# Le fragment ne se réexécute seul que pendant une génération : aucune interrogation de la file sinon.
+def afficher_exports(cle):
+    rafraichir = exports_en_cours(cle)
+    st.session_state["exports_rafraichis"] = rafraichir  # Rafraîchissement choisi pour ce fragment
+    st.fragment(_afficher_exports, run_every=1 if rafraichir else None)(cle)
+
+
+# Un rapport de cette construction est-il en attente ou en cours de génération ?
+def exports_en_cours(cle):
+    jobs = st.session_state.get("jobs", {})
+    for type_rapport, *_ in RAPPORTS:
+        identifiant = jobs.get((type_rapport, cle))
+        job = file_jobs().job(identifiant) if identifiant else None
+        if job is not None and job.statut() not in (TERMINE, ECHEC):
+            return True
+    return False
+
+
+# Contenu du fragment : un bouton de génération, l'état du job ou le bouton de téléchargement par rapport
+def _afficher_exports(cle):
+    jobs = st.session_state.setdefault("jobs", {})  # (type de rapport, clé) -> identifiant du job
+    for type_rapport, libelle, nom_fichier, mime in RAPPORTS:
+        identifiant = jobs.get((type_rapport, cle))
+        job = file_jobs().job(identifiant) if identifiant else None
+
+        # Pas encore demandé (ou en échec) : bouton de lancement de la génération
+        if job is None or job.statut() == ECHEC:
+            if job is not None:
+                st.error(f"Échec de la génération de {libelle} : {job.erreur()}")
+            if not st.button(f"Générer {libelle}", key=f"generer_{type_rapport}"):
+                continue
+            jobs[(type_rapport, cle)] = soumettre_rapport(cle, type_rapport)
+            job = file_jobs().job(jobs[(type_rapport, cle)])
+
+        if job.statut() == TERMINE:
+            st.download_button(
+                f"Télécharger {libelle}", data=job.resultat(), file_name=nom_fichier, mime=mime,
+                on_click="ignore", key=f"telecharger_{type_rapport}",
+            )
+        else:
+            st.info(f"Génération de {libelle} : {job.statut()}...")
+
+    # Génération lancée ou terminée : réexécuter la page pour activer ou couper le rafraîchissement
+    if exports_en_cours(cle) != st.session_state.get("exports_rafraichis"):
+        st.rerun()
+
+
+# --- Afficher une construction : profil, composition et onglets détaillés ---
+def afficher_construction(cle):
+    objectif, horizon, tolerance, types_actifs, montant_investi, graine_utilisee, date_prix = cle
+
+    # Afficher les choix faits par l'utilisateur
+    st.subheader("Votre profil sélectionné :")
+    st.write(f"Objectif : {objectif}")
+    st.write(f"Horizon : {horizon} ans")
+    st.write(f"Tolérance au risque : {tolerance}")
+    st.write(f"Types d'actifs sélectionnés : {', '.join(types_actifs)}")
+    st.write(f"Montant à investir : {montant_investi} $")
+    st.caption(f"Graine : {graine_utilisee} - " + (f"prix du {date_prix}" if date_prix else "prix hors ligne"))
+    st.markdown("---")  # Ligne de séparation
+
+    # Construire le portefeuille avec les paramètres choisis
+    portefeuille = portefeuille_pipeline(cle)
+
+    # Message de succès
+    st.success("Portefeuille construit avec succès !")
+
+    # --- Affichage de la composition du portefeuille (seul affichage immédiat) ---
+    st.header("Composition du Portefeuille")
+    afficher_repartition(portefeuille)
+
+    # --- Sections détaillées : seul l'onglet ouvert est calculé et affiché ---
+    (
+        onglet_repartition, onglet_projections, onglet_stress,
+        onglet_analyse, onglet_risque, onglet_exports,
+    ) = st.tabs(
+        ["Répartition", "Projections", "Stress Tests", "Analyse Quantitative", "Risque Historique", "Exports"],
+        key="section", on_change="rerun",
+    )
+
+    # --- Affichage des répartitions ---
+    if onglet_repartition.open:
+        with onglet_repartition:
+            afficher_repartition_type(portefeuille)
+            afficher_repartition_secteur(portefeuille)
+            afficher_repartition_geo(portefeuille)
+
+    # --- Affichage des projections de rendement ---
+    if onglet_projections.open:
+        with onglet_projections:
+            st.header("Projections de Rendement sur 24 mois")
+            afficher_projections(portefeuille, bandes=projections_pipeline(cle).bandes)
+
+    # --- Affichage des stress tests ---
+    if onglet_stress.open:
+        with onglet_stress:
+            st.header("Stress Tests Dynamiques")
+            afficher_stress_tests(portefeuille, resultat=stress_pipeline(cle))
+
+    # --- Analyse quantitative du portefeuille ---
+    if onglet_analyse.open:
+        with onglet_analyse:
+            projections = trajectoires_medianes(projections_pipeline(cle).bandes)  # Trajectoire médiane par scénario
+            afficher_analyse_quantitative(projections, analyse=analyse_pipeline(cle))
+
+    # --- Risque calculé sur l'historique réel des prix ---
+    if onglet_risque.open:
+        with onglet_risque:
+            afficher_analyse_risque(portefeuille)
+
+    # --- Exports générés en arrière-plan, à la demande ---
+    if onglet_exports.open:
+        with onglet_exports:
+            afficher_exports(cle)
+
+
 # --- Fonction principale de l'application ---
 def main():
     # Configuration générale de la page Streamlit
@@ -61,71 +215,51 @@ def main():
             index=1
         )
 
+        # Graine aléatoire pour reproduire exactement un portefeuille et ses simulations
+        graine = st.number_input("Graine aléatoire (0 = tirage libre)", min_value=0, value=Config.GRAINE_ALEATOIRE or 0)
+
         # Bouton pour valider la création du portefeuille
         valider = st.button("Construire le portefeuille")
 
-    # --- Quand l'utilisateur clique sur "Construire le portefeuille" ---
+    # --- Quand l'utilisateur clique sur "Construire le portefeuille" : mémoriser la clé de la construction ---
     if valider:
-        try:
-            # Créer un objet InvestorPreferences avec les sélections de l'utilisateur
-            preferences = InvestorPreferences(objectif, horizon, tolerance, types_actifs)
-
-            # Afficher les choix faits par l'utilisateur
-            st.subheader("Votre profil sélectionné :")
-            st.write(f"Objectif : {objectif}")
-            st.write(f"Horizon : {horizon} ans")
-            st.write(f"Tolérance au risque : {tolerance}")
-            st.write(f"Types d'actifs sélectionnés : {', '.join(types_actifs)}")
-            st.write(f"Montant à investir : {montant_investi} $")
-            st.markdown("---")  # Ligne de séparation
-
-            # Construire le portefeuille avec les paramètres choisis
-            portefeuille = construire_portefeuille(preferences, montant_investi)
-
-            # Message de succès
-            st.success("Portefeuille construit avec succès !")
-
-            # --- Affichage de la composition du portefeuille ---
-            st.header("Composition du Portefeuille")
-            afficher_repartition(portefeuille)
-
-            # --- Affichage des répartitions ---
-            st.header("Répartition du Portefeuille")
-            afficher_repartition_type(portefeuille)
-            afficher_repartition_secteur(portefeuille)
-            afficher_repartition_geo(portefeuille)
+        preferences = InvestorPreferences(objectif, horizon, tolerance, types_actifs)
+        # Un tirage libre reçoit sa propre graine : les réexécutions de la page retombent sur le même résultat
+        st.session_state["cle_pipeline"] = cle_pipeline(preferences, montant_investi, graine or tirer_graine())
 
-            # --- Affichage des projections de rendement ---
-            st.header("Projections de Rendement sur 24 mois")
-            projections = afficher_projections(portefeuille)
-
-            # --- Affichage des stress tests ---
-            st.header("Stress Tests Dynamiques")
-            stress_results = afficher_stress_tests(portefeuille)
-
-            # --- Analyse quantitative du portefeuille ---
-            st.header("Analyse Quantitative du Portefeuille")
-            afficher_analyse_quantitative(projections)
-
-            # --- Exporter les résultats dans un fichier Excel ---
-            export_vers_excel(portefeuille, projections, stress_results)
-            st.success(f"Portefeuille exporté dans {Config.FICHIER_EXPORT}")
-
-            # --- Générer également une fiche Word pour le portefeuille ---
-            from helpers.word_generator import \
-                generer_fiche_portefeuille  # Import local pour éviter problème si pas utilisé
-
-            generer_fiche_portefeuille(portefeuille, projections, stress_results, preferences, montant_investi)
-            st.success("Fiche de portefeuille Word générée : fiche_portefeuille.docx")
-
-            # Logguer le succès
-            logger.info("Portefeuille construit et exporté avec succès.")
+    # --- Afficher la dernière construction (servie par les caches lors des réexécutions) ---
+    # Les étapes recalculées pendant l'exécution sont mesurées et ajoutées aux temps de la construction.
+    cle = st.session_state.get("cle_pipeline")
+    if cle is not None:
+        try:
+            with collecter() as mesures, mesurer("affichage"):
+                afficher_construction(cle)
 
         # --- Gestion des erreurs ---
         except Exception as e:
             st.error(f"Erreur lors de la construction du portefeuille : {e}")
             logger.error(f"Erreur : {e}")
 
+        # Au moins une étape recalculée (pas seulement l'affichage) : mémoriser ses temps pour cette construction
+        if len(mesures) > 1:
+            st.session_state.setdefault("mesures", {}).setdefault(cle, []).extend(mesures)
+
+    # --- Temps des étapes de la construction affichée (cumulés sur les exécutions qui ont recalculé) ---
+    with st.sidebar.expander("Temps de construction"):
+        mesures = st.session_state.get("mesures", {}).get(cle, [])
+        st.dataframe(tableau_mesures(mesures).style.format({"Durée (ms)": "{:.1f}"}), hide_index=True)
+
+    # --- Panneau de debug : efficacité des caches ---
+    with st.sidebar.expander("Debug : caches"):
+        st.write("Pipeline (appels / calculs effectués)")
+        st.dataframe(statistiques_pipeline().style.format({"Taux de hit (%)": "{:.1f}"}))
+        st.write("Cache des prix")
+        st.json(statistiques_cache())
+        st.write("Rapports en arrière-plan")
+        st.json(file_jobs().statistiques())
+        st.write("Graphiques (appels / rendus effectués)")
+        st.json(statistiques_rendu())
+
 
 # --- Exécuter la fonction principale si le fichier est lancé directement ---
 if __name__ == "__main__":
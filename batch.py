@@ -0,0 +1,297 @@
+# --- Mode batch : construire et analyser des milliers de profils investisseurs sans Streamlit ---
+# Exemple : python batch.py profils.csv --sortie resultats.jsonl --workers 8
+#           python batch.py profils.csv --rapports fiches.zip  (fiche Word + classeur Excel par profil)
+import argparse  # Lecture des arguments de la ligne de commande
+import csv  # Lecture des profils au format CSV
+import json  # Lecture / écriture JSONL
+import math  # Valeurs non finies (NaN) écrites en null
+import os  # Nombre de cœurs disponibles
+import sys  # Affichage de la progression sur la sortie d'erreur
+import time  # Mesure des durées par étape
+from concurrent.futures import ProcessPoolExecutor  # Traitement des profils en parallèle
+from itertools import islice  # Lecture des profils par blocs
+
+from config import Config  # Paramètres de simulation et de prix
+from logger import setup_logger  # Logs de l'application
+from instrumentation import mesurer, ajouter_compteurs  # Durée totale du batch
+from models.investor_preferences import InvestorPreferences  # Modèle des préférences utilisateur
+from helpers.finance_utils import construire_portefeuille  # Construction du portefeuille
+from helpers.projections import simuler_projections_detaillees, trajectoires_medianes  # Projections Monte Carlo
+from helpers.analytics import analyse_quantitative  # Indicateurs de performance
+from helpers.aleatoire import generateurs_pipeline  # Tirages reproductibles
+from stress_tests.simulator import stress_test_portefeuille  # Stress tests
+from repository.data_fetcher import FournisseurMemoire, definir_fournisseur, recuperer_prix  # Prix partagés
+from repository.univers import univers_actuel  # Univers des actifs
+from helpers.rapports import EcrivainRapports, generer_rapports_client  # Rapports par profil
+
+logger = setup_logger()
+
+# Étapes chronométrées pour chaque profil
+ETAPES = ("construction", "projections", "stress", "analyse")
+
+# Types de rapports générés pour chaque profil (vide = aucun rapport)
+_types_rapports = ()
+
+
+# --- Lecture des profils : CSV (types_actifs séparés par « ; ») ou JSONL ---
+# Une ligne illisible donne un profil en erreur (écrit tel quel dans les résultats) sans arrêter la lecture.
+def lire_profils(chemin):
+    with open(chemin, encoding="utf-8") as f:
+        if chemin.endswith(".jsonl"):
+            lignes = (json.loads(ligne) for ligne in f if ligne.strip())
+        else:
+            lignes = csv.DictReader(f)
+        for numero, ligne in enumerate(lignes):
+            identifiant = ligne.get("id") or str(numero)
+            try:
+                types_actifs = ligne.get("types_actifs") or []
+                if isinstance(types_actifs, str):
+                    types_actifs = [t.strip() for t in types_actifs.split(";") if t.strip()]
+                yield {
+                    "numero": numero,  # Position dans le fichier : dérive les flux aléatoires du profil
+                    "id": identifiant,
+                    "objectif": ligne["objectif"],
+                    "horizon": int(ligne["horizon"]),
+                    "tolerance": ligne["tolerance"],
+                    "types_actifs": types_actifs,
+                    "montant_investi": float(ligne["montant_investi"]),
+                }
+            except (KeyError, TypeError, ValueError) as e:
+                yield {"numero": numero, "id": identifiant, "erreur": f"Profil illisible : {type(e).__name__}: {e}"}
+
+
+# --- Initialisation de chaque processus : instantané de prix partagé, pas de cache disque ---
+def _initialiser_worker(prix, nb_chemins, nb_tirages, graine, types_rapports=()):
+    global _types_rapports
+    Config.CACHE_PRIX_ACTIF = False
+    Config.MESURES_JOURNAL = False  # Durées par étape agrégées par executer_batch plutôt qu'une ligne par profil
+    Config.PROFILAGE = None  # Seule la mesure racine "batch" est profilée
+    Config.NB_CHEMINS_PROJECTION = nb_chemins
+    Config.NB_TIRAGES_STRESS = nb_tirages
+    definir_fournisseur(FournisseurMemoire(prix))
+    Config.GRAINE_ALEATOIRE = graine
+
+    _types_rapports = tuple(types_rapports)
+    if _types_rapports:
+        from helpers.word_generator import ouvrir_modele
+        ouvrir_modele()  # Modèle Word chargé une fois par processus
+
+
+# --- Traiter un profil : construction, projections, stress tests, analyse (et rapports) ---
+# Un profil en échec donne une ligne d'erreur (identifiant et message) : les autres profils continuent.
+def traiter_profil(profil):
+    if "erreur" in profil:
+        return _ligne_erreur(profil, profil["erreur"]), {}, None
+    try:
+        return _traiter_profil(profil)
+    except Exception as e:
+        logger.warning(f"Profil {profil['id']} en échec : {type(e).__name__}: {e}")
+        return _ligne_erreur(profil, f"{type(e).__name__}: {e}"), {}, None
+
+
+# Ligne de résultat d'un profil en échec
+def _ligne_erreur(profil, message):
+    return {
+        **profil,
+        "graine": Config.GRAINE_ALEATOIRE,
+        "types_actifs": ";".join(profil.get("types_actifs", [])),
+        "erreur": message,
+    }
+
+
+def _traiter_profil(profil):
+    durees = {}
+    generateurs = generateurs_pipeline(Config.GRAINE_ALEATOIRE, profil["numero"])  # Reproductible par (profil, graine)
+
+    debut = time.perf_counter()
+    preferences = InvestorPreferences(
+        profil["objectif"], profil["horizon"], profil["tolerance"], profil["types_actifs"]
+    )
+    portefeuille = construire_portefeuille(preferences, profil["montant_investi"], rng=generateurs["construction"])
+    durees["construction"] = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    # Trajectoires propres au profil : ne dépendent que de sa graine et de son numéro, pas du worker
+    resultat_projections = simuler_projections_detaillees(portefeuille.valeur_totale(), rng=generateurs["projections"])
+    bandes, indicateurs = resultat_projections.bandes, resultat_projections.indicateurs
+    projections = trajectoires_medianes(bandes)
+    durees["projections"] = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    stress_results = stress_test_portefeuille(portefeuille, rng=generateurs["stress"])
+    durees["stress"] = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    analyse = analyse_quantitative(projections, indicateurs)
+    durees["analyse"] = time.perf_counter() - debut
+
+    # Rapports du profil, générés dans le processus de travail et renvoyés en bytes
+    rapports = None
+    if _types_rapports:
+        debut = time.perf_counter()
+        rapports = generer_rapports_client(
+            portefeuille, projections, stress_results, preferences, profil["montant_investi"], bandes, indicateurs,
+            types=_types_rapports,
+        )
+        durees["rapports"] = time.perf_counter() - debut
+
+    # Résultat à plat (une ligne par profil), lisible en JSONL comme en Parquet
+    df = portefeuille.composition()
+    resultat = {
+        **profil,
+        "graine": Config.GRAINE_ALEATOIRE,
+        "types_actifs": ";".join(profil["types_actifs"]),
+        "valeur_totale": portefeuille.valeur_totale(),
+        "nb_positions": len(portefeuille),
+        "positions": json.dumps(dict(zip(df["Nom"], df["Quantité"].tolist()))),
+        "erreur": None,
+    }
+    finales = bandes.iloc[-1]
+    for (scenario, percentile), valeur in finales.items():
+        resultat[f"projection_{scenario}_{percentile}"] = valeur
+    for scenario, ligne in analyse.iterrows():
+        resultat[f"rendement_{scenario}_pct"] = ligne["Rendement Total (%)"]
+        resultat[f"volatilite_{scenario}_pct"] = ligne["Volatilité Mensuelle (%)"]
+        resultat[f"drawdown_{scenario}_pct"] = ligne["Maximum Drawdown (%)"]
+    for scenario in stress_results.columns:
+        initiale = resultat["valeur_totale"]
+        finale = stress_results[scenario].iloc[-1]
+        resultat[f"stress_{scenario}_perte_pct"] = (initiale - finale) / initiale * 100 if initiale else 0.0
+    return resultat, durees, rapports
+
+
+# --- Écriture en flux des résultats (JSONL, ou Parquet par lots si pyarrow est installé) ---
+class EcrivainResultats:
+    def __init__(self, chemin, taille_lot=1000):
+        self.chemin = chemin
+        self.taille_lot = taille_lot  # Nombre de lignes par lot Parquet
+        self._lot = []
+        self._parquet = None
+        if chemin.endswith(".parquet"):
+            import pyarrow  # Dépendance optionnelle, seulement pour la sortie Parquet
+            self._fichier = None
+        else:
+            self._fichier = open(chemin, "w", encoding="utf-8")
+
+    # Écrire un résultat
+    def ecrire(self, resultat):
+        if self._fichier is not None:
+            # NaN (ex. indicateur sans trajectoire) écrit en null : le JSON reste valide
+            resultat = {cle: None if isinstance(valeur, float) and not math.isfinite(valeur) else valeur
+                        for cle, valeur in resultat.items()}
+            self._fichier.write(json.dumps(resultat, ensure_ascii=False, allow_nan=False) + "\n")
+            return
+        self._lot.append(resultat)
+        if len(self._lot) >= self.taille_lot:
+            self._vider_lot()
+
+    # Écrire le lot Parquet en attente
+    def _vider_lot(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._lot:
+            return
+        # Schéma du premier lot pour les suivants : les colonnes absentes des lignes d'erreur sont nulles
+        table = pa.Table.from_pylist(self._lot, schema=self._parquet.schema if self._parquet is not None else None)
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.chemin, table.schema)
+        self._parquet.write_table(table)
+        self._lot = []
+
+    # Fermer le fichier de sortie
+    def fermer(self):
+        if self._fichier is not None:
+            self._fichier.close()
+        else:
+            self._vider_lot()
+            if self._parquet is not None:
+                self._parquet.close()
+
+
+# --- Exécuter le batch complet ---
+# `rapports` : dossier ou archive .zip où écrire les rapports de chaque profil (None = pas de rapports)
+@mesurer("batch")
+def executer_batch(entree, sortie, workers=None, nb_chemins=None, nb_tirages=None, chunksize=64, graine=None,
+                   rapports=None, types_rapports=("word", "excel")):
+    workers = workers or os.cpu_count()
+    nb_chemins = nb_chemins or Config.NB_CHEMINS_BATCH
+    nb_tirages = nb_tirages or Config.NB_TIRAGES_BATCH
+    graine = Config.GRAINE_ALEATOIRE if graine is None else graine
+
+    # Un seul instantané de prix pour tout l'univers, partagé par tous les processus
+    debut = time.perf_counter()
+    instantane = recuperer_prix(list(univers_actuel().tickers))
+    for ticker, raison in instantane.echecs.items():
+        logger.warning(f"Prix indisponible pour {ticker} ({raison})")
+    logger.info(f"Instantané de {len(instantane.prix)} prix en {time.perf_counter() - debut:.2f} s")
+
+    types_rapports = tuple(types_rapports) if rapports else ()
+    durees_totales = dict.fromkeys(ETAPES + (("rapports",) if types_rapports else ()), 0.0)
+    nb_profils = 0
+    nb_erreurs = 0
+    debut = time.perf_counter()
+    ecrivain = EcrivainResultats(sortie)
+    ecrivain_rapports = EcrivainRapports(rapports) if rapports else None
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_initialiser_worker,
+            initargs=(instantane.prix, nb_chemins, nb_tirages, graine, types_rapports),
+        ) as executeur:
+            # Blocs de taille bornée : la mémoire ne dépend pas du nombre total de profils
+            # (blocs plus petits avec les rapports, qui pèsent quelques dizaines de Ko par profil)
+            profils = lire_profils(entree)
+            taille_bloc = chunksize * workers * (1 if types_rapports else 4)
+            while bloc := list(islice(profils, taille_bloc)):
+                for resultat, durees, fichiers in executeur.map(traiter_profil, bloc, chunksize=chunksize):
+                    ecrivain.ecrire(resultat)
+                    nb_erreurs += resultat["erreur"] is not None
+                    if ecrivain_rapports is not None and fichiers is not None:
+                        ecrivain_rapports.ecrire(resultat["id"], fichiers)
+                    for etape, duree in durees.items():
+                        durees_totales[etape] += duree
+                    nb_profils += 1
+                    if nb_profils % 1000 == 0:
+                        ecoule = time.perf_counter() - debut
+                        print(f"\r{nb_profils} profils traités ({nb_profils / ecoule * 60:,.0f} / min)", end="", file=sys.stderr)
+    finally:
+        ecrivain.fermer()
+        if ecrivain_rapports is not None:
+            ecrivain_rapports.fermer()
+
+    # Résumé : débit et temps moyen par étape (temps processeur cumulé des workers)
+    ecoule = time.perf_counter() - debut
+    print(file=sys.stderr)
+    logger.info(f"{nb_profils} profils en {ecoule:.1f} s ({nb_profils / ecoule * 60 if ecoule else 0:,.0f} / min)")
+    if nb_erreurs:
+        logger.warning(f"{nb_erreurs} profil(s) en échec : voir la colonne « erreur » de {sortie}")
+    for etape, duree in durees_totales.items():
+        logger.info(f"  {etape} : {duree / max(nb_profils - nb_erreurs, 1) * 1000:.2f} ms / profil")
+    ajouter_compteurs(profils=nb_profils, erreurs=nb_erreurs, workers=workers)
+    return nb_profils, durees_totales
+
+
+# --- Point d'entrée en ligne de commande ---
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Construction et analyse de portefeuilles en masse")
+    parser.add_argument("entree", help="Fichier des profils (.csv ou .jsonl)")
+    parser.add_argument("--sortie", default="resultats_batch.jsonl", help="Fichier de sortie (.jsonl ou .parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument("--chemins", type=int, default=None, help="Trajectoires Monte Carlo par scénario")
+    parser.add_argument("--tirages", type=int, default=None, help="Tirages de stress par scénario")
+    parser.add_argument("--chunksize", type=int, default=64, help="Profils envoyés à la fois à chaque processus")
+    parser.add_argument("--graine", type=int, default=None, help="Graine aléatoire pour des résultats reproductibles")
+    parser.add_argument("--rapports", default=None, help="Dossier ou archive .zip des rapports de chaque profil")
+    parser.add_argument(
+        "--types-rapports", default="word,excel", help="Rapports générés par profil (word, excel ou word,excel)"
+    )
+    args = parser.parse_args(arguments)
+    executer_batch(
+        args.entree, args.sortie, args.workers, args.chemins, args.tirages, args.chunksize, args.graine,
+        args.rapports, [t.strip() for t in args.types_rapports.split(",") if t.strip()],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+# --- Benchmarks du pipeline : temps de chaque étape selon la taille du portefeuille, comparés à une référence ---
+# Depuis la racine du projet :
+#   python -m benchmarks.benchmark                          # mesurer et écrire benchmarks/resultats.json
+#   python -m benchmarks.benchmark --enregistrer-reference  # mesurer et remplacer benchmarks/reference.json
+#   python -m benchmarks.benchmark --comparer               # mesurer puis échouer (code 1) si une étape ralentit de +20 %
+#   python -m benchmarks.benchmark --comparer --seuil 10     # seuil plus strict (machine dédiée et calme)
+#   python -m benchmarks.benchmark --resultats r.json --comparer  # comparer des résultats déjà mesurés
+# Les temps dépendent de la machine : la référence n'est pas versionnée (comme resultats.json), elle est
+# enregistrée sur la machine qui compare, à partir de la version de base. Par exemple, avant une modification :
+#   git stash && python -m benchmarks.benchmark --enregistrer-reference && git stash pop
+#   python -m benchmarks.benchmark --comparer
+import argparse  # Lecture des arguments de la ligne de commande
+import gc  # Ramasse-miettes suspendu pendant le chronométrage (comme timeit)
+import io  # Exports écrits en mémoire
+import json  # Résultats et référence au format JSON
+import os  # Chemins par défaut et nombre de cœurs
+import platform  # Description de la machine dans les résultats
+import statistics  # Médiane des temps
+import sys  # Code de sortie
+import time  # Chronométrage
+from datetime import datetime  # Date des mesures
+
+import numpy as np  # Générateurs aléatoires à graine fixe
+
+from benchmarks.fixtures import (  # Données hors ligne
+    GRAINE,
+    PROFIL,
+    configurer_hors_ligne,
+    portefeuille_synthetique,
+    utiliser_univers_reference,
+    utiliser_univers_synthetique,
+)
+from helpers.allocation import allocateur_configure  # Allocateur optimisé
+from helpers import analytics  # Mémo des analyses, vidé avant chaque mesure
+from helpers.analytics import analyse_quantitative  # Indicateurs de performance
+from helpers.excel_utils import export_vers_excel  # Export Excel
+from helpers.finance_utils import construire_portefeuille  # Construction du portefeuille
+from helpers.projections import simuler_projections, simuler_projections_detaillees, trajectoires_medianes  # Cœur de afficher_projections
+from helpers.word_generator import generer_fiche_portefeuille  # Fiche Word
+from stress_tests.simulator import stress_test_portefeuille  # Stress tests
+
+DOSSIER = os.path.dirname(__file__)
+FICHIER_RESULTATS = os.path.join(DOSSIER, "resultats.json")
+FICHIER_REFERENCE = os.path.join(DOSSIER, "reference.json")
+
+SEUIL_REGRESSION = 20  # Ralentissement maximal toléré (%) sur le temps médian
+ECART_MINIMAL = 0.005  # Écart absolu (secondes) sous lequel un ralentissement est du bruit de la machine
+REPETITIONS = 15  # Répétitions minimales par mesure (moins si une exécution dépasse le budget)
+REPETITIONS_MAX = 200  # Plafond des répétitions des étapes très rapides
+DUREE_MINIMALE = 2.0  # Les étapes rapides sont répétées pendant au moins cette durée (secondes)
+BUDGET_MESURE = 10.0  # Temps maximal (secondes) consacré aux répétitions d'une mesure
+CONFIRMATIONS = 3  # Nouvelles mesures au plus des étapes en régression avant de conclure
+
+# Nombre de trajectoires et de tirages des données préparées pour les exports et l'analyse
+NB_CHEMINS_DONNEES = 1000
+NB_TIRAGES_DONNEES = 200
+
+
+# --- Préparation de chaque cas : retourne la fonction à chronométrer pour une taille donnée ---
+
+def _construction(taille):
+    # Univers fourni (18 tickers) ou synthétique ; sélection aléatoire et parts égales
+    if taille <= 18:
+        utiliser_univers_reference()
+    else:
+        utiliser_univers_synthetique(taille)
+    return lambda: construire_portefeuille(PROFIL, 100_000, rng=np.random.default_rng(GRAINE))
+
+
+def _construction_optimisee(taille):
+    # Moyenne-variance sur tout l'univers synthétique : une position par ticker au plus
+    utiliser_univers_synthetique(taille)
+    allocateur = allocateur_configure("moyenne_variance")
+    return lambda: construire_portefeuille(PROFIL, 1_000 * taille, rng=np.random.default_rng(GRAINE), allocateur=allocateur)
+
+
+def _composition(taille):
+    portefeuille = portefeuille_synthetique(taille)
+
+    def composer():
+        portefeuille.version += 1  # Invalide la composition en cache
+        return portefeuille.composition()
+    return composer
+
+
+def _projections(taille):
+    return lambda: simuler_projections(100_000, nb_chemins=taille, rng=np.random.default_rng(GRAINE))
+
+
+def _stress(taille):
+    portefeuille = portefeuille_synthetique(taille)
+    return lambda: stress_test_portefeuille(portefeuille, rng=np.random.default_rng(GRAINE))
+
+
+def _analyse(taille):
+    resultat = simuler_projections_detaillees(
+        100_000, nb_chemins=NB_CHEMINS_DONNEES, nb_mois=taille, rng=np.random.default_rng(GRAINE)
+    )
+    projections = trajectoires_medianes(resultat.bandes)
+
+    def analyser():
+        analytics._analyses.clear()  # Mesurer le calcul, pas la lecture du résultat mémorisé
+        return analyse_quantitative(projections, resultat.indicateurs)
+    return analyser
+
+
+# Portefeuille, projection détaillée, trajectoires médianes et stress tests d'un export
+def _donnees_export(taille):
+    portefeuille = portefeuille_synthetique(taille)
+    rng = np.random.default_rng(GRAINE)
+    resultat = simuler_projections_detaillees(portefeuille.valeur_totale(), nb_chemins=NB_CHEMINS_DONNEES, rng=rng)
+    stress = stress_test_portefeuille(portefeuille, nb_tirages=NB_TIRAGES_DONNEES, rng=rng)
+    return portefeuille, resultat, trajectoires_medianes(resultat.bandes), stress
+
+
+def _export_excel(taille):
+    portefeuille, resultat, projections, stress = _donnees_export(taille)
+    return lambda: export_vers_excel(
+        portefeuille, projections, stress, resultat.bandes, io.BytesIO(), indicateurs=resultat.indicateurs
+    )
+
+
+def _export_word(taille):
+    portefeuille, resultat, projections, stress = _donnees_export(taille)
+    montant = portefeuille.valeur_totale()
+    return lambda: generer_fiche_portefeuille(
+        portefeuille, projections, stress, PROFIL, montant, resultat.bandes, io.BytesIO(), resultat.indicateurs
+    )
+
+
+# Cas mesurés : nom -> (paramètre, tailles par défaut, tailles avec --complet, préparation)
+CAS = {
+    "construire_portefeuille": ("univers", (18, 1_000, 100_000), (18, 1_000, 100_000), _construction),
+    "construire_portefeuille_optimise": ("univers", (100, 1_000), (100, 1_000, 5_000), _construction_optimisee),
+    "composition": ("positions", (10, 1_000, 100_000), (10, 1_000, 100_000), _composition),
+    "simuler_projections": ("chemins", (1_000, 10_000), (1_000, 10_000, 100_000), _projections),
+    "stress_test_portefeuille": ("positions", (10, 1_000, 100_000), (10, 1_000, 100_000), _stress),
+    "analyse_quantitative": ("mois", (24, 1_200), (24, 240, 1_200), _analyse),
+    "export_vers_excel": ("positions", (10, 1_000), (10, 1_000, 10_000, 100_000), _export_excel),
+    "generer_fiche_portefeuille": ("positions", (10, 1_000), (10, 1_000, 100_000), _export_word),
+}
+
+
+# --- Chronométrer une fonction : une exécution d'échauffement puis des répétitions ---
+def chronometrer(fonction, repetitions):
+    debut = time.perf_counter()
+    fonction()  # Échauffement : imports, caches de modèle / d'univers, allocation mémoire
+    echauffement = time.perf_counter() - debut
+    echauffement = max(echauffement, 1e-6)
+    repetitions = max(repetitions, int(DUREE_MINIMALE / echauffement))  # Plus de répétitions si l'étape est rapide
+    repetitions = max(1, min(repetitions, REPETITIONS_MAX, int(BUDGET_MESURE / echauffement)))
+
+    durees = []
+    gc_actif = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            fonction()
+            durees.append(time.perf_counter() - debut)
+    finally:
+        if gc_actif:
+            gc.enable()
+    return durees
+
+
+# --- Mesurer les cas demandés (seulement les clés `cles` si fournies) ; retourne le document de résultats ---
+def executer(noms_cas=None, complet=False, repetitions=REPETITIONS, cles=None):
+    configurer_hors_ligne()
+    mesures = {}
+    for nom in noms_cas or CAS:
+        parametre, tailles, tailles_completes, preparer = CAS[nom]
+        for taille in tailles_completes if complet else tailles:
+            cle = f"{nom}[{parametre}={taille}]"
+            if cles is not None and cle not in cles:
+                continue
+            durees = chronometrer(preparer(taille), repetitions)
+            mesures[cle] = {
+                "min_s": min(durees),
+                "mediane_s": statistics.median(durees),
+                "repetitions": len(durees),
+            }
+            print(f"{cle:<55} {min(durees) * 1000:>11.3f} ms  (médiane {statistics.median(durees) * 1000:.3f} ms, n={len(durees)})")
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "machine": {
+            "python": platform.python_version(),
+            "systeme": platform.platform(),
+            "processeur": platform.processor() or platform.machine(),
+            "coeurs": os.cpu_count(),
+        },
+        "mesures": mesures,
+    }
+
+
+# --- Comparer des résultats à la référence ; retourne les clés en régression ---
+# Compare les temps médians (un seul passage rapide ou lent ne les déplace pas) ; une régression doit
+# dépasser le seuil en % et ECART_MINIMAL en valeur absolue.
+def comparer(resultats, reference, seuil=SEUIL_REGRESSION):
+    regressions = []
+    print(f"\n{'Mesure':<55} {'Référence':>12} {'Actuel':>12} {'Écart':>9}")
+    for cle, mesure in resultats["mesures"].items():
+        ancienne = reference["mesures"].get(cle)
+        if ancienne is None:
+            print(f"{cle:<55} {'-':>12} {mesure['mediane_s'] * 1000:>9.3f} ms {'nouveau':>9}")
+            continue
+        ecart = (mesure["mediane_s"] / ancienne["mediane_s"] - 1) * 100
+        regression = ecart > seuil and mesure["mediane_s"] - ancienne["mediane_s"] > ECART_MINIMAL
+        drapeau = "  <-- régression" if regression else ""
+        print(
+            f"{cle:<55} {ancienne['mediane_s'] * 1000:>9.3f} ms {mesure['mediane_s'] * 1000:>9.3f} ms "
+            f"{ecart:>+8.1f}%{drapeau}"
+        )
+        if regression:
+            regressions.append(cle)
+    return regressions
+
+
+# Lire / écrire un document de résultats JSON
+def lire(chemin):
+    with open(chemin, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ecrire(document, chemin):
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    print(f"Résultats écrits dans {chemin}")
+
+
+# --- Point d'entrée en ligne de commande ---
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmarks du pipeline de construction et d'analyse")
+    parser.add_argument("--cas", default=None, help=f"Cas à mesurer, séparés par des virgules ({', '.join(CAS)})")
+    parser.add_argument("--complet", action="store_true", help="Tailles étendues (jusqu'à 100 000 positions)")
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS, help="Répétitions par mesure")
+    parser.add_argument("--sortie", default=FICHIER_RESULTATS, help="Fichier JSON des résultats")
+    parser.add_argument("--resultats", default=None, help="Résultats déjà mesurés à comparer (pas de nouvelle mesure)")
+    parser.add_argument("--reference", default=FICHIER_REFERENCE, help="Fichier JSON de référence")
+    parser.add_argument("--enregistrer-reference", action="store_true", help="Écrire les mesures comme nouvelle référence")
+    parser.add_argument("--comparer", action="store_true", help="Comparer à la référence (code 1 en cas de régression)")
+    parser.add_argument("--seuil", type=float, default=SEUIL_REGRESSION, help="Ralentissement toléré en %%")
+    args = parser.parse_args(arguments)
+
+    if args.comparer and not os.path.exists(args.reference):
+        parser.error(f"référence absente : {args.reference} (l'enregistrer avec --enregistrer-reference)")
+
+    if args.resultats:
+        resultats = lire(args.resultats)
+    else:
+        noms_cas = [nom.strip() for nom in args.cas.split(",")] if args.cas else None
+        inconnus = [nom for nom in noms_cas or () if nom not in CAS]
+        if inconnus:
+            parser.error(f"cas inconnus : {', '.join(inconnus)}")
+        resultats = executer(noms_cas, args.complet, args.repetitions)
+
+    if args.comparer:
+        reference = lire(args.reference)
+        regressions = comparer(resultats, reference, args.seuil)
+        # Confirmation : nouvelles mesures des étapes en régression, la meilleure médiane est retenue ;
+        # une vraie régression persiste à chaque passage, un ralentissement passager de la machine non
+        for _ in range(CONFIRMATIONS if not args.resultats else 0):
+            if not regressions:
+                break
+            print("\nNouvelle mesure des étapes en régression (écarte le bruit passager de la machine)")
+            confirmation = executer(noms_cas, args.complet, args.repetitions, cles=set(regressions))
+            for cle, mesure in confirmation["mesures"].items():
+                if mesure["mediane_s"] < resultats["mesures"][cle]["mediane_s"]:
+                    resultats["mesures"][cle] = mesure
+            regressions = comparer({"mesures": {cle: resultats["mesures"][cle] for cle in regressions}}, reference, args.seuil)
+
+    if not args.resultats:
+        ecrire(resultats, args.reference if args.enregistrer_reference else args.sortie)
+    if args.comparer:
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de {args.seuil:g} % : {', '.join(regressions)}")
+            return 1
+        print(f"\nAucune régression au-delà de {args.seuil:g} %")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# --- Données hors ligne des benchmarks : prix figés, univers et portefeuilles synthétiques de taille donnée ---
+import os  # Chemins des fichiers de référence
+import tempfile  # Univers synthétiques écrits dans un dossier temporaire
+
+import numpy as np  # Prix et quantités tirés avec une graine fixe
+import pandas as pd  # Lecture de l'univers de référence, écriture des univers synthétiques
+
+from config import Config  # Fournisseur de prix, univers et options désactivées pendant les mesures
+from models.actif import Actif  # Positions des portefeuilles synthétiques
+from models.portefeuille import Portefeuille  # Portefeuilles synthétiques
+from models.investor_preferences import InvestorPreferences  # Profil utilisé pour les constructions
+from repository.data_fetcher import FournisseurFichier, FournisseurMemoire, definir_fournisseur  # Prix hors ligne
+from repository.univers import FICHIER_UNIVERS_DEFAUT  # Univers fourni avec le projet
+
+# Prix figés de l'univers fourni (aucun appel réseau pendant les benchmarks)
+FICHIER_PRIX_REFERENCE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "prix_fixture.json")
+
+# Graine de toutes les données synthétiques : mêmes données d'une exécution à l'autre
+GRAINE = 12345
+
+# Profil investisseur des constructions mesurées
+PROFIL = InvestorPreferences(
+    "Préparer la retraite", 20, "Moyenne", ["Actions", "ETF", "Obligations", "Immobilier", "Commodités"]
+)
+
+# Dossier des univers synthétiques (supprimé à la fin du processus)
+_dossier = tempfile.TemporaryDirectory(prefix="benchmarks_univers_")
+
+
+# --- Environnement des mesures : prix hors ligne, sans cache disque, journal ni profilage ---
+def configurer_hors_ligne():
+    Config.FOURNISSEUR_PRIX = "fichier"
+    Config.FICHIER_PRIX = FICHIER_PRIX_REFERENCE
+    Config.CACHE_PRIX_ACTIF = False
+    Config.MESURES_JOURNAL = False
+    Config.PROFILAGE = None
+    utiliser_univers_reference()
+
+
+# --- Univers fourni avec le projet et ses prix figés ---
+def utiliser_univers_reference():
+    Config.FICHIER_UNIVERS = None
+    definir_fournisseur(FournisseurFichier(FICHIER_PRIX_REFERENCE))
+
+
+# Lignes (type, secteur, zone) de l'univers fourni, reprises en boucle par les données synthétiques
+def _categories_reference():
+    table = pd.read_csv(FICHIER_UNIVERS_DEFAUT, dtype=str, keep_default_na=False, encoding="utf-8")
+    return list(table[["type", "secteur", "zone"]].itertuples(index=False, name=None))
+
+
+# --- Univers synthétique de `taille` tickers (catégories de l'univers fourni) avec leurs prix ---
+def utiliser_univers_synthetique(taille):
+    rng = np.random.default_rng(GRAINE)
+    categories = _categories_reference()
+    tickers = [f"SYN{i:06d}" for i in range(taille)]
+    table = pd.DataFrame(
+        [(ticker, *categories[i % len(categories)]) for i, ticker in enumerate(tickers)],
+        columns=["ticker", "type", "secteur", "zone"],
+    )
+    chemin = os.path.join(_dossier.name, f"univers_{taille}.csv")
+    if not os.path.exists(chemin):
+        table.to_csv(chemin, index=False, encoding="utf-8")
+    Config.FICHIER_UNIVERS = chemin
+    definir_fournisseur(FournisseurMemoire(dict(zip(tickers, rng.uniform(10, 500, taille).round(2)))))
+
+
+# --- Portefeuille synthétique de `taille` positions (prix et quantités tirés avec la graine fixe) ---
+def portefeuille_synthetique(taille):
+    rng = np.random.default_rng(GRAINE)
+    categories = _categories_reference()
+    prix = rng.uniform(10, 500, taille).round(2)
+    quantites = rng.integers(1, 200, taille)
+    portefeuille = Portefeuille(capacite=taille)
+    for i in range(taille):
+        type_actif, secteur, zone = categories[i % len(categories)]
+        portefeuille.ajouter_actif(
+            Actif(f"SYN{i:06d}", float(prix[i]), int(quantites[i]), type_actif, secteur, zone)
+        )
+    return portefeuille
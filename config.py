@@ -1,3 +1,60 @@
 # Définition de la classe de configuration pour centraliser les paramètres du projet
 class Config:
     FICHIER_EXPORT = "portefeuille_analyses.xlsx"  # Chemin (et nom) du fichier Excel d'exportation des résultats
+    GRAPHIQUES_EXCEL = "natif"  # "natif" (graphiques Excel liés aux données) ou "image" (PNG matplotlib)
+    MODELE_FICHE_WORD = None  # Modèle .docx de la fiche client ; None = templates/fiche_portefeuille.docx
+    GRAPHIQUES_DPI = 150  # Résolution des graphiques rendus en image (interface, Excel mode image, Word)
+    GRAPHIQUES_CACHE_MAX = 256  # Nombre d'images de graphiques gardées en mémoire
+    GRAINE_ALEATOIRE = None  # Graine des tirages aléatoires (None = résultats différents à chaque construction)
+
+    # --- Récupération des prix ---
+    FOURNISSEUR_PRIX = "yfinance"  # "yfinance" (prix en direct) ou "fichier" (prix locaux, hors ligne)
+    FICHIER_PRIX = "prix_fixture.json"  # Fichier JSON {ticker: prix} utilisé par le fournisseur "fichier"
+    PRIX_MAX_WORKERS = 8  # Nombre de requêtes de prix simultanées
+    PRIX_TIMEOUT = 10  # Temps maximal (secondes) accordé à la récupération d'un prix
+    PRIX_TENTATIVES = 3  # Nombre de tentatives par ticker en cas d'erreur
+    PRIX_BACKOFF = 0.5  # Délai initial (secondes) entre deux tentatives, doublé à chaque essai
+
+    # --- Cache persistant des prix ---
+    CACHE_PRIX_ACTIF = True  # Activer le cache SQLite des derniers prix de clôture
+    CACHE_PRIX_FICHIER = "cache_prix.sqlite"  # Fichier SQLite du cache
+    CACHE_PRIX_TTL = 12 * 3600  # Durée de validité d'un prix en secondes (les clôtures changent une fois par jour)
+    CACHE_PRIX_MAX_ENTREES = 10000  # Nombre maximal de prix conservés (éviction des moins récemment utilisés)
+    CACHE_PRIX_STALE_WHILE_REVALIDATE = True  # Servir un prix périmé tout de suite et le rafraîchir en arrière-plan
+
+    # --- Univers des actifs ---
+    FICHIER_UNIVERS = None  # Fichier CSV/Parquet (ticker, type, secteur, zone) ; None = repository/univers.csv
+
+    # --- Allocation ---
+    ALLOCATEUR = "aleatoire"  # "aleatoire" (tirage des tickers, parts égales), "moyenne_variance" ou "parite_risque"
+    ALLOCATION_COVARIANCE_HISTORIQUE = False  # Covariance estimée sur l'historique local (sinon hypothèses par type)
+    ALLOCATION_ITERATIONS = 300  # Nombre maximal d'itérations des solveurs
+
+    # --- Projections Monte Carlo ---
+    NB_CHEMINS_PROJECTION = 10000  # Nombre de trajectoires simulées par scénario
+    HORIZON_PROJECTION_MOIS = 24  # Horizon des projections en mois
+
+    # --- Stress tests ---
+    FICHIER_SCENARIOS_STRESS = None  # Registre JSON/YAML des scénarios (None = stress_tests/scenarios.json)
+    FICHIER_SENSIBILITES_STRESS = None  # Bêtas par type/secteur/zone (None = stress_tests/sensibilites.json)
+    HORIZON_STRESS_MOIS = 12  # Horizon des stress tests en mois
+    NB_TIRAGES_STRESS = 1000  # Nombre de tirages Monte Carlo par scénario
+
+    # --- Historique des prix et risque ---
+    DOSSIER_HISTORIQUE = "historique_prix"  # Dossier du stockage local des clôtures journalières
+    HISTORIQUE_PERIODE_INITIALE = "2y"  # Profondeur d'historique téléchargée la première fois
+    JOURS_BOURSE_PAR_AN = 252  # Pour annualiser la volatilité journalière
+    NIVEAU_VAR = 0.95  # Niveau de confiance des VaR / CVaR
+
+    # --- Génération des rapports en arrière-plan ---
+    JOBS_MAX_WORKERS = 2  # Nombre maximal de rapports Excel / Word générés en même temps (un processus chacun)
+    JOBS_CONSERVES = 200  # Nombre de jobs gardés en mémoire (les plus anciens terminés sont oubliés)
+
+    # --- Mesures et profilage (instrumentation.py) ---
+    MESURES_JOURNAL = True  # Écrire une ligne JSON (durée, compteurs) à la fin de chaque étape mesurée
+    PROFILAGE = None  # None, "cprofile" (fichiers .prof) ou "pyinstrument" (pages HTML, dépendance optionnelle)
+    PROFILAGE_DOSSIER = "profils"  # Dossier des profils des étapes racines (une construction, un batch...)
+
+    # --- Mode batch (batch.py) ---
+    NB_CHEMINS_BATCH = 1000  # Trajectoires de projection par scénario et par profil
+    NB_TIRAGES_BATCH = 200  # Tirages de stress par scénario et par profil
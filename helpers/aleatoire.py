@@ -0,0 +1,25 @@
+# --- Import nécessaire ---
+import numpy as np  # Générateurs aléatoires explicites (numpy.random.Generator)
+
+from config import Config  # Graine par défaut de l'application
+
+# Étapes stochastiques d'une construction, chacune avec son propre flux aléatoire
+ETAPES_ALEATOIRES = ("construction", "projections", "stress")
+
+
+# --- Créer un générateur (graine donnée, sinon celle de Config, sinon aléatoire) ---
+def creer_generateur(graine=None):
+    return np.random.default_rng(Config.GRAINE_ALEATOIRE if graine is None else graine)
+
+
+# --- Un générateur par étape de la construction, reproductible pour un (profil, graine) donné ---
+# `index` distingue les profils d'un même batch : le résultat ne dépend pas du worker qui le traite.
+def generateurs_pipeline(graine=None, index=0):
+    graine = Config.GRAINE_ALEATOIRE if graine is None else graine
+    racine = np.random.SeedSequence(graine, spawn_key=(index,))
+    return dict(zip(ETAPES_ALEATOIRES, (np.random.default_rng(enfant) for enfant in racine.spawn(len(ETAPES_ALEATOIRES)))))
+
+
+# --- Tirer une graine au hasard : un tirage libre peut ensuite être rejoué (et mis en cache) ---
+def tirer_graine():
+    return int(np.random.SeedSequence().generate_state(1)[0])
@@ -0,0 +1,319 @@
+# --- Imports nécessaires ---
+from abc import ABC, abstractmethod  # Interface des allocateurs
+
+import numpy as np  # Solveurs vectorisés
+
+from config import Config  # Choix de l'allocateur et paramètres des solveurs
+from logger import setup_logger  # Logs de l'application
+from repository.univers import univers_actuel  # Univers des actifs
+
+logger = setup_logger()
+
+# Hypothèses a priori par type d'actif : (rendement annuel attendu, volatilité annuelle)
+HYPOTHESES_PAR_TYPE = {
+    "Actions": (0.08, 0.22),
+    "ETF": (0.07, 0.16),
+    "Obligations": (0.03, 0.06),
+    "Immobilier": (0.06, 0.18),
+    "Commodités": (0.04, 0.17),
+}
+HYPOTHESE_DEFAUT = (0.05, 0.15)  # Type inconnu
+
+# Corrélations a priori : socle commun + supplément si même type / même zone (matrice toujours positive)
+CORRELATION_SOCLE = 0.15
+CORRELATION_MEME_TYPE = 0.45
+CORRELATION_MEME_ZONE = 0.15
+
+# Aversion au risque du solveur moyenne-variance selon la tolérance de l'investisseur
+AVERSION_PAR_TOLERANCE = {"Faible": 8.0, "Moyenne": 4.0, "Élevée": 2.0}
+
+
+# --- Interface commune : choisir les tickers, puis les pondérer ---
+# Classe abstraite : un allocateur qui n'implémente pas les deux méthodes ne peut pas être instancié.
+class Allocateur(ABC):
+    nom = None
+
+    # Sélection des tickers : liste de (type d'actif, poids du type, tickers)
+    @abstractmethod
+    def selectionner(self, allocation, geo_target, types_valides, rng):
+        pass
+
+    # Pondération : {ticker: fraction du montant investi}
+    @abstractmethod
+    def ponderer(self, selections, geo_target, tolerance):
+        pass
+
+
+# --- Allocateur historique : tirage aléatoire des tickers par zone, parts égales dans chaque type ---
+class AllocateurAleatoire(Allocateur):
+    nom = "aleatoire"
+
+    def selectionner(self, allocation, geo_target, types_valides, rng):
+        selections = []
+        for type_actif, poids in allocation.items():
+            if type_actif not in types_valides:
+                continue  # Si l'utilisateur ne veut pas ce type d'actif, passer
+
+            univers = univers_actuel()
+            tickers = univers.filtrer(type=type_actif)
+            if not tickers:
+                continue  # Pas de tickers pour ce type
+
+            nb_actifs = max(1, int(len(tickers) * poids))  # Nombre d'actifs à sélectionner
+            tickers_selectionnes = []
+
+            # Répartir les actifs par zone géographique
+            for geo, pourcentage in geo_target.items():
+                candidats = univers.filtrer(type=type_actif, zone=geo)
+                nb_geo = max(1, int(nb_actifs * pourcentage))
+                choisis = rng.choice(len(candidats), size=min(len(candidats), nb_geo), replace=False)
+                tickers_selectionnes += [candidats[i] for i in choisis]
+
+            # Enlever les doublons (dans un ordre stable, pour la reproductibilité)
+            selections.append((type_actif, poids, list(dict.fromkeys(tickers_selectionnes))))
+        return selections
+
+    def ponderer(self, selections, geo_target, tolerance):
+        return {
+            ticker: poids / len(tickers_selectionnes)
+            for _, poids, tickers_selectionnes in selections
+            for ticker in tickers_selectionnes
+        }
+
+
+# --- Allocateurs optimisés : tout l'univers des types choisis, poids issus d'un solveur sous contraintes ---
+# Les types sans poids dans l'allocation cible ne sont pas retenus (aucun budget à répartir).
+class AllocateurOptimise(Allocateur):
+    def selectionner(self, allocation, geo_target, types_valides, rng):
+        univers = univers_actuel()
+        return [
+            (type_actif, poids, list(univers.filtrer(type=type_actif)))
+            for type_actif, poids in allocation.items()
+            if type_actif in types_valides and poids > 0 and univers.filtrer(type=type_actif)
+        ]
+
+    def ponderer(self, selections, geo_target, tolerance):
+        tickers = [ticker for _, _, tickers_selectionnes in selections for ticker in tickers_selectionnes]
+        if not tickers:
+            return {}
+        types = univers_actuel().colonne("type", tickers)
+        zones = univers_actuel().colonne("zone", tickers)
+        poids_types = {type_actif: poids for type_actif, poids, _ in selections}
+
+        cellules, budgets = budgets_cellules(types, zones, poids_types, geo_target)
+        retenus = cellules >= 0  # Actifs dont la zone n'a pas de budget : exclus
+        if not retenus.any():
+            return {}  # Aucune cellule avec un budget : rien à résoudre
+        rendements, covariance = estimer_parametres(tickers, types, zones)
+        poids = np.zeros(len(tickers))
+        poids[retenus] = self.resoudre(
+            rendements[retenus], covariance[np.ix_(retenus, retenus)], cellules[retenus], budgets, tolerance
+        )
+        return dict(zip(tickers, poids.tolist()))
+
+    # Poids des actifs retenus (tableau NumPy), donnés par le solveur de l'allocateur
+    @abstractmethod
+    def resoudre(self, rendements, covariance, cellules, budgets, tolerance):
+        pass
+
+
+# Moyenne-variance : max μ'w - λ/2 w'Σw, somme des poids de chaque cellule (type, zone) = budget, w >= 0
+class AllocateurMoyenneVariance(AllocateurOptimise):
+    nom = "moyenne_variance"
+
+    def resoudre(self, rendements, covariance, cellules, budgets, tolerance):
+        aversion = AVERSION_PAR_TOLERANCE.get(tolerance, 4.0)
+        return moyenne_variance(rendements, covariance, cellules, budgets, aversion)
+
+
+# Parité de risque : contributions au risque égales entre les actifs d'une même cellule (type, zone)
+class AllocateurPariteRisque(AllocateurOptimise):
+    nom = "parite_risque"
+
+    def resoudre(self, rendements, covariance, cellules, budgets, tolerance):
+        return parite_risque(covariance, cellules, budgets)
+
+
+# Allocateurs disponibles, par nom (Config.ALLOCATEUR)
+ALLOCATEURS = {
+    classe.nom: classe for classe in (AllocateurAleatoire, AllocateurMoyenneVariance, AllocateurPariteRisque)
+}
+
+
+# --- Retourner l'allocateur choisi dans la configuration ---
+def allocateur_configure(nom=None):
+    nom = nom or Config.ALLOCATEUR
+    if nom not in ALLOCATEURS:
+        raise ValueError(f"Allocateur inconnu : {nom} (disponibles : {', '.join(ALLOCATEURS)})")
+    return ALLOCATEURS[nom]()
+
+
+# --- Cellules (type, zone) et leur budget : poids du type x quota de la zone ---
+# Les quotas sont renormalisés sur les zones présentes dans le type ; un type sans aucune zone
+# ciblée (ex. Commodités « Global ») répartit son poids à parts égales entre ses zones.
+def budgets_cellules(types, zones, poids_types, geo_target):
+    numeros = {}
+    budgets = []
+    cellules = np.full(len(types), -1)
+    zones_par_type = {}
+    for type_actif, zone in zip(types, zones):
+        zones_par_type.setdefault(type_actif, {})[zone] = None  # Zones dans l'ordre d'apparition
+
+    budget_par_cellule = {}
+    for type_actif, zones_type in zones_par_type.items():
+        poids = poids_types.get(type_actif, 0.0)
+        ciblees = {z: geo_target[z] for z in zones_type if geo_target.get(z, 0) > 0}
+        if ciblees:
+            total = sum(ciblees.values())
+            for zone, quota in ciblees.items():
+                budget_par_cellule[(type_actif, zone)] = poids * quota / total
+        else:
+            for zone in zones_type:
+                budget_par_cellule[(type_actif, zone)] = poids / len(zones_type)
+
+    for i, cle in enumerate(zip(types, zones)):
+        budget = budget_par_cellule.get(cle, 0.0)
+        if budget <= 0:
+            continue
+        if cle not in numeros:
+            numeros[cle] = len(budgets)
+            budgets.append(budget)
+        cellules[i] = numeros[cle]
+    return cellules, np.array(budgets)
+
+
+# --- Rendements annuels et covariance annuelle des actifs ---
+def estimer_parametres(tickers, types, zones):
+    rendements = np.array([HYPOTHESES_PAR_TYPE.get(t, HYPOTHESE_DEFAUT)[0] for t in types])
+
+    if Config.ALLOCATION_COVARIANCE_HISTORIQUE:
+        try:
+            from helpers.risque import moteur_risque  # Import local : n'ouvre l'historique que si demandé
+
+            moteur = moteur_risque(tickers)
+            colonnes = [moteur.historique.tickers.index(t) for t in tickers]
+            covariance = moteur.covariance()[np.ix_(colonnes, colonnes)] * Config.JOURS_BOURSE_PAR_AN
+            if np.all(np.diag(covariance) > 0):
+                return rendements, covariance
+            logger.warning("Historique incomplet pour l'allocation, hypothèses par type utilisées")
+        except Exception as e:
+            logger.warning(f"Covariance historique indisponible ({e}), hypothèses par type utilisées")
+
+    return rendements, covariance_a_priori(types, zones)
+
+
+# Covariance a priori : volatilités par type et corrélations socle / même type / même zone
+def covariance_a_priori(types, zones):
+    volatilites = np.array([HYPOTHESES_PAR_TYPE.get(t, HYPOTHESE_DEFAUT)[1] for t in types])
+    _, code_type = np.unique(np.array(types, dtype=object).astype(str), return_inverse=True)
+    _, code_zone = np.unique(np.array(zones, dtype=object).astype(str), return_inverse=True)
+    correlation = (
+        CORRELATION_SOCLE
+        + CORRELATION_MEME_TYPE * (code_type[:, None] == code_type[None, :])
+        + CORRELATION_MEME_ZONE * (code_zone[:, None] == code_zone[None, :])
+    )
+    np.fill_diagonal(correlation, 1.0)
+    return correlation * np.outer(volatilites, volatilites)
+
+
+# --- Projection sur le produit des simplexes {w >= 0, somme des poids de la cellule c = budget c} ---
+# Tri par (cellule, valeur décroissante) puis seuil de chaque cellule calculé en une passe (Duchi et al.).
+def projeter_cellules(valeurs, cellules, budgets):
+    decalage = 2 * np.abs(valeurs).max() + 1  # Une clé de tri unique suffit : cellule croissante, valeur décroissante
+    ordre = np.argsort(cellules * decalage - valeurs)
+    tries = valeurs[ordre]
+    cellules_triees = cellules[ordre]
+    tailles = np.bincount(cellules_triees, minlength=len(budgets))
+    debuts = np.concatenate(([0], np.cumsum(tailles)[:-1]))
+
+    # Sommes cumulées et rangs à l'intérieur de chaque cellule
+    cumul = np.cumsum(tries)
+    cumul -= np.repeat(cumul[debuts] - tries[debuts], tailles)
+    rangs = np.arange(len(tries)) - np.repeat(debuts, tailles) + 1
+    seuils = (cumul - budgets[cellules_triees]) / rangs
+
+    # Dernier rang vérifiant valeur > seuil : il fixe le seuil de la cellule
+    positions = np.where(tries > seuils, np.arange(len(tries)), -1)
+    seuil_cellule = seuils[np.maximum.reduceat(positions, debuts)]
+    return np.maximum(valeurs - seuil_cellule[cellules], 0)
+
+
+# --- Moyenne-variance par gradient projeté accéléré (FISTA avec redémarrage adaptatif) ---
+def moyenne_variance(rendements, covariance, cellules, budgets, aversion, iterations=None, tolerance=1e-8):
+    iterations = iterations or Config.ALLOCATION_ITERATIONS
+    # Pas = 1 / constante de Lipschitz du gradient (plus grande valeur propre, par la méthode de la puissance)
+    vecteur = np.ones(len(rendements))
+    for _ in range(20):
+        vecteur = covariance @ vecteur
+        norme = np.linalg.norm(vecteur)
+        if norme == 0:
+            break  # Covariance nulle : constante de Lipschitz nulle
+        vecteur /= norme
+    lipschitz = aversion * 1.1 * float(vecteur @ covariance @ vecteur)  # Marge de 10 % sur l'estimation
+    pas = 1 / lipschitz if lipschitz > 0 else 1.0  # Covariance nulle : gradient constant, tout pas converge
+
+    # Départ : budget de chaque cellule réparti à parts égales
+    poids = budgets[cellules] / np.bincount(cellules)[cellules]
+    point, t = poids.copy(), 1.0
+    for _ in range(iterations):
+        gradient = rendements - aversion * (covariance @ point)
+        nouveaux = projeter_cellules(point + pas * gradient, cellules, budgets)
+        if (point - nouveaux) @ (nouveaux - poids) > 0:
+            t = 1.0  # Redémarrage adaptatif : l'inertie va à contre-sens, on la remet à zéro
+        t_suivant = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        point = nouveaux + (t - 1) / t_suivant * (nouveaux - poids)
+        ecart = np.abs(nouveaux - poids).max()
+        poids, t = nouveaux, t_suivant
+        if ecart < tolerance:
+            break
+    return poids
+
+
+# --- Parité de risque par cellule ---
+# Condition visée : y_i (Σy)_i = κ_c pour tous les actifs i de la cellule c, et somme des poids de c = budget c.
+# À covariance croisée fixée, y_i est la racine positive de σ_ii y² + a_i y = κ_c (croissante en κ_c) :
+# le κ_c de chaque cellule est trouvé par dichotomie, pour toutes les cellules à la fois.
+def parite_risque(covariance, cellules, budgets, iterations=None, tolerance=1e-9, etapes_dichotomie=30):
+    iterations = iterations or Config.ALLOCATION_ITERATIONS
+    variances = np.diag(covariance)
+
+    poids = (budgets / np.bincount(cellules))[cellules]  # Départ : parts égales dans chaque cellule
+    for _ in range(iterations):
+        autres = covariance @ poids - variances * poids  # Covariance avec le reste du portefeuille
+
+        # Dichotomie (en échelle logarithmique) sur κ_c pour que chaque cellule consomme exactement son budget
+        bas = np.full(len(budgets), -40.0)
+        haut = np.full(len(budgets), 5.0)
+        for _ in range(etapes_dichotomie):
+            milieu = (bas + haut) / 2
+            kappa = np.exp(milieu)[cellules]
+            racines = (-autres + np.sqrt(autres**2 + 4 * variances * kappa)) / (2 * variances)
+            trop = np.bincount(cellules, weights=racines, minlength=len(budgets)) > budgets
+            haut = np.where(trop, milieu, haut)
+            bas = np.where(trop, bas, milieu)
+
+        nouveaux = (poids + racines) / 2  # Amortissement : la mise à jour simultanée peut osciller
+        nouveaux *= (budgets / np.bincount(cellules, weights=nouveaux))[cellules]
+        ecart = np.abs(nouveaux - poids).max()
+        poids = nouveaux
+        if ecart < tolerance:
+            break
+    return poids
+
+
+# --- Arrondi en nombres entiers de parts, en limitant le cash non investi ---
+# Partie entière de chaque montant cible, puis achat d'une part supplémentaire pour les positions les
+# plus en retard sur leur cible tant que le reliquat le permet (jamais au-delà du budget).
+def arrondir_quantites(montants, prix, budget):
+    montants = np.asarray(montants, dtype=float)
+    prix = np.asarray(prix, dtype=float)
+    quantites = np.floor(montants / prix).astype(int)
+    reste = budget - float(quantites @ prix)
+    retards = montants - quantites * prix
+    for i in np.argsort(-retards, kind="stable"):
+        if retards[i] <= 0:
+            break
+        if prix[i] <= reste:
+            quantites[i] += 1
+            reste -= prix[i]
+    return quantites
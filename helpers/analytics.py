@@ -0,0 +1,55 @@
+# --- Imports nécessaires ---
+import threading  # Mémo partagé par les sessions Streamlit
+from collections import OrderedDict  # Mémo borné (moins récemment utilisés évincés)
+
+import numpy as np  # Calcul vectorisé des indicateurs
+import pandas as pd  # Mise en forme du tableau d'analyse
+
+from instrumentation import mesurer  # Durée du calcul des indicateurs
+from helpers.empreinte import empreinte  # Clé du mémo : contenu des projections
+
+# Résultats déjà calculés, indexés par l'empreinte du contenu des projections
+_analyses = OrderedDict()
+_verrou = threading.Lock()
+ANALYSES_MAX = 256  # Nombre de résultats gardés en mémoire
+
+
+# --- Analyse quantitative des projections (partagée par l'interface, Excel et Word) ---
+# `projections` : trajectoire médiane (P50) de chaque scénario, d'où les valeurs et rendements (fonctions
+# croissantes de la valeur finale, donc médianes elles aussi). `indicateurs` : volatilité et drawdown calculés
+# par trajectoire (ResultatProjections.indicateurs) ; sans eux, ces colonnes restent vides, car une enveloppe
+# de percentiles n'est pas une trajectoire.
+# Le résultat est mémorisé par contenu des données : ne pas modifier le tableau retourné.
+def analyse_quantitative(projections, indicateurs=None):
+    cle = (empreinte(projections), None if indicateurs is None else empreinte(indicateurs))
+    with _verrou:
+        if cle in _analyses:
+            _analyses.move_to_end(cle)
+            return _analyses[cle]
+
+    with mesurer("analyse", mois=len(projections), scenarios=len(projections.columns)):
+        valeurs = projections.to_numpy(dtype=float)  # Forme (mois, scénarios)
+        valeur_initiale = valeurs[0]  # Valeurs initiales
+        valeur_finale = valeurs[-1]  # Valeurs finales
+        annees = len(valeurs) / 12  # Durée des projections en années
+
+        # Valeurs et rendements en une seule passe sur le tableau NumPy
+        analyse = pd.DataFrame(
+            {
+                "Valeur Initiale ($)": valeur_initiale,
+                "Valeur Finale ($)": valeur_finale,
+                "Rendement Total (%)": (valeur_finale - valeur_initiale) / valeur_initiale * 100,
+                "CAGR (%)": ((valeur_finale / valeur_initiale) ** (1 / annees) - 1) * 100,  # Rendement annualisé
+            },
+            index=projections.columns,
+        )
+
+        # Risque : médianes des indicateurs calculés trajectoire par trajectoire
+        for colonne in ("Volatilité Mensuelle (%)", "Maximum Drawdown (%)"):
+            analyse[colonne] = np.nan if indicateurs is None else indicateurs[colonne].reindex(analyse.index)
+
+    with _verrou:
+        _analyses[cle] = analyse
+        while len(_analyses) > ANALYSES_MAX:
+            _analyses.popitem(last=False)
+    return analyse
@@ -0,0 +1,14 @@
+# --- Empreinte du contenu d'une Series / d'un DataFrame (clé des caches de graphiques et d'analyses) ---
+import hashlib  # Empreinte des données
+
+import pandas as pd  # Hachage des Series / DataFrames
+
+
+# --- Empreinte d'une Series / d'un DataFrame : valeurs, index, noms de l'index et nom de la Series ou des colonnes ---
+# Les noms font partie de la clé : ils apparaissent dans les titres et légendes des graphiques.
+def empreinte(donnees):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(pd.util.hash_pandas_object(donnees, index=True).to_numpy().tobytes())
+    noms = list(donnees.columns) if isinstance(donnees, pd.DataFrame) else donnees.name
+    h.update(repr((noms, list(donnees.index.names))).encode())
+    return h.hexdigest()
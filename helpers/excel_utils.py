@@ -1,151 +1,204 @@
 # --- Imports ---
 import pandas as pd  # Manipulation de DataFrame pour organiser les données
-import matplotlib.pyplot as plt  # Pour créer les graphiques
-from openpyxl import load_workbook  # Pour manipuler un fichier Excel existant
+import numpy as np  # Calcul vectorisé des largeurs de colonnes
+from openpyxl import Workbook  # Classeur Excel écrit en une passe (mode write-only)
+from openpyxl.cell import WriteOnlyCell  # Cellules stylées en mode write-only
 from openpyxl.styles import PatternFill, Font  # Pour styliser les cellules Excel (couleurs, polices)
-from openpyxl.utils.dataframe import dataframe_to_rows  # (pas utilisé ici mais sert à convertir DataFrame en lignes Excel)
+from openpyxl.utils import get_column_letter, quote_sheetname  # Lettres de colonnes et plages de cellules
+from openpyxl.chart import LineChart, PieChart, Reference  # Graphiques Excel natifs
+from openpyxl.chart.label import DataLabelList  # Pourcentages affichés sur le camembert
 from openpyxl.drawing.image import Image as XLImage  # Pour insérer des images (graphiques) dans Excel
 import io  # Manipulation de flux d'images en mémoire
 
 from config import Config  # Pour utiliser le chemin d'export défini dans config.py
+from instrumentation import mesurer, ajouter_compteurs  # Durée de l'export
+from helpers.analytics import analyse_quantitative  # Indicateurs partagés avec l'interface et le Word
+from helpers.rendu import rendre, parts, camembert, courbes  # Graphiques en image (mode "image"), mis en cache
+
+# Style de la ligne d'en-tête de chaque feuille
+REMPLISSAGE_ENTETE = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
+POLICE_ENTETE = Font(bold=True)
 
-# --- Fonction principale pour exporter tout vers un fichier Excel ---
-def export_vers_excel(portefeuille, projections, stress_results):
-    # Crée un nouveau fichier Excel avec Openpyxl
-    writer = pd.ExcelWriter(Config.FICHIER_EXPORT, engine='openpyxl')
 
-    # --- Feuille 1 : Portefeuille ---
+# --- Fonction principale pour exporter tout vers un fichier Excel ---
+# Écriture en une seule passe (openpyxl en mode write-only) : styles, largeurs et graphiques sont posés
+# pendant l'écriture, sans relire le classeur.
+# `destination` : chemin du fichier ou flux binaire (ex. io.BytesIO) ; par défaut Config.FICHIER_EXPORT
+# `graphiques` : "natif" (graphiques Excel liés aux données) ou "image" (PNG matplotlib) ; par défaut Config
+# `indicateurs` : volatilité et drawdown par trajectoire (ResultatProjections.indicateurs) pour l'analyse
+@mesurer("export_excel")
+def export_vers_excel(portefeuille, projections, stress_results, bandes=None, destination=None, graphiques=None,
+                      indicateurs=None):
+    destination = destination or Config.FICHIER_EXPORT
+    natif = (graphiques or Config.GRAPHIQUES_EXCEL) == "natif"
+    ajouter_compteurs(positions=len(portefeuille), graphiques="natif" if natif else "image")
+    workbook = Workbook(write_only=True)
+
+    # --- Feuille 1 : Portefeuille (avec une ligne "TOTAL") et répartition par type à droite ---
     df_portefeuille = portefeuille.composition()  # Récupère la composition actuelle du portefeuille
     valeur_totale = df_portefeuille["Valeur Totale"].sum()  # Calcule la valeur totale du portefeuille
-
-    # Ajoute une ligne "TOTAL" à la fin du tableau
-    total_values = ["TOTAL"] + [""] * (len(df_portefeuille.columns) - 2) + [valeur_totale]
-    total_row = pd.DataFrame([total_values], columns=df_portefeuille.columns)
-    df_final = pd.concat([df_portefeuille, total_row])
-
-    # Écrit cette feuille dans Excel
-    df_final.to_excel(writer, sheet_name='Portefeuille', index=False)
-
-    # --- Feuille 2 : Projections ---
-    projections_copy = projections.copy()  # Copie les projections pour ne pas modifier l'original
-
-    # Pour chaque scénario, calcule la performance en pourcentage
-    for scenario in projections_copy.columns:
-        projections_copy[scenario + " Gain/Perte (%)"] = (projections_copy[scenario] / projections_copy[scenario].iloc[0] - 1) * 100
-
-    # Écrit les projections et performances dans une nouvelle feuille
-    projections_copy.to_excel(writer, sheet_name='Projections')
-
-    # --- Feuille 3 : Stress Tests ---
-    stress_results_copy = stress_results.copy()  # Copie les stress tests
-    pertes_dollars = {}  # Dictionnaire pour stocker les pertes en dollars
-    pertes_pourcentage = {}  # Dictionnaire pour stocker les pertes en pourcentage
-
-    # Pour chaque scénario de stress
-    for col in stress_results.columns:
-        valeur_init = stress_results[col].iloc[0]
-        valeur_fin = stress_results[col].iloc[-1]
-        pertes_dollars[col] = valeur_init - valeur_fin
-        pertes_pourcentage[col] = ((valeur_init - valeur_fin) / valeur_init) * 100
-
-    # Ajoute les lignes Perte ($) et Perte (%) dans le DataFrame
-    stress_results_copy.loc["Perte ($)"] = pertes_dollars
-    stress_results_copy.loc["Perte (%)"] = pertes_pourcentage
-
-    # Écrit les résultats des stress tests dans Excel
-    stress_results_copy.to_excel(writer, sheet_name='Stress Tests')
+    total_values = ["TOTAL"] + [None] * (len(df_portefeuille.columns) - 2) + [valeur_totale]
+    expositions_type = portefeuille.expositions("type")
+    if natif:
+        colonne_type = len(df_portefeuille.columns) + 2  # Après une colonne vide
+        graphique = camembert_natif(
+            "Portefeuille", colonne_type, colonne_type + 1, len(expositions_type), "Répartition du Portefeuille"
+        )
+    else:
+        graphique = portefeuille_plot(expositions_type)
+    ecrire_feuille(
+        workbook, "Portefeuille", df_portefeuille, index=False, lignes_fin=[total_values],
+        graphique=graphique, annexe=expositions_type.reset_index() if natif else None,
+        ancre=get_column_letter(len(df_portefeuille.columns) + 5) + "2" if natif else "H2",
+    )
+
+    # --- Feuille 2 : Projections et performance en pourcentage de chaque scénario ---
+    performances = (projections / projections.iloc[0] - 1) * 100
+    performances.columns = [scenario + " Gain/Perte (%)" for scenario in projections.columns]
+    if natif:
+        graphique = courbes_natives(
+            "Projections", len(projections.columns), len(projections), "Projection de Valeur du Portefeuille (24 mois)"
+        )
+    else:
+        graphique = projection_plot(projections)
+    ecrire_feuille(workbook, "Projections", pd.concat([projections, performances], axis=1), graphique=graphique)
+
+    # --- Feuille 2 bis : Bandes de projection Monte Carlo (P5 / P50 / P95) ---
+    if bandes is not None:
+        bandes_plates = bandes.copy(deep=False)
+        bandes_plates.columns = [f"{scenario} {percentile}" for scenario, percentile in bandes.columns]
+        ecrire_feuille(workbook, "Bandes Projections", bandes_plates)
+
+    # --- Feuille 3 : Stress Tests, avec les lignes Perte ($) et Perte (%) ---
+    valeur_init = stress_results.iloc[0]
+    pertes_dollars = valeur_init - stress_results.iloc[-1]
+    pertes = pd.DataFrame(
+        [pertes_dollars, pertes_dollars / valeur_init * 100], index=["Perte ($)", "Perte (%)"]
+    )
+    if natif:
+        graphique = courbes_natives(
+            "Stress Tests", len(stress_results.columns), len(stress_results), "Stress Tests du Portefeuille"
+        )
+    else:
+        graphique = stress_plot(stress_results)
+    ecrire_feuille(
+        workbook, "Stress Tests", stress_results,
+        lignes_fin=pertes.reset_index().itertuples(index=False, name=None), graphique=graphique,
+    )
 
     # --- Feuille 4 : Analyse Quantitative ---
-    analyse = analyse_quantitative(projections)  # Calcul des indicateurs de performance
-    analyse.to_excel(writer, sheet_name='Analyse Quantitative')
-
-    writer.close()  # Ferme et sauvegarde le fichier Excel
-
-    # --- Post-traitement : Ajout du style et des graphiques ---
-    workbook = load_workbook(Config.FICHIER_EXPORT)  # Recharge le fichier Excel pour le modifier
-
-    for sheet_name in workbook.sheetnames:
-        sheet = workbook[sheet_name]
-
-        # Mettre en bleu clair l'entête de la première ligne
-        for cell in sheet[1]:
-            cell.fill = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
-            cell.font = Font(bold=True)
-
-        # Ajuste automatiquement la largeur de chaque colonne selon le contenu
-        for col in sheet.columns:
-            max_length = 0
-            column = col[0].column_letter
-            for cell in col:
-                try:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                except:
-                    pass
-            adjusted_width = (max_length + 2)
-            sheet.column_dimensions[column].width = adjusted_width
-
-        # --- Générer un graphique pour chaque feuille ---
-        if sheet_name == 'Portefeuille':
-            plot = portefeuille_plot(df_portefeuille)
-        elif sheet_name == 'Projections':
-            plot = projection_plot(projections)
-        elif sheet_name == 'Stress Tests':
-            plot = stress_plot(stress_results)
-        elif sheet_name == 'Analyse Quantitative':
-            plot = None  # Pas de graphique pour l'analyse quantitative
-
-        # Si un graphique a été généré, l'insérer dans la feuille
-        if plot:
-            img_bytes = io.BytesIO()
-            plot.savefig(img_bytes, format='png')
-            img_bytes.seek(0)
-            img = XLImage(img_bytes)
-            img.width = 600
-            img.height = 400
-            sheet.add_image(img, "H2")  # Insère l'image dans la cellule H2
-
-    workbook.save(Config.FICHIER_EXPORT)  # Sauvegarde finale du fichier Excel
-
-# --- Fonctions auxiliaires pour générer les graphiques ---
-
-def portefeuille_plot(df):
-    fig, ax = plt.subplots()
-    df.groupby("Type")["Valeur Totale"].sum().plot(kind="pie", autopct='%1.1f%%', ax=ax)
-    ax.set_ylabel("")
-    ax.set_title("Répartition du Portefeuille")
-    return fig
+    ecrire_feuille(workbook, "Analyse Quantitative", analyse_quantitative(projections, indicateurs))
+
+    workbook.save(destination)  # Une seule écriture du fichier Excel
+
+
+# En-têtes et valeurs (tableau objet) d'un DataFrame, suivis des lignes de fin éventuelles
+def _entetes_valeurs(df, index, lignes_fin):
+    tableau = df.reset_index() if index else df
+    entetes = ["" if colonne is None else str(colonne) for colonne in tableau.columns]
+    if index and df.index.name is None:
+        entetes[0] = None  # Index sans nom : cellule d'en-tête vide, comme pandas
+    valeurs = tableau.to_numpy(dtype=object)
+    lignes_fin = [list(ligne) for ligne in lignes_fin]
+    if lignes_fin:
+        valeurs = np.vstack([valeurs, np.array(lignes_fin, dtype=object)])
+    return entetes, valeurs
+
+
+# --- Écrire un DataFrame dans une nouvelle feuille (en-tête stylé, largeurs calculées, graphique) ---
+# `annexe` : petit tableau écrit à droite du principal (après une colonne vide), ex. données d'un graphique
+# `graphique` : image PNG (bytes) ou graphique openpyxl (inséré tel quel)
+def ecrire_feuille(workbook, titre, df, index=True, lignes_fin=(), graphique=None, annexe=None, ancre="H2"):
+    sheet = workbook.create_sheet(titre)
+    entetes, valeurs = _entetes_valeurs(df, index, lignes_fin)
+    stylees = [entete is not None or index for entete in entetes]  # Cellules d'en-tête à mettre en forme
+
+    # Tableau annexe à droite, après une colonne vide
+    if annexe is not None:
+        entetes_annexe, valeurs_annexe = _entetes_valeurs(annexe, False, ())
+        nb_lignes = max(len(valeurs), len(valeurs_annexe))
+        combinees = np.full((nb_lignes, valeurs.shape[1] + 1 + valeurs_annexe.shape[1]), None, dtype=object)
+        combinees[:len(valeurs), :valeurs.shape[1]] = valeurs
+        combinees[:len(valeurs_annexe), valeurs.shape[1] + 1:] = valeurs_annexe
+        valeurs = combinees
+        entetes = entetes + [None] + entetes_annexe
+        stylees = stylees + [False] + [True] * len(entetes_annexe)
+
+    # Largeur de chaque colonne = plus long contenu + 2, calculée sur tout le tableau d'un coup
+    textes = np.where(pd.isna(valeurs), "", valeurs).astype(str)
+    textes[textes == "None"] = ""
+    longueurs = np.char.str_len(np.vstack([np.array(entetes, dtype=object).astype(str), textes]))
+    longueurs[0][[entete is None for entete in entetes]] = 0
+    for numero, longueur in enumerate(longueurs.max(axis=0), start=1):
+        sheet.column_dimensions[get_column_letter(numero)].width = int(longueur) + 2
+
+    # Ligne d'en-tête en bleu clair et en gras
+    ligne_entete = []
+    for entete, stylee in zip(entetes, stylees):
+        cellule = WriteOnlyCell(sheet, value=entete)
+        if stylee:
+            cellule.fill = REMPLISSAGE_ENTETE
+            cellule.font = POLICE_ENTETE
+        ligne_entete.append(cellule)
+    sheet.append(ligne_entete)
+
+    # Données puis lignes de fin (les valeurs manquantes restent des cellules vides)
+    for ligne in valeurs:
+        sheet.append([None if valeur is None or valeur != valeur else valeur for valeur in ligne])
+
+    # Graphique : natif (lié aux cellules) ou image PNG, affichée sur 600 pixels de large
+    if graphique is None:
+        return sheet
+    if isinstance(graphique, bytes):
+        img = XLImage(io.BytesIO(graphique))
+        img.width, img.height = 600, round(600 * img.height / img.width)
+        sheet.add_image(img, ancre)
+    else:
+        sheet.add_chart(graphique, ancre)
+    return sheet
+
+
+# --- Graphiques Excel natifs (référencent les cellules écrites par ecrire_feuille) ---
+
+# Plage d'une feuille, colonnes et lignes numérotées à partir de 1
+def _plage(feuille, min_col, min_row, max_col, max_row):
+    return Reference(
+        range_string=f"{quote_sheetname(feuille)}!${get_column_letter(min_col)}${min_row}"
+        f":${get_column_letter(max_col)}${max_row}"
+    )
+
+
+# Camembert : libellés et valeurs dans deux colonnes, en-tête en ligne 1
+def camembert_natif(feuille, colonne_libelles, colonne_valeurs, nb_lignes, titre):
+    graphique = PieChart()
+    graphique.title = titre
+    graphique.add_data(_plage(feuille, colonne_valeurs, 1, colonne_valeurs, nb_lignes + 1), titles_from_data=True)
+    graphique.set_categories(_plage(feuille, colonne_libelles, 2, colonne_libelles, nb_lignes + 1))
+    graphique.dataLabels = DataLabelList()
+    graphique.dataLabels.showPercent = True
+    graphique.width, graphique.height = 16, 10.5  # En cm, environ 600 x 400 pixels
+    return graphique
+
+
+# Courbes : mois en colonne A, une série par colonne à partir de B, en-tête en ligne 1
+def courbes_natives(feuille, nb_series, nb_lignes, titre):
+    graphique = LineChart()
+    graphique.title = titre
+    graphique.x_axis.title = "Mois"
+    graphique.y_axis.title = "Valeur ($)"
+    graphique.add_data(_plage(feuille, 2, 1, nb_series + 1, nb_lignes + 1), titles_from_data=True)
+    graphique.set_categories(_plage(feuille, 1, 2, 1, nb_lignes + 1))
+    graphique.width, graphique.height = 16, 10.5
+    return graphique
+
+# --- Fonctions auxiliaires pour générer les graphiques en image (PNG, cache partagé avec l'interface) ---
+
+def portefeuille_plot(expositions_type):
+    return rendre(camembert, parts(expositions_type), "Répartition du Portefeuille")
 
 def projection_plot(projections):
-    fig, ax = plt.subplots()
-    projections.plot(ax=ax)
-    ax.set_title("Projection de Valeur du Portefeuille (24 mois)")
-    return fig
+    return rendre(courbes, projections, "Projection de Valeur du Portefeuille (24 mois)")
 
 def stress_plot(stress_results):
-    fig, ax = plt.subplots()
-    stress_results.drop(["Perte ($)", "Perte (%)"], axis=0, errors='ignore').plot(ax=ax)
-    ax.set_title("Stress Tests du Portefeuille")
-    return fig
-
-# --- Fonction pour l'analyse quantitative du portefeuille ---
-
-def analyse_quantitative(projections):
-    valeur_initiale = projections.iloc[0]  # Prend la première valeur
-    valeur_finale = projections.iloc[-1]  # Prend la dernière valeur
-    rendement_total = ((valeur_finale - valeur_initiale) / valeur_initiale) * 100  # Gain/perte total en %
-    cagr = ((valeur_finale / valeur_initiale) ** (1/2) - 1) * 100  # Rendement annualisé (sur 2 ans ici)
-    volatilite_mensuelle = projections.pct_change().std() * 100  # Volatilité mensuelle moyenne
-    max_drawdown = (projections.cummax() - projections).max() / projections.cummax().max() * 100  # Plus forte perte maximale
-
-    # Résultat sous forme de DataFrame pour l'écrire dans Excel
-    analyse = pd.DataFrame({
-        "Valeur Initiale ($)": valeur_initiale,
-        "Valeur Finale ($)": valeur_finale,
-        "Rendement Total (%)": rendement_total,
-        "CAGR (%)": cagr,
-        "Volatilité Mensuelle (%)": volatilite_mensuelle,
-        "Maximum Drawdown (%)": max_drawdown
-    })
-
-    return analyse
+    stress_results = stress_results.drop(["Perte ($)", "Perte (%)"], axis=0, errors='ignore')
+    return rendre(courbes, stress_results, "Stress Tests du Portefeuille")
@@ -1,5 +1,17 @@
-# Import de la librairie pour récupérer les prix du marché
-import yfinance as yf
+# Import de time pour l'échéance commune de toutes les récupérations de prix
+import time
+
+# Import de la configuration (délai maximal de récupération des prix)
+from config import Config
+
+# Import de la récupération concurrente des prix du marché
+from repository.data_fetcher import recuperer_prix
+
+# Import du logger pour tracer les tickers en échec
+from logger import setup_logger
+
+# Import de l'instrumentation pour mesurer la durée de la construction
+from instrumentation import mesurer, ajouter_compteurs
 
 # Import de la classe Actif (modèle d'un actif financier)
 from models.actif import Actif
@@ -7,44 +19,30 @@ from models.actif import Actif
 # Import de la classe Portefeuille (modèle d'un portefeuille)
 from models.portefeuille import Portefeuille
 
-# Import de la librairie random pour faire des sélections aléatoires
-import random
-
-# Début du mapping manuel type d'actif - secteur - géographie
-mapping_info = {
-    "AAPL": ("Actions", "Technologie", "USA"),
-    "MSFT": ("Actions", "Technologie", "USA"),
-    "GOOGL": ("Actions", "Technologie", "USA"),
-    "TSLA": ("Actions", "Automobile", "USA"),
-    "AIR.PA": ("Actions", "Aéronautique", "Europe"),
-    "AMZN": ("Actions", "E-commerce", "USA"),
-    "BABA": ("Actions", "E-commerce", "Asie"),
-    "BMW.DE": ("Actions", "Automobile", "Europe"),
-    "ASML.AS": ("Actions", "Technologie", "Europe"),
-    "EWJ": ("ETF", "Marché Japon", "Asie"),
-    "EEM": ("ETF", "Marché Émergents", "Émergents"),
-    "VOO": ("ETF", "Mixte", "USA"),
-    "SPY": ("ETF", "Mixte", "USA"),
-    "VNQ": ("Immobilier", "Immobilier", "USA"),
-    "GLD": ("Commodités", "Or", "Global"),
-    "SLV": ("Commodités", "Argent", "Global"),
-    "BND": ("Obligations", "Diversifié", "USA"),
-    "AGG": ("Obligations", "Diversifié", "USA"),
-}
-# Fin du dictionnaire mapping_info
-
-# Début du dictionnaire pour regrouper les tickers par type
-tickers_par_type = {
-    "Actions": ["AAPL", "MSFT", "GOOGL", "TSLA", "AIR.PA", "AMZN", "BABA", "BMW.DE", "ASML.AS"],
-    "ETF": ["VOO", "SPY", "EWJ", "EEM"],
-    "Immobilier": ["VNQ"],
-    "Commodités": ["GLD", "SLV"],
-    "Obligations": ["BND", "AGG"],
-}
-# Fin du dictionnaire tickers_par_type
+# Import du générateur aléatoire explicite pour des sélections reproductibles
+from helpers.aleatoire import creer_generateur
 
-# Définir la fonction quotas_geo qui retourne la répartition géographique cible selon l'objectif
-def quotas_geo(objectif):
+# Import des allocateurs (sélection et pondération des tickers) et de l'arrondi en nombres de parts
+from helpers.allocation import allocateur_configure, arrondir_quantites
+
+# Import de l'univers des actifs (ticker -> type, secteur, zone), chargé depuis un fichier
+from repository.univers import univers_actuel
+
+logger = setup_logger()
+
+# Profils proposés par l'application (valeurs précalculées au chargement du module)
+OBJECTIFS = (
+    "Préparer la retraite",
+    "Acheter une maison",
+    "Constituer une épargne",
+    "Financer les études des enfants",
+    "Créer un patrimoine",
+)
+HORIZONS = range(1, 31)
+TOLERANCES = ("Faible", "Moyenne", "Élevée")
+
+# Calcule la répartition géographique cible selon l'objectif
+def _calculer_quotas_geo(objectif):
     if objectif == "Préparer la retraite" or objectif == "Créer un patrimoine":
         return {"USA": 0.60, "Europe": 0.25, "Asie": 0.15}
     elif objectif == "Acheter une maison" or objectif == "Constituer une épargne":
@@ -53,10 +51,10 @@ def quotas_geo(objectif):
         return {"USA": 0.60, "Europe": 0.30, "Asie": 0.10}
     else:
         return {"USA": 0.70, "Europe": 0.20, "Asie": 0.10}
-# Fin de la fonction quotas_geo
+# Fin de la fonction _calculer_quotas_geo
 
-# Définir la fonction allocation_dynamiques qui retourne l'allocation cible selon le profil
-def allocation_dynamiques(objectif, horizon, tolerance):
+# Calcule l'allocation cible selon le profil
+def _calculer_allocation(objectif, horizon, tolerance):
     # Allocation de base selon l'objectif et l'horizon
     if objectif in ["Préparer la retraite", "Créer un patrimoine"]:
         if horizon > 15:
@@ -86,70 +84,126 @@ def allocation_dynamiques(objectif, horizon, tolerance):
     base = {k: v / total for k, v in base.items()}
 
     return base
+# Fin de la fonction _calculer_allocation
+
+# --- Tables précalculées une fois au chargement : profil -> allocation, objectif -> quotas ---
+_TABLE_ALLOCATIONS = {
+    (objectif, horizon, tolerance): _calculer_allocation(objectif, horizon, tolerance)
+    for objectif in OBJECTIFS
+    for horizon in HORIZONS
+    for tolerance in TOLERANCES
+}
+_TABLE_QUOTAS_GEO = {objectif: _calculer_quotas_geo(objectif) for objectif in OBJECTIFS}
+
+# Définir la fonction quotas_geo qui retourne la répartition géographique cible selon l'objectif (O(1))
+def quotas_geo(objectif):
+    quotas = _TABLE_QUOTAS_GEO.get(objectif)
+    return dict(quotas) if quotas is not None else _calculer_quotas_geo(objectif)
+# Fin de la fonction quotas_geo
+
+# Définir la fonction allocation_dynamiques qui retourne l'allocation cible selon le profil (O(1))
+def allocation_dynamiques(objectif, horizon, tolerance):
+    allocation = _TABLE_ALLOCATIONS.get((objectif, horizon, tolerance))
+    return dict(allocation) if allocation is not None else _calculer_allocation(objectif, horizon, tolerance)
 # Fin de la fonction allocation_dynamiques
 
+# Définir la fonction tickers_par_type_zone qui retourne les tickers d'un type dans une zone (tuple partagé, non modifiable)
+def tickers_par_type_zone(type_actif, zone):
+    return univers_actuel().filtrer(type=type_actif, zone=zone)
+# Fin de la fonction tickers_par_type_zone
+
+# Remplace un ticker en échec dans sa sélection par un candidat du même type (même zone de préférence)
+def _remplacer_ticker(selections, ticker, deja_essayes, rng):
+    for type_actif, _, tickers_selectionnes in selections:
+        if ticker not in tickers_selectionnes:
+            continue
+        univers = univers_actuel()
+        candidats = [t for t in univers.filtrer(type=type_actif) if t not in deja_essayes]
+        if not candidats:
+            return None
+        zone = univers.info(ticker, ("", "", ""))[2]
+        meme_zone = [t for t in univers.filtrer(type=type_actif, zone=zone) if t not in deja_essayes]
+        choix = meme_zone or candidats
+        remplacant = choix[rng.integers(len(choix))]
+        tickers_selectionnes[tickers_selectionnes.index(ticker)] = remplacant
+        return remplacant
+    return None
+# Fin de la fonction _remplacer_ticker
+
 # Définir la fonction construire_portefeuille qui construit un portefeuille personnalisé
-def construire_portefeuille(preferences, montant_investi):
+@mesurer("construction")
+def construire_portefeuille(preferences, montant_investi, rng=None, allocateur=None):
+    rng = rng or creer_generateur()
     allocation = allocation_dynamiques(preferences.objectif, preferences.horizon, preferences.tolerance)
     geo_target = quotas_geo(preferences.objectif)
 
     # Déterminer les types d'actifs valides choisis par l'utilisateur
-    types_valides = [t for t in preferences.types_actifs if t in tickers_par_type.keys()]
+    univers = univers_actuel()
+    types_valides = [t for t in preferences.types_actifs if t in univers.valeurs("type")]
     if not types_valides:
         types_valides = ["Actions", "ETF", "Obligations"]
 
+    # Aucun type choisi n'a de poids dans l'allocation cible (ex. Actions à court terme, tolérance faible) :
+    # le montant est réparti à parts égales entre les types choisis plutôt que de rester non investi
+    if not any(allocation.get(t, 0) > 0 for t in types_valides):
+        logger.warning(f"Types choisis sans poids dans l'allocation cible : {', '.join(types_valides)}, parts égales")
+        allocation = {**allocation, **dict.fromkeys(types_valides, 1 / len(types_valides))}
+
     # Créer un portefeuille vide
     portefeuille = Portefeuille()
 
-    valeur_investie = 0  # Initialiser la valeur totale investie
-
-    # Boucle sur les types d'actifs selon l'allocation
-    for type_actif, poids in allocation.items():
-        if type_actif not in types_valides:
-            continue  # Si l'utilisateur ne veut pas ce type d'actif, passer
-
-        tickers = tickers_par_type.get(type_actif, [])
-        if not tickers:
-            continue  # Pas de tickers pour ce type
-
-        nb_actifs = max(1, int(len(tickers) * poids))  # Nombre d'actifs à sélectionner
-        tickers_selectionnes = []  # Liste pour stocker les tickers sélectionnés
-
-        # Répartir les actifs par zone géographique
-        for geo, pourcentage in geo_target.items():
-            candidats = [ticker for ticker in tickers if mapping_info.get(ticker, ("","",geo))[2] == geo]
-            nb_geo = max(1, int(nb_actifs * pourcentage))
-            tickers_selectionnes += random.sample(candidats, min(len(candidats), nb_geo))
-
-        # Enlever les doublons si besoin
-        tickers_selectionnes = list(set(tickers_selectionnes))
-
-        # Pour chaque actif sélectionné
-        for ticker in tickers_selectionnes:
-            try:
-                # Récupérer les données de prix avec yfinance
-                data = yf.Ticker(ticker)
-                prix = data.history(period="1d")["Close"].iloc[-1]
-
-                # Déterminer la quantité achetable
-                montant_alloue = montant_investi * poids / len(tickers_selectionnes)
-                quantite = max(1, int(montant_alloue / prix))
-
-                # Extraire les informations sur l'actif
-                type_asset, secteur, zone_geo = mapping_info.get(ticker, ("Inconnu", "Inconnu", "Inconnu"))
-
-                # Créer un nouvel objet Actif
-                actif = Actif(ticker, prix, quantite, type_asset, secteur, zone_geo)
-
-                # Ajouter cet actif au portefeuille
-                portefeuille.ajouter_actif(actif)
-
-                valeur_investie += prix * quantite  # Mettre à jour le montant investi
-
-            except Exception as e:
-                # Si erreur (ex: prix indisponible), afficher l'erreur
-                print(f"Erreur de récupération pour {ticker}: {e}")
+    # --- Étape 1 : sélection des actifs pour chaque type (selon l'allocateur choisi) ---
+    allocateur = allocateur or allocateur_configure()
+    selections = allocateur.selectionner(allocation, geo_target, types_valides, rng)  # (type, poids, tickers)
+
+    # --- Étape 2 : récupérer les prix en parallèle, en remplaçant les tickers en échec ---
+    # Une seule échéance pour la récupération et toutes les substitutions : au plus Config.PRIX_TIMEOUT au total
+    echeance = time.monotonic() + Config.PRIX_TIMEOUT
+    prix_par_ticker = {}
+    a_recuperer = [ticker for _, _, tickers_selectionnes in selections for ticker in tickers_selectionnes]
+    deja_essayes = set(a_recuperer)
+    while a_recuperer:
+        if time.monotonic() >= echeance:
+            logger.warning(f"Délai de récupération des prix dépassé : remplaçants non essayés {a_recuperer}")
+            break
+        resultat = recuperer_prix(a_recuperer, echeance=echeance)
+        prix_par_ticker.update(resultat.prix)
+
+        # Remplacer chaque ticker en échec par un autre candidat du même type
+        a_recuperer = []
+        for ticker, raison in resultat.echecs.items():
+            remplacant = _remplacer_ticker(selections, ticker, deja_essayes, rng)
+            if remplacant:
+                logger.warning(f"Prix indisponible pour {ticker} ({raison}), remplacé par {remplacant}")
+                a_recuperer.append(remplacant)
+                deja_essayes.add(remplacant)
+            else:
+                logger.warning(f"Prix indisponible pour {ticker} ({raison}), aucun remplaçant disponible")
+
+    # Retirer les tickers restés sans prix pour répartir le montant sur les actifs réellement achetés
+    selections = [
+        (type_actif, poids, [ticker for ticker in tickers_selectionnes if ticker in prix_par_ticker])
+        for type_actif, poids, tickers_selectionnes in selections
+    ]
+
+    # --- Étape 3 : pondérer, arrondir en nombres entiers de parts et créer les actifs ---
+    poids_par_ticker = allocateur.ponderer(selections, geo_target, preferences.tolerance)
+    tickers = [ticker for ticker, poids in poids_par_ticker.items() if poids > 0]
+    prix = [prix_par_ticker[ticker] for ticker in tickers]
+    montants = [montant_investi * poids_par_ticker[ticker] for ticker in tickers]
+    quantites = arrondir_quantites(montants, prix, sum(montants))
+
+    for ticker, prix_actif, quantite in zip(tickers, prix, quantites.tolist()):
+        if quantite == 0:
+            continue  # Montant cible inférieur au prix d'une part
+
+        # Extraire les informations sur l'actif
+        type_asset, secteur, zone_geo = univers.info(ticker, ("Inconnu", "Inconnu", "Inconnu"))
+
+        # Créer un nouvel objet Actif et l'ajouter au portefeuille
+        portefeuille.ajouter_actif(Actif(ticker, prix_actif, quantite, type_asset, secteur, zone_geo))
 
     # Retourner le portefeuille complet
+    ajouter_compteurs(positions=len(portefeuille), allocateur=type(allocateur).__name__)
     return portefeuille
 # Fin de la fonction construire_portefeuille
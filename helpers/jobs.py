@@ -0,0 +1,148 @@
+# --- Imports nécessaires ---
+import multiprocessing  # Contexte "spawn" : processus propres, sans état hérité du serveur Streamlit
+import threading  # Verrou du registre des jobs
+import time  # Heure de soumission des jobs
+import uuid  # Identifiants uniques des jobs
+from concurrent.futures import ProcessPoolExecutor  # Génération hors du thread de l'interface
+from concurrent.futures.process import BrokenProcessPool  # Pool à recréer si un processus a planté
+
+from config import Config  # Nombre de processus et de jobs conservés
+from logger import setup_logger  # Logs de l'application
+
+logger = setup_logger()
+
+# États possibles d'un job
+EN_ATTENTE = "en attente"
+EN_COURS = "en cours"
+TERMINE = "terminé"
+ECHEC = "échec"
+
+
+# --- Un job soumis à la file : suivi de son état et de son résultat ---
+class Job:
+    def __init__(self, identifiant, future, description=""):
+        self.identifiant = identifiant  # Identifiant unique (transmis à l'interface)
+        self.future = future  # Future du pool de processus
+        self.description = description  # Libellé affiché / loggué
+        self.soumis = time.time()  # Heure de soumission
+
+    # État courant du job
+    def statut(self):
+        if self.future.done():
+            return ECHEC if self.future.cancelled() or self.future.exception() is not None else TERMINE
+        return EN_COURS if self.future.running() else EN_ATTENTE
+
+    # Le job est-il terminé (avec succès ou non) ?
+    def fini(self):
+        return self.future.done()
+
+    # Résultat du job (None tant qu'il n'est pas terminé avec succès)
+    def resultat(self):
+        return self.future.result() if self.statut() == TERMINE else None
+
+    # Erreur du job (None s'il n'a pas échoué)
+    def erreur(self):
+        if not self.future.done():
+            return None
+        if self.future.cancelled():
+            return "annulé"
+        return self.future.exception()
+
+
+# --- File de jobs locale : un pool de processus borné et un registre des jobs ---
+class FileJobs:
+    def __init__(self, max_workers, max_conserves):
+        self.max_workers = max_workers  # Nombre maximal de jobs exécutés en même temps
+        self.max_conserves = max_conserves  # Nombre maximal de jobs gardés dans le registre
+        self._executeur = None  # Pool créé au premier job
+        self._verrou = threading.Lock()
+        self._jobs = {}  # identifiant -> Job (ordre de soumission)
+        self._par_cle = {}  # clé de déduplication -> identifiant
+
+    # Pool de processus, (re)créé au besoin
+    def _executeur_actif(self):
+        if self._executeur is None:
+            self._executeur = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executeur
+
+    # --- Soumettre fonction(*args) ; une clé déjà soumise (et pas en échec) renvoie le job existant ---
+    def soumettre(self, fonction, *args, cle=None, description=""):
+        with self._verrou:
+            if cle is not None and cle in self._par_cle:
+                job = self._jobs.get(self._par_cle[cle])
+                if job is not None and job.statut() != ECHEC:
+                    return job.identifiant
+
+            try:
+                future = self._executeur_actif().submit(fonction, *args)
+            except BrokenProcessPool:
+                logger.warning("Pool de génération des rapports interrompu, redémarrage")
+                self._executeur = None
+                future = self._executeur_actif().submit(fonction, *args)
+
+            identifiant = uuid.uuid4().hex
+            self._jobs[identifiant] = Job(identifiant, future, description)
+            if cle is not None:
+                self._par_cle[cle] = identifiant
+            self._purger()
+
+        logger.info(f"Job {identifiant[:8]} soumis : {description}")
+        return identifiant
+
+    # Job correspondant à un identifiant (None s'il est inconnu ou a été oublié)
+    def job(self, identifiant):
+        with self._verrou:
+            return self._jobs.get(identifiant)
+
+    # Oublier les jobs terminés les plus anciens au-delà de max_conserves
+    def _purger(self):
+        excedent = len(self._jobs) - self.max_conserves
+        if excedent <= 0:
+            return
+        anciens = [identifiant for identifiant, job in self._jobs.items() if job.fini()][:excedent]
+        for identifiant in anciens:
+            del self._jobs[identifiant]
+        self._par_cle = {cle: i for cle, i in self._par_cle.items() if i in self._jobs}
+
+    # Nombre de jobs par état
+    def statistiques(self):
+        with self._verrou:
+            statuts = [job.statut() for job in self._jobs.values()]
+        return {statut: statuts.count(statut) for statut in (EN_ATTENTE, EN_COURS, TERMINE, ECHEC)}
+
+    # Arrêter le pool (les jobs en attente sont annulés)
+    def arreter(self):
+        with self._verrou:
+            if self._executeur is not None:
+                self._executeur.shutdown(wait=False, cancel_futures=True)
+                self._executeur = None
+
+
+# File partagée par toutes les sessions de l'application
+_file = None
+_verrou_file = threading.Lock()
+
+
+# --- Retourner la file de jobs (créée au premier appel) ---
+def file_jobs():
+    global _file
+    with _verrou_file:
+        if _file is None:
+            _file = FileJobs(Config.JOBS_MAX_WORKERS, Config.JOBS_CONSERVES)
+        return _file
+
+
+# --- Générer un rapport en mémoire (exécuté dans un processus de la file) ---
+# type_rapport : "excel" ou "word" ; retourne le contenu du fichier (bytes)
+# `resultat_projections` : ResultatProjections (bandes et indicateurs par trajectoire)
+def generer_rapport(type_rapport, portefeuille, resultat_projections, stress_results, preferences, montant_investi):
+    from helpers.projections import trajectoires_medianes  # Imports locaux : chargés dans le processus de travail
+    from helpers.rapports import generer_rapports_client
+
+    bandes = resultat_projections.bandes
+    return generer_rapports_client(
+        portefeuille, trajectoires_medianes(bandes), stress_results, preferences, montant_investi, bandes,
+        resultat_projections.indicateurs, types=(type_rapport,),
+    )[type_rapport]
@@ -0,0 +1,131 @@
+# --- Imports nécessaires ---
+import os  # Nom du fichier Excel proposé au téléchargement
+import threading  # Compteurs partagés par les sessions Streamlit
+
+import pandas as pd  # Tableau des statistiques de cache
+import streamlit as st  # Caches st.cache_data / st.cache_resource
+
+from config import Config  # Nom du fichier Excel exporté
+from logger import setup_logger  # Logs de l'application
+from models.investor_preferences import InvestorPreferences  # Préférences reconstruites depuis la clé
+from helpers.finance_utils import construire_portefeuille  # Construction du portefeuille
+from helpers.projections import projeter_portefeuille, trajectoires_medianes  # Projections Monte Carlo
+from helpers.analytics import analyse_quantitative  # Indicateurs de performance
+from helpers.aleatoire import generateurs_pipeline  # Un générateur aléatoire par étape
+from helpers.jobs import file_jobs, generer_rapport  # Génération des rapports en arrière-plan
+from stress_tests.simulator import stress_test_detaille  # Stress tests avec attribution
+from repository.data_fetcher import date_instantane_prix, statistiques_cache  # Date et compteurs du cache de prix
+
+logger = setup_logger()
+
+# Noms proposés au téléchargement des exports
+FICHIER_EXCEL = os.path.basename(Config.FICHIER_EXPORT)
+FICHIER_WORD = "fiche_portefeuille.docx"
+
+# Étapes mises en cache, dans l'ordre du pipeline
+ETAPES_PIPELINE = ("portefeuille", "projections", "stress", "analyse")
+
+# Compteurs propres à l'application : appels reçus et calculs réellement effectués (= défauts de cache)
+_compteurs = {etape: {"appels": 0, "calculs": 0} for etape in ETAPES_PIPELINE}
+_verrou_compteurs = threading.Lock()
+
+
+# Incrémenter un compteur d'une étape (sessions concurrentes)
+def _incrementer(etape, compteur):
+    with _verrou_compteurs:
+        _compteurs[etape][compteur] += 1
+
+
+# --- Clé d'une construction : profil, montant, graine et date de l'instantané de prix ---
+# La date est celle des prix que le cache servira (None pour des prix hors ligne) : la construction
+# est refaite quand l'instantané change, pas au changement de jour.
+def cle_pipeline(preferences, montant_investi, graine):
+    return (
+        preferences.objectif,
+        preferences.horizon,
+        preferences.tolerance,
+        tuple(preferences.types_actifs),
+        montant_investi,
+        graine,
+        date_instantane_prix(),
+    )
+
+
+# Préférences et montant correspondant à une clé
+def _profil(cle):
+    objectif, horizon, tolerance, types_actifs, montant_investi, _, _ = cle
+    return InvestorPreferences(objectif, horizon, tolerance, list(types_actifs)), montant_investi
+
+
+# Générateurs de la construction décrite par la clé (mêmes flux à chaque appel)
+def _generateurs(cle):
+    return generateurs_pipeline(cle[5])
+
+
+# Compte chaque appel d'une étape avant de déléguer à sa version en cache
+def _compter(etape, fonction):
+    def appeler(cle):
+        _incrementer(etape, "appels")
+        return fonction(cle)
+    return appeler
+
+
+# --- Étapes en cache (le corps ne s'exécute qu'en cas de défaut de cache) ---
+# Le portefeuille n'est jamais modifié après construction : il est partagé tel quel (cache_resource).
+@st.cache_resource(max_entries=64, show_spinner="Construction du portefeuille...")
+def _portefeuille(cle):
+    _incrementer("portefeuille", "calculs")
+    preferences, montant_investi = _profil(cle)
+    portefeuille = construire_portefeuille(preferences, montant_investi, rng=_generateurs(cle)["construction"])
+
+    # Logguer le succès (une fois par construction, pas à chaque réexécution de la page)
+    logger.info("Portefeuille construit avec succès.")
+    logger.info(f"Cache de prix : {statistiques_cache()}")
+    return portefeuille
+
+
+@st.cache_data(max_entries=64, show_spinner="Projections Monte Carlo...")
+def _projections(cle):
+    _incrementer("projections", "calculs")
+    return projeter_portefeuille(_portefeuille(cle), rng=_generateurs(cle)["projections"])
+
+
+@st.cache_data(max_entries=64, show_spinner="Stress tests...")
+def _stress(cle):
+    _incrementer("stress", "calculs")
+    return stress_test_detaille(_portefeuille(cle), rng=_generateurs(cle)["stress"])
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _analyse(cle):
+    _incrementer("analyse", "calculs")
+    projections = _projections(cle)
+    return analyse_quantitative(trajectoires_medianes(projections.bandes), projections.indicateurs)
+
+
+# --- Points d'entrée utilisés par l'application (clé obtenue par cle_pipeline) ---
+portefeuille_pipeline = _compter("portefeuille", _portefeuille)  # Portefeuille
+projections_pipeline = _compter("projections", _projections)  # ResultatProjections (bandes + indicateurs)
+stress_pipeline = _compter("stress", _stress)  # ResultatStress (trajectoires + attribution)
+analyse_pipeline = _compter("analyse", _analyse)  # Tableau d'analyse quantitative
+
+
+# --- Rapports : générés en arrière-plan par la file de jobs, un seul job par (rapport, clé) ---
+def soumettre_rapport(cle, type_rapport):
+    preferences, montant_investi = _profil(cle)
+    return file_jobs().soumettre(
+        generer_rapport, type_rapport, portefeuille_pipeline(cle), projections_pipeline(cle),
+        stress_pipeline(cle).trajectoires, preferences, montant_investi,
+        cle=(type_rapport, cle), description=f"rapport {type_rapport}",
+    )
+
+
+# --- Statistiques des caches du pipeline (panneau de debug) ---
+def statistiques_pipeline():
+    with _verrou_compteurs:
+        compteurs = {etape: dict(valeurs) for etape, valeurs in _compteurs.items()}
+    stats = pd.DataFrame.from_dict(compteurs, orient="index").rename(columns={"appels": "Appels", "calculs": "Calculs"})
+    stats.loc["Total"] = stats.sum()
+    stats["Hits"] = (stats["Appels"] - stats["Calculs"]).clip(lower=0)
+    stats["Taux de hit (%)"] = (stats["Hits"] / stats["Appels"].where(stats["Appels"] > 0) * 100).fillna(0.0)
+    return stats
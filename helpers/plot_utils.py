@@ -1,9 +1,8 @@
 # --- Imports nécessaires ---
 import streamlit as st  # Pour afficher l'interface utilisateur sur Streamlit
-import matplotlib.pyplot as plt  # Pour tracer des graphiques
-import seaborn as sns  # Pour faire des graphiques améliorés (ex: barplot)
 import pandas as pd  # Pour gérer les DataFrames
-import numpy as np  # Pour faire des calculs mathématiques et simulations
+
+from helpers.rendu import rendre, parts, camembert, barres, bandes_projection, courbes  # Graphiques mis en cache
 
 
 # --- Afficher la composition détaillée du portefeuille ---
@@ -18,91 +17,52 @@ def afficher_repartition(portefeuille):
     st.write(f"**Valeur totale du portefeuille : {valeur_totale:.2f} $**")
 
 
-# --- Afficher un camembert par type d'actif ---
+# --- Afficher un camembert par type d'actif (même image que la fiche Word) ---
 def afficher_repartition_type(portefeuille):
-    df = portefeuille.composition()  # Récupère la composition
-    df_type = df.groupby("Type")["Valeur Totale"].sum().reset_index()  # Regroupe les valeurs par Type
-    fig, ax = plt.subplots()  # Crée une figure et des axes
-    ax.pie(df_type["Valeur Totale"], labels=df_type["Type"], autopct='%1.1f%%')  # Tracer un pie chart
-    ax.set_title("Répartition par Type d'Actif")  # Titre du graphique
-    st.pyplot(fig)  # Affiche le graphique dans Streamlit
+    repartition = parts(portefeuille.expositions("type"))  # Parts déjà agrégées par Type
+    st.image(rendre(camembert, repartition, "Répartition par Type d'Actif"), width="stretch")
 
 
 # --- Afficher un barplot par secteur ---
 def afficher_repartition_secteur(portefeuille):
-    df = portefeuille.composition()  # Récupère la composition
-    df_secteur = df.groupby("Secteur")["Valeur Totale"].sum().reset_index()  # Regroupe les valeurs par Secteur
-    fig, ax = plt.subplots()  # Crée une figure et des axes
-    sns.barplot(x="Secteur", y="Valeur Totale", data=df_secteur, ax=ax)  # Tracer un barplot
-    ax.set_title("Répartition Sectorielle")  # Titre du graphique
-    plt.xticks(rotation=45)  # Tourner les labels pour qu'ils soient lisibles
-    st.pyplot(fig)  # Affiche le graphique
+    secteur = portefeuille.expositions("secteur").round(2)  # Valeurs déjà agrégées par Secteur
+    st.image(rendre(barres, secteur, "Répartition Sectorielle"), width="stretch")
 
 
 # --- Afficher un camembert par zone géographique ---
 def afficher_repartition_geo(portefeuille):
-    df = portefeuille.composition()  # Récupère la composition
-    df_geo = df.groupby("Zone Géographique")["Valeur Totale"].sum().reset_index()  # Regroupe par Zone
-    fig, ax = plt.subplots()  # Crée une figure
-    ax.pie(df_geo["Valeur Totale"], labels=df_geo["Zone Géographique"], autopct='%1.1f%%')  # Pie chart
-    ax.set_title("Répartition Géographique")  # Titre
-    st.pyplot(fig)  # Affiche dans Streamlit
-
-
-# --- Simuler et afficher la projection sur 24 mois ---
-def afficher_projections(portefeuille):
-    df = portefeuille.composition()  # Récupère la composition
-    valeur_initiale = df["Valeur Totale"].sum()  # Calcule la valeur de départ
-    mois = np.arange(1, 25)  # 24 mois
+    repartition = parts(portefeuille.expositions("zone"))  # Parts déjà agrégées par Zone
+    st.image(rendre(camembert, repartition, "Répartition Géographique"), width="stretch")
 
-    # Initialiser les projections pour différents scénarios
-    projections = {
-        "Optimiste": [],
-        "Neutre": [],
-        "Pessimiste": [],
-    }
 
-    # Définir les valeurs initiales pour chaque scénario
-    valeur_opt, valeur_neutre, valeur_pessi = valeur_initiale, valeur_initiale, valeur_initiale
+# --- Simuler (sauf si les bandes sont fournies) et afficher la projection sur 24 mois ---
+def afficher_projections(portefeuille, rng=None, bandes=None):
+    from helpers.projections import projeter_portefeuille  # Moteur Monte Carlo
 
-    # Simuler l'évolution de chaque scénario mois par mois
-    for _ in mois:
-        valeur_opt *= np.random.uniform(1.005, 1.015)  # Croissance optimiste
-        valeur_neutre *= np.random.uniform(0.998, 1.005)  # Croissance neutre
-        valeur_pessi *= np.random.uniform(0.990, 1.002)  # Croissance pessimiste
+    # Simuler toutes les trajectoires d'un coup et récupérer les bandes P5 / P50 / P95
+    if bandes is None:
+        bandes = projeter_portefeuille(portefeuille, rng=rng).bandes
 
-        # Stocker les résultats
-        projections["Optimiste"].append(valeur_opt)
-        projections["Neutre"].append(valeur_neutre)
-        projections["Pessimiste"].append(valeur_pessi)
+    # Trajectoire médiane de chaque scénario avec sa bande P5-P95
+    image = rendre(bandes_projection, bandes, "Projection de la Valeur du Portefeuille (24 mois)")
+    st.image(image, width="stretch")  # Affiche le graphique
 
-    # Convertir les projections en DataFrame
-    df_projections = pd.DataFrame(projections, index=mois)
-    df_projections.index.name = "Mois"
+    return bandes  # Retourner les bandes de projection pour les exports
 
-    # Tracer les courbes de projections
-    fig, ax = plt.subplots()
-    df_projections.plot(ax=ax)
-    ax.set_title("Projection de la Valeur du Portefeuille (24 mois)")
-    ax.set_ylabel("Valeur ($)")
-    st.pyplot(fig)  # Affiche le graphique
 
-    return df_projections  # Retourner le DataFrame pour l'utiliser ailleurs
+# --- Appliquer des scénarios de stress (sauf si le résultat est fourni) et afficher ---
+def afficher_stress_tests(portefeuille, rng=None, resultat=None):
+    from stress_tests.simulator import stress_test_detaille  # Import interne
 
-
-# --- Appliquer des scénarios de stress et afficher ---
-def afficher_stress_tests(portefeuille):
-    from stress_tests.simulator import stress_test_portefeuille  # Import interne
-
-    stress_results = stress_test_portefeuille(portefeuille)  # Lance les simulations de stress tests
+    if resultat is None:
+        resultat = stress_test_detaille(portefeuille, rng=rng)  # Lance les simulations de stress tests
+    stress_results = resultat.trajectoires
 
     # Tracer l'évolution de la valeur sous chaque scénario de stress
-    fig, ax = plt.subplots()
-    stress_results.plot(ax=ax)
-    ax.set_title("Évolution du Portefeuille sous Scénarios de Stress (12 mois)")
-    ax.set_ylabel("Valeur ($)")
-    ax.set_xlabel("Mois")
-    st.pyplot(fig)  # Affiche le graphique
+    image = rendre(
+        courbes, stress_results, "Évolution du Portefeuille sous Scénarios de Stress (12 mois)", "Mois", "Valeur ($)"
+    )
+    st.image(image, width="stretch")  # Affiche le graphique
 
     # --- Afficher un résumé sous forme de tableau ---
     st.subheader("Résumé des pertes par scénario")
@@ -120,29 +80,36 @@ def afficher_stress_tests(portefeuille):
     df_pertes = pd.DataFrame(pertes).T
     st.dataframe(df_pertes.style.format({"Perte ($)": "{:.2f}", "Perte (%)": "{:.2f}"}))  # Formater joliment
 
+    # --- Afficher la contribution de chaque position aux pertes ---
+    st.subheader("Attribution des pertes par position ($)")
+    st.dataframe(resultat.attribution.style.format("{:.2f}"))
+
     return stress_results  # Retourner les résultats complets
 
 
 # --- Faire l'analyse quantitative du portefeuille ---
-def afficher_analyse_quantitative(projections):
+# `indicateurs` : volatilité et drawdown par trajectoire (ResultatProjections.indicateurs)
+def afficher_analyse_quantitative(projections, analyse=None, indicateurs=None):
     st.subheader("Analyse Quantitative du Portefeuille")  # Titre
-    valeur_initiale = projections.iloc[0]  # Valeurs initiales
-    valeur_finale = projections.iloc[-1]  # Valeurs finales
-
-    # Calculs de performance
-    rendement_total = ((valeur_finale - valeur_initiale) / valeur_initiale) * 100
-    cagr = ((valeur_finale / valeur_initiale) ** (1 / 2) - 1) * 100  # CAGR annualisé sur 2 ans
-    volatilite_mensuelle = projections.pct_change().std() * 100  # Volatilité
-    max_drawdown = (projections.cummax() - projections).max() / projections.cummax().max() * 100  # Max drawdown
-
-    # Regrouper les résultats
-    analyse = pd.DataFrame({
-        "Valeur Initiale ($)": valeur_initiale,
-        "Valeur Finale ($)": valeur_finale,
-        "Rendement Total (%)": rendement_total,
-        "CAGR (%)": cagr,
-        "Volatilité Mensuelle (%)": volatilite_mensuelle,
-        "Maximum Drawdown (%)": max_drawdown
-    })
-
-    st.dataframe(analyse.style.format("{:.2f}"))  # Affiche joliment
+    from helpers.analytics import analyse_quantitative  # Calcul partagé avec les exports
+
+    if analyse is None:
+        analyse = analyse_quantitative(projections, indicateurs)  # Indicateurs de performance (calculés une seule fois)
+
+    st.dataframe(analyse.style.format("{:.2f}", na_rep="-"))  # Affiche joliment
+
+
+# --- Afficher les indicateurs de risque calculés sur l'historique réel ---
+def afficher_analyse_risque(portefeuille):
+    from helpers.risque import moteur_risque  # Moteur de risque historique
+
+    st.subheader("Risque Historique du Portefeuille")
+    try:
+        moteur = moteur_risque(portefeuille.composition()["Nom"].tolist())  # Historique des positions détenues
+        analyse = moteur.analyse(portefeuille)
+    except ValueError as e:
+        st.info(f"Analyse de risque indisponible : {e}")
+        return None
+
+    st.dataframe(analyse.style.format("{:.2f}", na_rep="-"))  # Affiche joliment
+    return analyse
@@ -0,0 +1,90 @@
+# --- Imports nécessaires ---
+import numpy as np  # Simulation vectorisée des trajectoires
+import pandas as pd  # Mise en forme des bandes de projection
+
+from config import Config  # Nombre de trajectoires et horizon par défaut
+from instrumentation import mesurer, ajouter_compteurs  # Durée des simulations
+from helpers.aleatoire import creer_generateur  # Générateur par défaut (graine de Config)
+
+# Bornes (min, max) du facteur de croissance mensuel de chaque scénario, tiré uniformément
+SCENARIOS_PROJECTION = {
+    "Optimiste": (1.005, 1.015),  # Croissance optimiste
+    "Neutre": (0.998, 1.005),  # Croissance neutre
+    "Pessimiste": (0.990, 1.002),  # Croissance pessimiste
+}
+
+# Percentiles résumant la distribution des trajectoires
+PERCENTILES = {"P5": 5, "P50": 50, "P95": 95}
+
+
+# --- Résultat détaillé d'une projection ---
+class ResultatProjections:
+    def __init__(self, bandes, indicateurs):
+        self.bandes = bandes  # Bandes P5 / P50 / P95 par mois (colonnes Scénario x Percentile)
+        self.indicateurs = indicateurs  # Volatilité et drawdown calculés par trajectoire, médiane par scénario
+
+
+# --- Simuler N trajectoires x mois x scénarios en une seule opération NumPy ---
+# Les bandes résument la distribution à chaque mois ; elles ne forment pas une trajectoire. Les indicateurs
+# de risque (volatilité, drawdown) sont donc calculés sur chaque trajectoire simulée, puis résumés par leur médiane.
+@mesurer("projections")
+def simuler_projections_detaillees(valeur_initiale, nb_chemins=None, nb_mois=None, scenarios=None, rng=None):
+    nb_chemins = nb_chemins or Config.NB_CHEMINS_PROJECTION
+    nb_mois = nb_mois or Config.HORIZON_PROJECTION_MOIS
+    scenarios = scenarios or SCENARIOS_PROJECTION
+    ajouter_compteurs(chemins=nb_chemins, mois=nb_mois, scenarios=len(scenarios))
+    rng = rng or creer_generateur()  # Graine de Config si aucun générateur n'est fourni
+
+    noms = list(scenarios)
+    bornes = np.array([scenarios[nom] for nom in noms])  # Forme (scénarios, 2)
+    bas = bornes[:, 0, None, None]
+    amplitude = (bornes[:, 1] - bornes[:, 0])[:, None, None]
+
+    # Matrice des facteurs mensuels (scénarios, mois, trajectoires), puis produit cumulé sur les mois
+    facteurs = rng.random((len(noms), nb_mois, nb_chemins))
+    facteurs *= amplitude
+    facteurs += bas
+
+    # Volatilité mensuelle de chaque trajectoire : écart-type de ses rendements (facteur - 1)
+    volatilites = facteurs.std(axis=1, ddof=1) * 100  # Forme (scénarios, trajectoires)
+    np.cumprod(facteurs, axis=1, out=facteurs)
+
+    # Percentiles sur l'axe des trajectoires : forme (percentiles, scénarios, mois)
+    bandes = np.percentile(facteurs, list(PERCENTILES.values()), axis=2) * valeur_initiale
+
+    # Drawdown maximal de chaque trajectoire : plus forte baisse depuis le plus haut atteint (valeur initiale comprise)
+    plus_hauts = np.maximum.accumulate(facteurs, axis=1)
+    np.maximum(plus_hauts, 1.0, out=plus_hauts)
+    np.divide(facteurs, plus_hauts, out=plus_hauts)  # Valeur / plus haut, calculé sur place
+    drawdowns = (1 - plus_hauts.min(axis=1)) * 100  # Forme (scénarios, trajectoires)
+    indicateurs = pd.DataFrame(
+        {
+            "Volatilité Mensuelle (%)": np.median(volatilites, axis=1),
+            "Maximum Drawdown (%)": np.median(drawdowns, axis=1),
+        },
+        index=noms,
+    )
+
+    # DataFrame indexé par mois, colonnes (Scénario, Percentile)
+    colonnes = pd.MultiIndex.from_product([noms, list(PERCENTILES)], names=["Scénario", "Percentile"])
+    valeurs = bandes.transpose(2, 1, 0).reshape(nb_mois, -1)  # (mois, scénarios x percentiles)
+    df_bandes = pd.DataFrame(valeurs, index=np.arange(1, nb_mois + 1), columns=colonnes)
+    df_bandes.index.name = "Mois"
+    return ResultatProjections(df_bandes, indicateurs)
+
+
+# --- Bandes de projection seules (courbes) ---
+def simuler_projections(valeur_initiale, nb_chemins=None, nb_mois=None, scenarios=None, rng=None):
+    return simuler_projections_detaillees(valeur_initiale, nb_chemins, nb_mois, scenarios, rng).bandes
+
+
+# --- Projection d'un portefeuille à partir de sa valeur totale (bandes et indicateurs par trajectoire) ---
+def projeter_portefeuille(portefeuille, nb_chemins=None, rng=None):
+    return simuler_projections_detaillees(portefeuille.valeur_totale(), nb_chemins=nb_chemins, rng=rng)
+
+
+# --- Trajectoire médiane (P50) de chaque scénario : colonnes Optimiste / Neutre / Pessimiste ---
+def trajectoires_medianes(bandes):
+    medianes = bandes.xs("P50", axis=1, level="Percentile")
+    medianes.columns.name = None
+    return medianes
@@ -0,0 +1,141 @@
+# --- Rapports en masse : une fiche Word et un classeur Excel par client ---
+# Exemple : exporter_rapports(clients, "rapports.zip") avec des clients
+# (identifiant, portefeuille, projections, stress_results, preferences[, montant_investi[, bandes[, indicateurs]]])
+import io  # Rapports générés en mémoire
+import multiprocessing  # Contexte "spawn" : processus propres, sans état hérité de l'appelant
+import os  # Dossiers de sortie
+import zipfile  # Sortie en archive zip (fichier ou flux)
+from collections import deque  # Fenêtre des rapports en cours de génération
+from concurrent.futures import ProcessPoolExecutor  # Génération en parallèle
+
+from config import Config  # Modèle Word, graphiques Excel et nom du fichier exporté
+from logger import setup_logger  # Logs de l'application
+from instrumentation import mesurer, ajouter_compteurs  # Durée totale de l'export
+
+logger = setup_logger()
+
+# Nom du fichier de chaque type de rapport (identique à l'export d'un seul portefeuille)
+FICHIERS_RAPPORTS = {
+    "word": "fiche_portefeuille.docx",
+    "excel": os.path.basename(Config.FICHIER_EXPORT),
+}
+
+
+# --- Générer les rapports d'un client en mémoire ; retourne {type de rapport: contenu (bytes)} ---
+# `indicateurs` : volatilité et drawdown par trajectoire (ResultatProjections.indicateurs)
+def generer_rapports_client(portefeuille, projections, stress_results, preferences, montant_investi=None,
+                            bandes=None, indicateurs=None, types=tuple(FICHIERS_RAPPORTS)):
+    from helpers.excel_utils import export_vers_excel  # Imports locaux : chargés dans le processus de travail
+    from helpers.word_generator import generer_fiche_portefeuille
+
+    if montant_investi is None:
+        montant_investi = portefeuille.valeur_totale()  # Montant par défaut : valeur du portefeuille
+
+    rapports = {}
+    for type_rapport in types:
+        tampon = io.BytesIO()
+        if type_rapport == "excel":
+            export_vers_excel(portefeuille, projections, stress_results, bandes, tampon, indicateurs=indicateurs)
+        elif type_rapport == "word":
+            generer_fiche_portefeuille(
+                portefeuille, projections, stress_results, preferences, montant_investi, bandes, tampon, indicateurs
+            )
+        else:
+            raise ValueError(f"Type de rapport inconnu : {type_rapport}")
+        rapports[type_rapport] = tampon.getvalue()
+    return rapports
+
+
+# --- Écriture en flux des rapports : un sous-dossier par client, dans un dossier ou une archive zip ---
+# `destination` : dossier, chemin se terminant par .zip, ou flux binaire (écrit en zip)
+class EcrivainRapports:
+    def __init__(self, destination):
+        self.nb_clients = 0
+        self._dossiers = set()  # Sous-dossiers déjà écrits (en minuscules : systèmes de fichiers insensibles à la casse)
+        if hasattr(destination, "write") or str(destination).endswith(".zip"):
+            # Les .docx / .xlsx sont déjà compressés : stockés tels quels dans l'archive
+            self._archive = zipfile.ZipFile(destination, "w", compression=zipfile.ZIP_STORED)
+            self.dossier = None
+        else:
+            self._archive = None
+            self.dossier = destination
+            os.makedirs(destination, exist_ok=True)
+
+    # Nom du sous-dossier d'un client : un seul niveau, jamais vide ni caché (".", ".." sortiraient de la destination)
+    # Un identifiant déjà écrit reçoit un suffixe (_2, _3...) plutôt que d'écraser les rapports précédents
+    def _dossier(self, identifiant):
+        base = str(identifiant).replace("/", "_").replace("\\", "_")
+        if not base or base.startswith("."):
+            base = "_" + base
+        dossier, numero = base, 1
+        while dossier.lower() in self._dossiers:
+            numero += 1
+            dossier = f"{base}_{numero}"
+        if dossier != base:
+            logger.warning(f"Identifiant client en double : {identifiant!r}, rapports écrits dans {dossier}")
+        self._dossiers.add(dossier.lower())
+        return dossier
+
+    # Écrire les rapports d'un client ({type de rapport: contenu})
+    def ecrire(self, identifiant, rapports):
+        identifiant = self._dossier(identifiant)
+        for type_rapport, contenu in rapports.items():
+            nom = FICHIERS_RAPPORTS[type_rapport]
+            if self._archive is not None:
+                self._archive.writestr(f"{identifiant}/{nom}", contenu)
+            else:
+                os.makedirs(os.path.join(self.dossier, identifiant), exist_ok=True)
+                with open(os.path.join(self.dossier, identifiant, nom), "wb") as f:
+                    f.write(contenu)
+        self.nb_clients += 1
+
+    # Fermer l'archive (rien à faire pour un dossier)
+    def fermer(self):
+        if self._archive is not None:
+            self._archive.close()
+
+
+# --- Initialisation de chaque processus : même configuration que l'appelant, modèle Word chargé une fois ---
+def _initialiser_worker(modele_word, graphiques_excel):
+    Config.MESURES_JOURNAL = False  # Pas une ligne de journal par rapport : seule la mesure totale est écrite
+    Config.MODELE_FICHE_WORD = modele_word
+    Config.GRAPHIQUES_EXCEL = graphiques_excel
+
+    from helpers.word_generator import ouvrir_modele
+    ouvrir_modele()  # Le modèle (et les styles Excel, au niveau du module) restent chargés pour tout le processus
+
+
+# --- Générer les rapports d'un client dans un processus de travail ---
+def _generer_client(client, types):
+    identifiant, *donnees = client
+    return identifiant, generer_rapports_client(*donnees, types=types)
+
+
+# --- Générer les rapports de tous les clients, en parallèle et en flux ---
+# Au plus `fenetre` clients sont en cours à la fois : la mémoire ne dépend pas du nombre de clients.
+# Retourne le nombre de clients exportés.
+@mesurer("rapports_masse")
+def exporter_rapports(clients, destination, types=tuple(FICHIERS_RAPPORTS), workers=None, fenetre=None):
+    workers = workers or os.cpu_count()
+    fenetre = fenetre or workers * 4
+    ecrivain = EcrivainRapports(destination)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initialiser_worker,
+            initargs=(Config.MODELE_FICHE_WORD, Config.GRAPHIQUES_EXCEL),
+        ) as executeur:
+            en_cours = deque()
+            for client in clients:
+                if len(en_cours) >= fenetre:
+                    ecrivain.ecrire(*en_cours.popleft().result())  # Écrits dans l'ordre des clients
+                en_cours.append(executeur.submit(_generer_client, client, types))
+            while en_cours:
+                ecrivain.ecrire(*en_cours.popleft().result())
+    finally:
+        ecrivain.fermer()
+
+    logger.info(f"Rapports de {ecrivain.nb_clients} clients exportés vers {destination}")
+    ajouter_compteurs(clients=ecrivain.nb_clients, workers=workers)
+    return ecrivain.nb_clients
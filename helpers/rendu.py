@@ -0,0 +1,101 @@
+# --- Rendu des graphiques : figures Matplotlib hors pyplot, images mises en cache par contenu ---
+# Utilisé par l'interface (st.image), l'export Excel (mode image) et la fiche Word.
+# Le cache est propre à chaque processus : les exports générés dans les processus de travail
+# (jobs, rapports en masse) ont leur propre cache et ne réutilisent pas les images de l'interface.
+import io  # Images rendues en mémoire
+import threading  # Cache partagé par les sessions Streamlit
+from collections import OrderedDict  # Cache borné (moins récemment utilisées évincées)
+
+import matplotlib
+matplotlib.use("Agg")  # Rendu non interactif : aucune fenêtre, aucun état global pyplot
+from matplotlib.figure import Figure  # Figures libérées dès qu'elles ne sont plus référencées
+import seaborn as sns  # Barres de la répartition sectorielle
+
+from config import Config  # Résolution et taille du cache
+from instrumentation import mesurer  # Durée des rendus (défauts de cache seulement)
+from helpers.projections import trajectoires_medianes  # Médianes des bandes de projection
+from helpers.empreinte import empreinte  # Clé des images en cache (contenu des données)
+
+# Images déjà rendues : (tracé, paramètres, format, résolution, empreinte des données) -> contenu (bytes)
+_rendus = OrderedDict()
+_verrou = threading.Lock()
+_compteurs = {"Appels": 0, "Rendus": 0}
+
+
+# --- Parts en % arrondies à 0,1 % (précision des étiquettes des camemberts) ---
+# Deux répartitions identiques à l'affichage donnent ainsi la même image, quel que soit le montant.
+def parts(serie):
+    return (serie / serie.sum() * 100).round(1)
+
+
+# --- Rendre tracer(ax, donnees, *parametres) en image (bytes), une seule fois par contenu ---
+def rendre(tracer, donnees, *parametres, format="png"):
+    dpi = Config.GRAPHIQUES_DPI  # Dans la clé : un changement de résolution ne sert pas d'anciennes images
+    cle = (tracer.__name__, parametres, format, dpi, empreinte(donnees))
+    with _verrou:
+        _compteurs["Appels"] += 1
+        if cle in _rendus:
+            _rendus.move_to_end(cle)
+            return _rendus[cle]
+
+    with mesurer("rendu_graphique", trace=tracer.__name__, format=format):
+        fig = Figure()  # Hors du registre pyplot : rien ne reste en mémoire après le rendu
+        tracer(fig.subplots(), donnees, *parametres)
+        tampon = io.BytesIO()
+        fig.savefig(tampon, format=format, dpi=dpi, bbox_inches="tight")
+        fig.clear()  # Libérer les artistes tout de suite
+        image = tampon.getvalue()
+
+    with _verrou:
+        _compteurs["Rendus"] += 1
+        _rendus[cle] = image
+        while len(_rendus) > Config.GRAPHIQUES_CACHE_MAX:
+            _rendus.popitem(last=False)
+    return image
+
+
+# --- Statistiques du cache (panneau de debug) ---
+def statistiques_rendu():
+    with _verrou:
+        return {**_compteurs, "Images en cache": len(_rendus)}
+
+
+# --- Tracés disponibles ---
+
+# Camembert (valeurs ou parts par groupe)
+def camembert(ax, serie, titre):
+    ax.pie(serie.to_numpy(), labels=[str(libelle) for libelle in serie.index], autopct='%1.1f%%')
+    ax.set_title(titre)
+
+
+# Barres verticales (une par groupe), libellés inclinés
+def barres(ax, serie, titre):
+    df = serie.reset_index()
+    sns.barplot(x=df.columns[0], y=df.columns[1], data=df, ax=ax)
+    ax.set_title(titre)
+    ax.tick_params(axis="x", labelrotation=45)  # Tourner les labels pour qu'ils soient lisibles
+
+
+# Trajectoire médiane de chaque scénario avec sa bande P5-P95
+def bandes_projection(ax, bandes, titre):
+    medianes = trajectoires_medianes(bandes)
+    for scenario in medianes.columns:
+        ligne, = ax.plot(medianes.index, medianes[scenario], label=scenario)
+        ax.fill_between(
+            bandes.index, bandes[(scenario, "P5")], bandes[(scenario, "P95")],
+            color=ligne.get_color(), alpha=0.2,
+        )
+    ax.legend()
+    ax.set_title(titre)
+    ax.set_xlabel("Mois")
+    ax.set_ylabel("Valeur ($)")
+
+
+# Une courbe par colonne
+def courbes(ax, df, titre, xlabel=None, ylabel=None):
+    df.plot(ax=ax)
+    ax.set_title(titre)
+    if xlabel:
+        ax.set_xlabel(xlabel)
+    if ylabel:
+        ax.set_ylabel(ylabel)
@@ -0,0 +1,162 @@
+# --- Imports nécessaires ---
+import os  # Chemin du fichier d'état des moments
+import threading  # Mise à jour de l'historique partagée par les sessions Streamlit
+from datetime import date  # Mise à jour de l'historique au plus une fois par jour
+from statistics import NormalDist  # Quantiles de la loi normale pour la VaR paramétrique
+
+import numpy as np  # Calculs matriciels (covariance, volatilité)
+import pandas as pd  # Mise en forme des indicateurs
+
+from config import Config  # Niveau de confiance et nombre de jours de bourse par an
+from repository.historique import HistoriquePrix  # Stockage local des clôtures journalières
+from repository.data_fetcher import fournisseur_actuel  # Source des nouveaux jours d'historique
+
+
+# --- Moteur de risque basé sur l'historique réel des clôtures ---
+# Les moments (nombre d'observations, somme des rendements, somme des produits croisés) sont
+# mis à jour uniquement avec les nouveaux jours : une journée supplémentaire coûte O(actifs²).
+class MoteurRisque:
+    # Constructeur : recharge l'état des moments s'il a déjà été calculé
+    def __init__(self, historique):
+        self.historique = historique  # HistoriquePrix source
+        self._chemin_etat = os.path.join(historique.dossier, "moments.npz")
+        self._reinitialiser()
+        if os.path.exists(self._chemin_etat):
+            etat = np.load(self._chemin_etat, allow_pickle=False)
+            if list(etat["tickers"]) == historique.tickers:  # Sinon l'univers a changé : recalcul complet
+                self.nb_obs = int(etat["nb_obs"])
+                self.nb_jours_traites = int(etat["nb_jours_traites"])
+                self.somme = etat["somme"]
+                self.somme_produits = etat["somme_produits"]
+        self._covariance = None  # Covariance en cache, invalidée à chaque synchronisation
+
+    # Remet les moments à zéro
+    def _reinitialiser(self):
+        nb_actifs = len(self.historique.tickers)
+        self.nb_obs = 0
+        self.nb_jours_traites = 0
+        self.somme = np.zeros(nb_actifs)
+        self.somme_produits = np.zeros((nb_actifs, nb_actifs))
+
+    # --- Intégrer les jours ajoutés au stockage depuis la dernière synchronisation ---
+    def synchroniser(self):
+        if self.somme.shape[0] != len(self.historique.tickers):
+            self._reinitialiser()  # Nouveaux tickers : recalcul complet
+        nb_jours = self.historique.nb_jours()
+        if nb_jours <= self.nb_jours_traites:
+            return 0
+
+        # Le dernier jour déjà traité sert de base au premier nouveau rendement
+        debut = max(self.nb_jours_traites - 1, 0)
+        rendements = self._rendements(np.asarray(self.historique.closes(debut)))
+        self.nb_obs += rendements.shape[0]
+        self.somme += rendements.sum(axis=0)
+        self.somme_produits += rendements.T @ rendements
+        self.nb_jours_traites = nb_jours
+        self._covariance = None
+
+        np.savez(
+            self._chemin_etat,
+            tickers=np.array(self.historique.tickers),
+            nb_obs=self.nb_obs,
+            nb_jours_traites=self.nb_jours_traites,
+            somme=self.somme,
+            somme_produits=self.somme_produits,
+        )
+        return rendements.shape[0]
+
+    # Rendements journaliers simples ; un cours manquant donne un rendement nul
+    @staticmethod
+    def _rendements(closes):
+        rendements = closes[1:] / closes[:-1] - 1
+        return np.nan_to_num(rendements, nan=0.0, posinf=0.0, neginf=0.0)
+
+    # --- Matrice de covariance journalière (calculée depuis les moments, mise en cache) ---
+    def covariance(self):
+        if self._covariance is None:
+            if self.nb_obs < 2:
+                raise ValueError("Historique insuffisant pour estimer la covariance")
+            moyenne = self.somme / self.nb_obs
+            self._covariance = (self.somme_produits - self.nb_obs * np.outer(moyenne, moyenne)) / (self.nb_obs - 1)
+        return self._covariance
+
+    # Rendement moyen journalier de chaque actif
+    def moyennes(self):
+        return self.somme / max(self.nb_obs, 1)
+
+    # Poids du portefeuille alignés sur les tickers du stockage (les positions inconnues sont ignorées)
+    def poids(self, portefeuille):
+        df = portefeuille.composition()
+        valeurs = df.groupby("Nom")["Valeur Totale"].sum()
+        poids = valeurs.reindex(self.historique.tickers).fillna(0).to_numpy()
+        total = poids.sum()
+        return poids / total if total else poids
+
+    # Volatilité annualisée du portefeuille : sqrt(w' Σ w x jours de bourse)
+    def volatilite(self, poids):
+        return float(np.sqrt(poids @ self.covariance() @ poids * Config.JOURS_BOURSE_PAR_AN))
+
+    # VaR et CVaR paramétriques (loi normale) sur un jour, en fraction de la valeur
+    def var_parametrique(self, poids, niveau=None):
+        niveau = niveau or Config.NIVEAU_VAR
+        moyenne = float(self.moyennes() @ poids)
+        ecart_type = float(np.sqrt(poids @ self.covariance() @ poids))
+        loi = NormalDist()
+        z = loi.inv_cdf(1 - niveau)
+        var = -(moyenne + z * ecart_type)
+        cvar = -(moyenne - ecart_type * loi.pdf(z) / (1 - niveau))
+        return var, cvar
+
+    # VaR et CVaR historiques sur un jour, à partir des rendements réels du portefeuille
+    def var_historique(self, poids, niveau=None):
+        niveau = niveau or Config.NIVEAU_VAR
+        rendements = self._rendements(np.asarray(self.historique.closes())) @ poids
+        if rendements.size == 0:
+            raise ValueError("Historique insuffisant pour la VaR historique")
+        seuil = np.quantile(rendements, 1 - niveau)
+        return float(-seuil), float(-rendements[rendements <= seuil].mean())
+
+    # --- Tableau des indicateurs de risque d'un portefeuille ---
+    def analyse(self, portefeuille, niveau=None):
+        niveau = niveau or Config.NIVEAU_VAR
+        poids = self.poids(portefeuille)
+        valeur = portefeuille.valeur_totale()
+        var_p, cvar_p = self.var_parametrique(poids, niveau)
+        var_h, cvar_h = self.var_historique(poids, niveau)
+        pourcentage = int(niveau * 100)
+        return pd.DataFrame(
+            {
+                "Valeur (%)": [self.volatilite(poids) * 100, var_h * 100, cvar_h * 100, var_p * 100, cvar_p * 100],
+                "Valeur ($)": [None, var_h * valeur, cvar_h * valeur, var_p * valeur, cvar_p * valeur],
+            },
+            index=[
+                "Volatilité annualisée",
+                f"VaR historique {pourcentage}% (1 jour)",
+                f"CVaR historique {pourcentage}% (1 jour)",
+                f"VaR paramétrique {pourcentage}% (1 jour)",
+                f"CVaR paramétrique {pourcentage}% (1 jour)",
+            ],
+        )
+
+
+# Moteur partagé par l'application et date de la dernière mise à jour de l'historique
+_moteur = None
+_derniere_maj = None
+_verrou = threading.Lock()  # Une seule mise à jour à la fois (fichiers de l'historique et des moments)
+
+
+# --- Retourner le moteur de risque, après avoir ajouté les jours manquants de l'historique ---
+# Sous verrou : deux sessions ne peuvent pas ajouter les mêmes jours ni écrire les moments en même temps.
+def moteur_risque(tickers):
+    global _moteur, _derniere_maj
+    with _verrou:
+        if _moteur is None:
+            _moteur = MoteurRisque(HistoriquePrix(Config.DOSSIER_HISTORIQUE))
+
+        # Une mise à jour par jour suffit : les clôtures ne changent qu'une fois par séance
+        nouveaux_tickers = [t for t in tickers if t not in _moteur.historique.tickers]
+        if _derniere_maj != date.today() or nouveaux_tickers:
+            _moteur.historique.mettre_a_jour(list(tickers), fournisseur_actuel())
+            _derniere_maj = date.today()
+        _moteur.synchroniser()
+        return _moteur
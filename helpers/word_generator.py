@@ -1,175 +1,238 @@
 # --- Imports nécessaires ---
+import copy  # Copie de la ligne prototype des tableaux du modèle
+import io  # Pour manipuler des flux (modèle et images) en mémoire
+import os  # Chemin du modèle par défaut
+import re  # Repérage des champs {nom} du modèle
+from functools import lru_cache  # Modèle lu une seule fois par processus
+
 from docx import Document  # Pour créer et manipuler des documents Word
-from docx.shared import Pt, Inches  # Pour gérer la taille des polices et des images
+from docx.oxml.ns import qn  # Noms qualifiés des balises WordprocessingML
+from docx.shared import Inches  # Pour gérer la taille des images
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT  # Pour aligner du texte (ex: centré)
-import matplotlib.pyplot as plt  # Pour créer des graphiques
 import pandas as pd  # Pour manipuler des DataFrames
-import io  # Pour manipuler des flux d'images en mémoire
 
-# --- Fonction principale pour générer la fiche Word ---
-def generer_fiche_portefeuille(portefeuille, projections, stress_results, preferences, montant_investi):
-    doc = Document()  # Crée un nouveau document Word vide
+from config import Config  # Modèle Word choisi
+from instrumentation import mesurer, ajouter_compteurs  # Durée de la génération
+from helpers.analytics import analyse_quantitative  # Indicateurs partagés avec l'interface et Excel
+from helpers.rendu import rendre, parts, camembert  # Camembert mis en cache (même tracé que l'interface)
 
-    # --- Titre principal du document ---
-    titre = doc.add_heading('Fiche de Portefeuille Client', level=1)  # Titre de niveau 1
-    titre.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER  # Centrer le titre
+# Modèle fourni avec le projet (mise en forme, titres et tableaux vides à remplir)
+MODELE_DEFAUT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "fiche_portefeuille.docx")
 
-    doc.add_paragraph()  # Ajouter un espace
+# Tableaux du modèle, dans l'ordre du document : (style, entêtes)
+TABLEAUX_MODELE = (
+    ('Light List Accent 1', ('Type d\'Actif', 'Valeur Totale ($)')),
+    ('Light List Accent 2', ('Secteur', 'Valeur Totale ($)')),
+    ('Light List Accent 3', ('Zone Géographique', 'Valeur Totale ($)')),
+    ('Light List Accent 4', ('Indicateur', 'Valeur')),
+    ('Light List Accent 6', ('Scénario', 'P5 ($)', 'P50 ($)', 'P95 ($)')),
+    ('Light List Accent 5', ('Scénario', 'Perte (%)')),
+)
+TABLEAU_TYPE, TABLEAU_SECTEUR, TABLEAU_ZONE, TABLEAU_ANALYSE, TABLEAU_BANDES, TABLEAU_STRESS = range(len(TABLEAUX_MODELE))
 
-    # --- Section Profil Investisseur ---
-    doc.add_heading('Profil de l\'investisseur', level=2)  # Titre de niveau 2
-    doc.add_paragraph(f"Objectif Financier : {preferences.objectif}")  # Ajouter l'objectif
-    doc.add_paragraph(f"Horizon d'Investissement : {preferences.horizon} ans")  # Ajouter l'horizon
-    doc.add_paragraph(f"Tolérance au Risque : {preferences.tolerance}")  # Ajouter la tolérance au risque
-    doc.add_paragraph(f"Montant investi : {montant_investi:,} $")  # Ajouter le montant investi
 
-    doc.add_paragraph()  # Ajouter un espace
+# --- Construire le modèle Word (titres, textes à compléter et tableaux avec une ligne prototype) ---
+# `destination` : chemin du fichier ou flux binaire ; par défaut templates/fiche_portefeuille.docx
+def construire_modele(destination=None):
+    doc = Document()  # Document vide avec les styles par défaut de python-docx
 
-    # --- Petit résumé commercial automatique ---
-    doc.add_heading('Résumé général', level=2)  # Titre de niveau 2
-    paragraphe = (
-        f"Votre portefeuille vise une croissance dynamique tout en maîtrisant les risques. "
-        f"Il est diversifié entre plusieurs types d'actifs, couvrant différentes zones géographiques et secteurs économiques. "
-        f"Cette allocation permet d'équilibrer rendement potentiel et gestion prudente des risques."
-    )
-    doc.add_paragraph(paragraphe)  # Ajouter le texte de résumé
-
-    doc.add_paragraph()  # Ajouter un espace
-
-    # --- Section Composition par Type d'Actif ---
-    doc.add_heading('Composition par Type d\'Actif', level=2)  # Titre de niveau 2
-    df = portefeuille.composition()  # Récupérer la composition du portefeuille
-    if not df.empty:  # Si le portefeuille n'est pas vide
-        composition = df.groupby("Type")["Valeur Totale"].sum()  # Regrouper par Type
-        table = doc.add_table(rows=1, cols=2)  # Créer une table Word
-        table.style = 'Light List Accent 1'  # Style visuel
-
-        # Remplir l'entête
-        hdr_cells = table.rows[0].cells
-        hdr_cells[0].text = 'Type d\'Actif'
-        hdr_cells[1].text = 'Valeur Totale ($)'
-
-        # Remplir les données de composition
-        for idx, val in composition.items():
-            row_cells = table.add_row().cells
-            row_cells[0].text = str(idx)
-            row_cells[1].text = f"{val:,.2f}"
+    # --- Titre principal du document ---
+    titre = doc.add_heading('Fiche de Portefeuille Client', level=1)  # Titre de niveau 1
+    titre.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER  # Centrer le titre
 
     doc.add_paragraph()  # Ajouter un espace
 
-    # --- Section Répartition Sectorielle ---
-    doc.add_heading('Répartition Sectorielle', level=2)  # Titre
-    secteur = df.groupby("Secteur")["Valeur Totale"].sum()  # Regrouper par Secteur
-    table = doc.add_table(rows=1, cols=2)  # Nouvelle table
-    table.style = 'Light List Accent 2'  # Style différent
-
-    # Remplir l'entête
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'Secteur'
-    hdr_cells[1].text = 'Valeur Totale ($)'
-
-    # Remplir les lignes du tableau
-    for idx, val in secteur.items():
-        row_cells = table.add_row().cells
-        row_cells[0].text = str(idx)
-        row_cells[1].text = f"{val:,.2f}"
+    # --- Section Profil Investisseur (champs {…} complétés à la génération) ---
+    doc.add_heading('Profil de l\'investisseur', level=2)
+    doc.add_paragraph("Objectif Financier : {objectif}")
+    doc.add_paragraph("Horizon d'Investissement : {horizon} ans")
+    doc.add_paragraph("Tolérance au Risque : {tolerance}")
+    doc.add_paragraph("Montant investi : {montant} $")
 
     doc.add_paragraph()  # Ajouter un espace
 
-    # --- Section Répartition Géographique ---
-    doc.add_heading('Répartition Géographique', level=2)  # Titre
-    geo = df.groupby("Zone Géographique")["Valeur Totale"].sum()  # Regrouper par zone
-    table = doc.add_table(rows=1, cols=2)  # Nouvelle table
-    table.style = 'Light List Accent 3'  # Autre style
-
-    # Remplir l'entête
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'Zone Géographique'
-    hdr_cells[1].text = 'Valeur Totale ($)'
-
-    # Remplir les données
-    for idx, val in geo.items():
-        row_cells = table.add_row().cells
-        row_cells[0].text = str(idx)
-        row_cells[1].text = f"{val:,.2f}"
+    # --- Petit résumé commercial ---
+    doc.add_heading('Résumé général', level=2)
+    doc.add_paragraph(
+        "Votre portefeuille vise une croissance dynamique tout en maîtrisant les risques. "
+        "Il est diversifié entre plusieurs types d'actifs, couvrant différentes zones géographiques et secteurs économiques. "
+        "Cette allocation permet d'équilibrer rendement potentiel et gestion prudente des risques."
+    )
 
     doc.add_paragraph()  # Ajouter un espace
 
-    # --- Section Analyse Quantitative ---
-    doc.add_heading('Analyse Quantitative', level=2)  # Titre
-    valeur_initiale = projections.iloc[0]  # Valeur de départ
-    valeur_finale = projections.iloc[-1]  # Valeur finale
+    # --- Sections à tableau : titre, tableau (entête + ligne prototype), espace ---
+    titres = (
+        'Composition par Type d\'Actif',
+        'Répartition Sectorielle',
+        'Répartition Géographique',
+        'Analyse Quantitative',
+        'Projections à 24 mois (P5 / P50 / P95)',
+        'Stress Tests - Pertes Maximales',
+    )
+    for titre_section, (style, entetes) in zip(titres, TABLEAUX_MODELE):
+        doc.add_heading(titre_section, level=2)
+        table = doc.add_table(rows=2, cols=len(entetes))
+        table.style = style
+        for cellule, entete in zip(table.rows[0].cells, entetes):
+            cellule.text = entete
+        for cellule in table.rows[1].cells:
+            cellule.text = "-"  # Un texte par cellule : remplacé par les valeurs à la génération
+        doc.add_paragraph()  # Ajouter un espace
+
+    # --- Graphique de Répartition (image ajoutée à la fin du document) ---
+    doc.add_heading('Graphique de Répartition', level=2)
+
+    alleger_modele(doc)
+    doc.save(destination or MODELE_DEFAUT)
+
+
+# --- Alléger le modèle : seulement les styles utilisés et les parties indispensables ---
+# Le modèle par défaut de python-docx pèse ~800 Ko de XML (styles, stylesWithEffects…), relus et recompressés à chaque fiche.
+def alleger_modele(doc):
+    # Styles référencés par le document, puis ceux dont ils héritent (basedOn / next / link)
+    styles = doc.styles.element
+    utilises = {
+        element.get(qn("w:val"))
+        for balise in ("w:pStyle", "w:rStyle", "w:tblStyle")
+        for element in doc.element.body.iter(qn(balise))
+    }
+    par_id = {style.get(qn("w:styleId")): style for style in styles.iterchildren(qn("w:style"))}
+    utilises |= {style_id for style_id, style in par_id.items() if style.get(qn("w:default")) == "1"}
+    a_visiter = list(utilises)
+    while a_visiter:
+        style = par_id.get(a_visiter.pop())
+        if style is None:
+            continue
+        for balise in ("w:basedOn", "w:next", "w:link"):
+            lien = style.find(qn(balise))
+            if lien is not None and lien.get(qn("w:val")) not in utilises:
+                utilises.add(lien.get(qn("w:val")))
+                a_visiter.append(lien.get(qn("w:val")))
+    for style_id, style in par_id.items():
+        if style_id not in utilises:
+            styles.remove(style)
+    for latents in styles.findall(qn("w:latentStyles")):
+        styles.remove(latents)
+
+    # Parties facultatives : styles Word 2010, miniature et données personnalisées
+    for proprietaire in (doc.part, doc.part.package):
+        for rId, relation in list(proprietaire.rels.items()):
+            if relation.reltype.rsplit("/", 1)[-1] in ("stylesWithEffects", "thumbnail", "customXml"):
+                del proprietaire.rels[rId]
+
+
+# --- Contenu du modèle, lu une fois par processus (construit en mémoire si le fichier est absent) ---
+@lru_cache(maxsize=None)
+def _octets_modele(chemin):
+    if os.path.exists(chemin):
+        with open(chemin, "rb") as f:
+            return f.read()
+    tampon = io.BytesIO()
+    construire_modele(tampon)
+    return tampon.getvalue()
+
+
+# --- Nouveau document ouvert à partir du modèle configuré ---
+def ouvrir_modele(chemin=None):
+    return Document(io.BytesIO(_octets_modele(chemin or Config.MODELE_FICHE_WORD or MODELE_DEFAUT)))
+
+
+# --- Remplir un tableau du modèle en une fois : la ligne prototype est copiée pour chaque ligne de valeurs ---
+def remplir_tableau(table, lignes):
+    tbl = table._tbl
+    prototype = table.rows[-1]._tr
+    tbl.remove(prototype)
+    nouvelles = []
+    for ligne in lignes:
+        tr = copy.deepcopy(prototype)
+        for tc, texte in zip(tr.iterchildren(qn("w:tc")), ligne):
+            tc.find(".//" + qn("w:t")).text = texte
+        nouvelles.append(tr)
+    tbl.extend(nouvelles)
+
+
+# --- Retirer une section à tableau (titre, tableau et espace qui suit) ---
+def retirer_section(table):
+    tbl = table._tbl
+    for element in (tbl.getprevious(), tbl.getnext(), tbl):
+        element.getparent().remove(element)
+
+
+# Champ du modèle : un nom entre accolades, ex. {objectif}
+CHAMP_MODELE = re.compile(r"\{(\w+)\}")
+
+
+# --- Compléter les champs {…} des paragraphes du modèle ---
+# Seuls les champs connus sont remplacés : tout autre texte entre accolades est laissé tel quel
+def completer_champs(doc, valeurs):
+    def remplacer(champ):
+        nom = champ.group(1)
+        return str(valeurs[nom]) if nom in valeurs else champ.group(0)
+
+    for texte in doc.element.body.iter(qn("w:t")):
+        if texte.text and "{" in texte.text:
+            texte.text = CHAMP_MODELE.sub(remplacer, texte.text)
 
-    # Calculs quantitatifs
-    rendement_total = ((valeur_finale - valeur_initiale) / valeur_initiale) * 100
-    cagr = ((valeur_finale / valeur_initiale) ** (1 / 2) - 1) * 100  # CAGR sur 2 ans
-    volatilite_mensuelle = projections.pct_change().std() * 100  # Volatilité
-    max_drawdown = (projections.cummax() - projections).max() / projections.cummax().max() * 100  # Drawdown max
 
-    # Regrouper dans un dictionnaire
+# --- Fonction principale pour générer la fiche Word ---
+# `destination` : chemin du fichier ou flux binaire (ex. io.BytesIO) ; par défaut fiche_portefeuille.docx
+# `indicateurs` : volatilité et drawdown par trajectoire (ResultatProjections.indicateurs) pour l'analyse
+@mesurer("export_word")
+def generer_fiche_portefeuille(portefeuille, projections, stress_results, preferences, montant_investi, bandes=None,
+                               destination=None, indicateurs=None):
+    doc = ouvrir_modele()  # Modèle déjà mis en forme
+    ajouter_compteurs(positions=len(portefeuille))
+    tables = doc.tables
+
+    # --- Profil Investisseur ---
+    completer_champs(doc, {
+        "objectif": preferences.objectif,
+        "horizon": preferences.horizon,
+        "tolerance": preferences.tolerance,
+        "montant": f"{montant_investi:,}",
+    })
+
+    # --- Répartitions par Type, Secteur et Zone (valeurs déjà agrégées par le portefeuille) ---
+    composition = portefeuille.expositions("type")
+    for numero, dimension in ((TABLEAU_TYPE, "type"), (TABLEAU_SECTEUR, "secteur"), (TABLEAU_ZONE, "zone")):
+        valeurs = composition if dimension == "type" else portefeuille.expositions(dimension)
+        remplir_tableau(tables[numero], [(str(idx), f"{val:,.2f}") for idx, val in valeurs.items()])
+    if composition.empty:
+        tables[TABLEAU_TYPE]._tbl.getparent().remove(tables[TABLEAU_TYPE]._tbl)  # Pas de tableau si portefeuille vide
+
+    # --- Analyse Quantitative : moyenne des scénarios pour chaque indicateur ---
+    analyse = analyse_quantitative(projections, indicateurs)  # Indicateurs déjà calculés pour l'interface et Excel
     analyse_data = {
-        "Rendement Total (%)": rendement_total,
-        "CAGR (%)": cagr,
-        "Volatilité Mensuelle (%)": volatilite_mensuelle.mean(),
-        "Maximum Drawdown (%)": max_drawdown.mean(),
+        "Rendement Total (%)": analyse["Rendement Total (%)"],
+        "CAGR (%)": analyse["CAGR (%)"],
+        "Volatilité Mensuelle (%)": analyse["Volatilité Mensuelle (%)"].mean(),
+        "Maximum Drawdown (%)": analyse["Maximum Drawdown (%)"].mean(),
     }
-
-    # Créer la table
-    table = doc.add_table(rows=1, cols=2)
-    table.style = 'Light List Accent 4'
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'Indicateur'
-    hdr_cells[1].text = 'Valeur'
-
-    # Remplir la table
-    for idx, val in analyse_data.items():
-        if isinstance(val, pd.Series):
-            val = val.mean()  # Si jamais c'est une série
-        row_cells = table.add_row().cells
-        row_cells[0].text = str(idx)
-        row_cells[1].text = f"{val:.2f}"
-
-    doc.add_paragraph()  # Ajouter un espace
-
-    # --- Section Stress Tests ---
-    doc.add_heading('Stress Tests - Pertes Maximales', level=2)
-    pertes = {}
-
-    # Calculer les pertes pour chaque scénario
-    for col in stress_results.columns:
-        valeur_init = stress_results[col].iloc[0]
-        valeur_fin = stress_results[col].iloc[-1]
-        perte = ((valeur_init - valeur_fin) / valeur_init) * 100
-        pertes[col] = perte
-
-    # Créer la table
-    table = doc.add_table(rows=1, cols=2)
-    table.style = 'Light List Accent 5'
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'Scénario'
-    hdr_cells[1].text = 'Perte (%)'
-
-    # Remplir les données
-    for idx, val in pertes.items():
-        row_cells = table.add_row().cells
-        row_cells[0].text = str(idx)
-        row_cells[1].text = f"{val:.2f}"
-
-    doc.add_paragraph()  # Ajouter un espace
+    moyennes = {idx: val.mean() if isinstance(val, pd.Series) else val for idx, val in analyse_data.items()}
+    remplir_tableau(tables[TABLEAU_ANALYSE], [
+        (str(idx), "-" if pd.isna(val) else f"{val:.2f}") for idx, val in moyennes.items()  # "-" : non calculé
+    ])
+
+    # --- Fourchettes de Projection (Monte Carlo) : une ligne par scénario ---
+    if bandes is not None:
+        finales = bandes.iloc[-1]  # Valeurs du dernier mois
+        valeurs = dict(finales.items())  # (scénario, percentile) -> valeur, sans recherche dans le MultiIndex
+        remplir_tableau(tables[TABLEAU_BANDES], [
+            (str(scenario), *(f"{valeurs[(scenario, p)]:,.2f}" for p in ("P5", "P50", "P95")))
+            for scenario in finales.index.get_level_values("Scénario").unique()
+        ])
+    else:
+        retirer_section(tables[TABLEAU_BANDES])
+
+    # --- Stress Tests : perte entre la première et la dernière valeur de chaque scénario ---
+    valeurs = stress_results.to_numpy(dtype=float)
+    pertes = (valeurs[0] - valeurs[-1]) / valeurs[0] * 100
+    remplir_tableau(tables[TABLEAU_STRESS], [(str(col), f"{val:.2f}") for col, val in zip(stress_results.columns, pertes)])
 
     # --- Graphique de Répartition par Type d'Actif ---
-    doc.add_heading('Graphique de Répartition', level=2)  # Titre
-    fig, ax = plt.subplots()
-    df.groupby("Type")["Valeur Totale"].sum().plot.pie(autopct='%1.1f%%', ax=ax)  # Pie chart
-    ax.set_ylabel("")  # Pas de label sur l'axe Y
-    ax.set_title("Répartition par Type d'Actif")  # Titre du graphique
-
-    img_stream = io.BytesIO()  # Stocker l'image en mémoire
-    fig.savefig(img_stream, format='png')
-    img_stream.seek(0)
-
-    from docx.shared import Inches  # (Déjà importé en haut, mais redemandé ici)
-    doc.add_picture(img_stream, width=Inches(5))  # Ajouter l'image au Word
+    image = rendre(camembert, parts(composition), "Répartition par Type d'Actif")  # Même image que l'interface
+    doc.add_picture(io.BytesIO(image), width=Inches(5))  # Ajouter l'image au Word
 
     # --- Sauvegarder le document Word ---
-    doc.save("fiche_portefeuille.docx")
+    doc.save(destination or "fiche_portefeuille.docx")
@@ -0,0 +1,156 @@
+# --- Instrumentation : mesure de la durée des étapes (prix, construction, simulations, exports) ---
+# Exemple : with mesurer("prix", tickers=18): ...   ou   @mesurer("construction") sur une fonction
+import contextvars  # Mesure en cours et collecte, propres à chaque thread (sessions Streamlit)
+import functools  # Métadonnées des fonctions décorées
+import os  # Dossier des profils
+import time  # Chronométrage
+from itertools import count  # Numéro des fichiers de profil
+from contextlib import contextmanager  # Collecte des mesures d'un bloc
+
+from config import Config  # Journal et profilage activés ou non
+from logger import setup_logger, setup_logger_mesures  # Logs de l'application et journal des mesures
+
+logger = setup_logger()
+journal = setup_logger_mesures()
+
+# Mesures ouvertes (de la plus externe à la plus interne) et liste où recueillir les mesures terminées
+_pile = contextvars.ContextVar("pile_mesures", default=())
+_collecte = contextvars.ContextVar("collecte_mesures", default=None)
+_numeros = count(1)  # Deux profils de la même seconde ne s'écrasent pas
+
+
+# --- Une mesure : nom de l'étape, compteurs (tickers, positions, trajectoires...) et durée ---
+class Mesure:
+    def __init__(self, nom, **compteurs):
+        self.nom = nom
+        self.compteurs = compteurs
+        self.parent = None  # Nom de la mesure englobante
+        self.profondeur = 0  # Niveau d'imbrication (0 = mesure racine)
+        self.debut = None  # Instant de départ (time.perf_counter)
+        self.duree = None  # Durée en secondes, connue à la sortie
+        self.erreur = None  # Nom de l'exception levée pendant l'étape, le cas échéant
+
+    # Ajouter des compteurs connus en cours d'étape
+    def ajouter(self, **compteurs):
+        self.compteurs.update(compteurs)
+
+    def __enter__(self):
+        pile = _pile.get()
+        if pile:
+            self.parent = pile[-1].nom
+            self.profondeur = len(pile)
+        self._jeton = _pile.set(pile + (self,))
+        self._profileur = _demarrer_profilage() if not pile and Config.PROFILAGE else None
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, type_exception, exception, trace):
+        self.duree = time.perf_counter() - self.debut
+        _pile.reset(self._jeton)
+        if self._profileur is not None:
+            _arreter_profilage(self._profileur, self.nom)
+        if type_exception is not None:
+            self.erreur = type_exception.__name__
+
+        collecte = _collecte.get()
+        if collecte is not None:
+            collecte.append(self)
+        if Config.MESURES_JOURNAL:
+            journal.info("mesure", extra={"donnees": self.en_dict()})
+        return False  # Ne jamais masquer l'exception
+
+    # Champs de la mesure (journal JSON et panneau de l'interface)
+    def en_dict(self):
+        return {
+            "mesure": self.nom,
+            "duree_ms": round(self.duree * 1000, 3),
+            "parent": self.parent,
+            "profondeur": self.profondeur,
+            **self.compteurs,
+            **({"erreur": self.erreur} if self.erreur else {}),
+        }
+
+
+# --- Mesurer une étape : context manager ou décorateur ---
+# Chaque bloc `with` et chaque appel d'une fonction décorée crée sa propre Mesure
+# (appels concurrents ou imbriqués) ; `with mesurer(...) as mesure` donne la Mesure en cours.
+class _Mesurer:
+    def __init__(self, nom, compteurs):
+        self.nom = nom
+        self.compteurs = compteurs
+        self._ouvertes = []  # Mesures des blocs `with` en cours, de la plus ancienne à la plus récente
+
+    def _nouvelle(self):
+        return Mesure(self.nom, **self.compteurs)
+
+    def __call__(self, fonction):
+        @functools.wraps(fonction)
+        def fonction_mesuree(*args, **kwargs):
+            with self._nouvelle():
+                return fonction(*args, **kwargs)
+        return fonction_mesuree
+
+    def __enter__(self):
+        mesure = self._nouvelle()
+        self._ouvertes.append(mesure)
+        return mesure.__enter__()
+
+    def __exit__(self, type_exception, exception, trace):
+        return self._ouvertes.pop().__exit__(type_exception, exception, trace)
+
+
+def mesurer(nom, **compteurs):
+    return _Mesurer(nom, compteurs)
+
+
+# --- Ajouter des compteurs à la mesure en cours (sans effet hors mesure) ---
+def ajouter_compteurs(**compteurs):
+    pile = _pile.get()
+    if pile:
+        pile[-1].ajouter(**compteurs)
+
+
+# --- Recueillir les mesures terminées dans le bloc (ex. une construction dans l'interface) ---
+@contextmanager
+def collecter():
+    mesures = []
+    jeton = _collecte.set(mesures)
+    try:
+        yield mesures
+    finally:
+        _collecte.reset(jeton)
+
+
+# --- Profilage des mesures racines : "cprofile" (fichier .prof) ou "pyinstrument" (page HTML) ---
+def _demarrer_profilage():
+    if Config.PROFILAGE == "cprofile":
+        import cProfile
+        profileur = cProfile.Profile()
+        profileur.enable()
+        return profileur
+    if Config.PROFILAGE == "pyinstrument":
+        try:
+            from pyinstrument import Profiler  # Dépendance optionnelle
+        except ImportError:
+            logger.warning("pyinstrument n'est pas installé : profilage désactivé")
+            return None
+        profileur = Profiler()
+        profileur.start()
+        return profileur
+    logger.warning(f"Profileur inconnu : {Config.PROFILAGE}")
+    return None
+
+
+def _arreter_profilage(profileur, nom):
+    os.makedirs(Config.PROFILAGE_DOSSIER, exist_ok=True)
+    base = os.path.join(Config.PROFILAGE_DOSSIER, f"{nom}_{time.strftime('%Y%m%d-%H%M%S')}_{next(_numeros)}")
+    if Config.PROFILAGE == "cprofile":
+        profileur.disable()
+        chemin = base + ".prof"
+        profileur.dump_stats(chemin)  # Lecture : python -m pstats <fichier> ou snakeviz
+    else:
+        profileur.stop()
+        chemin = base + ".html"
+        with open(chemin, "w", encoding="utf-8") as f:
+            f.write(profileur.output_html())
+    logger.info(f"Profil de « {nom} » enregistré dans {chemin}")
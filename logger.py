@@ -1,4 +1,5 @@
 # --- Import de la librairie pour gérer les logs ---
+import json  # Journal des mesures au format JSON
 import logging  # Permet de capturer des événements (infos, erreurs) pendant l'exécution du programme
 
 
@@ -32,3 +33,30 @@ def setup_logger():
 
     # Retourner le logger prêt à être utilisé partout dans l'application
     return logger
+
+
+# --- Format JSON : une ligne par événement, avec les champs passés dans extra={"donnees": {...}} ---
+class FormateurJSON(logging.Formatter):
+    def format(self, record):
+        evenement = {
+            "horodatage": self.formatTime(record),
+            "niveau": record.levelname,
+            "message": record.getMessage(),
+            **getattr(record, "donnees", {}),
+        }
+        return json.dumps(evenement, ensure_ascii=False, default=str)
+
+
+# --- Logger du journal des mesures (durées des étapes), au format JSON ---
+def setup_logger_mesures():
+    logger = logging.getLogger("portefeuille_mesures")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # Lignes JSON uniquement, sans le format texte des autres logs
+
+    if not logger.handlers:
+        ch = logging.StreamHandler()
+        ch.setLevel(logging.INFO)
+        ch.setFormatter(FormateurJSON())
+        logger.addHandler(ch)
+
+    return logger
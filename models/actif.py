@@ -1,5 +1,8 @@
 # Définition de la classe Actif pour représenter un actif financier (ex: action, obligation, ETF, etc.)
 class Actif:
+    # Attributs fixes : pas de __dict__ par instance, moins de mémoire pour les grands portefeuilles
+    __slots__ = ("nom", "prix", "quantite", "type_actif", "secteur", "zone_geo")
+
     # Constructeur de la classe (initialisation des attributs)
     def __init__(self, nom, prix, quantite, type_actif, secteur, zone_geo):
         self.nom = nom  # Nom ou ticker de l'actif (ex: AAPL, MSFT)
@@ -1,29 +1,168 @@
 # Import de la librairie pandas pour manipuler facilement des tableaux (DataFrame)
 import pandas as pd
 
+# Import de numpy pour stocker les positions en colonnes
+import numpy as np
+
+# Import de la classe Actif pour reconstruire les positions à la demande
+from models.actif import Actif
+
+# Attributs catégoriels d'un actif, stockés sous forme de codes entiers
+ATTRIBUTS_CATEGORIELS = ("type_actif", "secteur", "zone_geo")
+
+# Dimensions d'exposition disponibles : attributs regroupés et nom des colonnes correspondantes
+DIMENSIONS_EXPOSITION = {
+    "type": (("type_actif",), ("Type",)),
+    "secteur": (("secteur",), ("Secteur",)),
+    "zone": (("zone_geo",), ("Zone Géographique",)),
+    "type_zone": (("type_actif", "zone_geo"), ("Type", "Zone Géographique")),
+}
+
+
 # Définition de la classe Portefeuille pour gérer un ensemble d'actifs financiers
+# Les positions sont stockées en colonnes (tableaux NumPy) plutôt qu'en liste d'objets Actif.
 class Portefeuille:
     # Constructeur : initialise le portefeuille vide
-    def __init__(self):
-        self.actifs = []  # Liste pour stocker les actifs du portefeuille
+    def __init__(self, capacite=16):
+        self._taille = 0  # Nombre de positions
+        self._noms = []  # Noms (tickers) des actifs
+        self._prix = np.empty(capacite, dtype=np.float64)  # Prix unitaires
+        self._quantites = np.empty(capacite, dtype=np.int64)  # Quantités détenues
+        self._codes = {attribut: np.empty(capacite, dtype=np.int32) for attribut in ATTRIBUTS_CATEGORIELS}
+        self._categories = {attribut: [] for attribut in ATTRIBUTS_CATEGORIELS}  # Code -> libellé
+        self._index_categories = {attribut: {} for attribut in ATTRIBUTS_CATEGORIELS}  # Libellé -> code
+
+        # Expositions agrégées tenues à jour à chaque ajout / retrait : {dimension: {groupe: [valeur, nb]}}
+        self._expositions = {dimension: {} for dimension in DIMENSIONS_EXPOSITION}
+
+        self.version = 0  # Incrémentée à chaque modification, sert à invalider les caches
+        self._composition = None  # (version, DataFrame) de la dernière composition calculée
+
+    # Nombre de positions du portefeuille
+    def __len__(self):
+        return self._taille
+
+    # Sérialisation (pickle) sans la composition en cache, recalculée à la demande
+    def __getstate__(self):
+        etat = self.__dict__.copy()
+        etat["_composition"] = None
+        return etat
+
+    # Agrandit les tableaux (doublement de capacité) si nécessaire
+    def _reserver(self, taille):
+        capacite = len(self._prix)
+        if taille <= capacite:
+            return
+        nouvelle_capacite = max(taille, 2 * capacite)
+        self._prix = np.resize(self._prix, nouvelle_capacite)
+        self._quantites = np.resize(self._quantites, nouvelle_capacite)
+        for attribut in ATTRIBUTS_CATEGORIELS:
+            self._codes[attribut] = np.resize(self._codes[attribut], nouvelle_capacite)
+
+    # Code entier d'un libellé catégoriel (créé s'il est nouveau)
+    def _code(self, attribut, valeur):
+        index = self._index_categories[attribut]
+        if valeur not in index:
+            index[valeur] = len(self._categories[attribut])
+            self._categories[attribut].append(valeur)
+        return index[valeur]
 
     # Méthode pour ajouter un actif dans le portefeuille
     def ajouter_actif(self, actif):
-        self.actifs.append(actif)  # Ajoute l'actif passé en paramètre à la liste des actifs
+        i = self._taille
+        self._reserver(i + 1)
+        self._noms.append(actif.nom)
+        self._prix[i] = actif.prix
+        self._quantites[i] = actif.quantite
+        for attribut in ATTRIBUTS_CATEGORIELS:
+            self._codes[attribut][i] = self._code(attribut, getattr(actif, attribut))
+        self._taille += 1
+        self._maj_expositions(actif, actif.prix * actif.quantite, 1)
+        self.version += 1  # La composition en cache n'est plus à jour
+
+    # Méthode pour retirer un actif du portefeuille à partir de son nom (première position trouvée)
+    def retirer_actif(self, nom):
+        i = self._noms.index(nom)  # ValueError si l'actif n'est pas dans le portefeuille
+        actif = self._actif(i)
+
+        # Décaler les positions suivantes d'un cran
+        n = self._taille
+        del self._noms[i]
+        self._prix[i:n - 1] = self._prix[i + 1:n]
+        self._quantites[i:n - 1] = self._quantites[i + 1:n]
+        for attribut in ATTRIBUTS_CATEGORIELS:
+            self._codes[attribut][i:n - 1] = self._codes[attribut][i + 1:n]
+        self._taille -= 1
+
+        self._maj_expositions(actif, -actif.valeur_totale(), -1)
+        self.version += 1
+        return actif
+
+    # Ajoute (ou retire) la valeur d'une position aux expositions agrégées
+    def _maj_expositions(self, actif, valeur, nb):
+        for dimension, (attributs, _) in DIMENSIONS_EXPOSITION.items():
+            groupe = tuple(getattr(actif, attribut) for attribut in attributs)
+            groupe = groupe[0] if len(groupe) == 1 else groupe
+            totaux = self._expositions[dimension]
+            cumul = totaux.setdefault(groupe, [0.0, 0])
+            cumul[0] += valeur
+            cumul[1] += nb
+            if cumul[1] == 0:
+                del totaux[groupe]  # Plus aucune position dans ce groupe
+
+    # --- Valeur totale par groupe pour une dimension : "type", "secteur", "zone" ou "type_zone" ---
+    def expositions(self, dimension):
+        _, colonnes = DIMENSIONS_EXPOSITION[dimension]  # KeyError si la dimension est inconnue
+        totaux = self._expositions[dimension]
+        groupes = sorted(totaux)  # Même ordre qu'un groupby
+        if len(colonnes) == 1:
+            index = pd.Index(groupes, name=colonnes[0], dtype=object)
+        else:
+            index = pd.MultiIndex.from_tuples(groupes, names=list(colonnes))
+        return pd.Series([totaux[groupe][0] for groupe in groupes], index=index, name="Valeur Totale", dtype=float)
+
+    # Liste des actifs (objets Actif reconstruits à partir des colonnes)
+    @property
+    def actifs(self):
+        return [self._actif(i) for i in range(self._taille)]
+
+    # Reconstruit l'Actif à la position i
+    def _actif(self, i):
+        type_actif, secteur, zone_geo = (
+            self._categories[attribut][self._codes[attribut][i]] for attribut in ATTRIBUTS_CATEGORIELS
+        )
+        return Actif(self._noms[i], float(self._prix[i]), int(self._quantites[i]), type_actif, secteur, zone_geo)
+
+    # Valeur totale de chaque position (prix x quantité)
+    def valeurs(self):
+        n = self._taille
+        return self._prix[:n] * self._quantites[:n]
 
     # Méthode pour calculer la valeur totale du portefeuille
     def valeur_totale(self):
-        return sum(actif.valeur_totale() for actif in self.actifs)  # Somme de la valeur totale de chaque actif
+        return float(self.valeurs().sum())  # Somme de la valeur totale de chaque actif
+
+    # Libellés d'un attribut catégoriel pour toutes les positions
+    def _libelles(self, attribut):
+        categories = np.array(self._categories[attribut], dtype=object)
+        return categories[self._codes[attribut][:self._taille]]
 
     # Méthode pour récupérer la composition du portefeuille sous forme d'un DataFrame pandas
+    # Le DataFrame est mis en cache jusqu'à la prochaine modification : ne pas le modifier.
     def composition(self):
+        if self._composition is not None and self._composition[0] == self.version:
+            return self._composition[1]
+
+        n = self._taille
         data = {
-            "Nom": [actif.nom for actif in self.actifs],  # Liste des noms des actifs
-            "Type": [actif.type_actif for actif in self.actifs],  # Liste des types d'actifs
-            "Secteur": [actif.secteur for actif in self.actifs],  # Liste des secteurs
-            "Zone Géographique": [actif.zone_geo for actif in self.actifs],  # Liste des zones géographiques
-            "Prix": [actif.prix for actif in self.actifs],  # Liste des prix
-            "Quantité": [actif.quantite for actif in self.actifs],  # Liste des quantités
-            "Valeur Totale": [actif.valeur_totale() for actif in self.actifs],  # Liste des valeurs totales
+            "Nom": self._noms[:n],  # Liste des noms des actifs
+            "Type": self._libelles("type_actif"),  # Liste des types d'actifs
+            "Secteur": self._libelles("secteur"),  # Liste des secteurs
+            "Zone Géographique": self._libelles("zone_geo"),  # Liste des zones géographiques
+            "Prix": self._prix[:n].copy(),  # Liste des prix
+            "Quantité": self._quantites[:n].copy(),  # Liste des quantités
+            "Valeur Totale": self.valeurs(),  # Liste des valeurs totales
         }
-        return pd.DataFrame(data)  # Retourne un DataFrame structuré avec toutes ces informations
+        df = pd.DataFrame(data)  # DataFrame structuré avec toutes ces informations
+        self._composition = (self.version, df)
+        return df
@@ -1,7 +1,249 @@
+# Import de json pour lire les fichiers de prix locaux
+import json
+import time  # Délais entre les tentatives et échéances
+from datetime import date  # Date d'un instantané récupéré en direct
+from concurrent.futures import ThreadPoolExecutor, wait  # Récupération concurrente des prix
+
+# Import de pandas pour mettre en forme les historiques de prix
+import pandas as pd
+
 # Import de la librairie yfinance pour récupérer les données financières en direct
 import yfinance as yf
 
+from config import Config  # Pour choisir le fournisseur de prix configuré
+from instrumentation import mesurer, ajouter_compteurs  # Durée de la récupération des prix
+from repository.price_cache import CachePrix  # Cache persistant des derniers prix
+
+
+# --- Fournisseur de prix en direct via Yahoo Finance ---
+class FournisseurYFinance:
+    # Récupère le dernier prix de clôture d'un seul actif
+    def get_price(self, ticker):
+        data = yf.Ticker(ticker)  # Crée un objet Ticker pour accéder aux données du ticker passé en argument
+        return data.history(period="1d")["Close"].iloc[-1]  # Récupère le prix de clôture du dernier jour disponible
+
+    # Récupère les derniers prix de clôture de plusieurs actifs en une seule requête groupée
+    def get_prices(self, tickers):
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+
+        # Une seule requête pour tous les tickers (5 jours pour couvrir les places fermées aujourd'hui)
+        data = yf.download(tickers, period="5d", progress=False, auto_adjust=True, threads=True)
+        closes = data["Close"]
+        if not hasattr(closes, "columns"):  # Un seul ticker : yfinance peut renvoyer une Series
+            closes = closes.to_frame(name=tickers[0])
+        if closes.empty:
+            return {}
+
+        # Dernier cours connu pour chaque ticker (les bourses n'ont pas toutes les mêmes jours ouvrés)
+        derniers = closes.ffill().iloc[-1]
+        return {ticker: float(prix) for ticker, prix in derniers.items() if prix == prix}  # Ignore les NaN
+
+    # Récupère les clôtures journalières depuis `debut` (ou sur la période initiale si debut est None)
+    def get_history(self, tickers, debut=None):
+        tickers = list(tickers)
+        if not tickers:
+            return pd.DataFrame()
+        if debut is None:
+            data = yf.download(tickers, period=Config.HISTORIQUE_PERIODE_INITIALE, progress=False, auto_adjust=True)
+        else:
+            data = yf.download(tickers, start=debut, progress=False, auto_adjust=True)
+        if data.empty:
+            return pd.DataFrame()
+        closes = data["Close"]
+        if not hasattr(closes, "columns"):  # Un seul ticker : yfinance peut renvoyer une Series
+            closes = closes.to_frame(name=tickers[0])
+        if closes.index.tz is not None:
+            closes.index = closes.index.tz_localize(None)  # Dates sans fuseau horaire pour le stockage
+        return closes.dropna(how="all")
+
+
+# --- Fournisseur de prix hors ligne à partir d'un instantané en mémoire {ticker: prix} ---
+class FournisseurMemoire:
+    hors_ligne = True  # Aucun appel réseau : inutile de passer par le pool de threads
+
+    def __init__(self, prix):
+        self.prix = {ticker: float(valeur) for ticker, valeur in prix.items()}
+
+    # Récupère le prix d'un seul actif (KeyError si le ticker est absent de l'instantané)
+    def get_price(self, ticker):
+        return self.prix[ticker]
+
+    # Récupère les prix de plusieurs actifs (les tickers absents sont ignorés)
+    def get_prices(self, tickers):
+        return {ticker: self.prix[ticker] for ticker in tickers if ticker in self.prix}
+
+    # Pas d'historique dans un instantané de prix : DataFrame vide
+    def get_history(self, tickers, debut=None):
+        return pd.DataFrame()
+
+
+# --- Fournisseur de prix hors ligne lu depuis un fichier JSON {"AAPL": 190.5, ...} ---
+class FournisseurFichier(FournisseurMemoire):
+    def __init__(self, chemin):
+        self.chemin = chemin  # Chemin du fichier de prix
+        with open(chemin, encoding="utf-8") as f:
+            super().__init__(json.load(f))
+
+
+# Fournisseur et cache utilisés par l'application (créés à la première utilisation)
+_fournisseur = None
+_cache = None
+
+
+# --- Remplacer le fournisseur de prix (tests, exécution hors ligne) ---
+def definir_fournisseur(fournisseur):
+    global _fournisseur
+    _fournisseur = fournisseur
+
+
+# --- Retourner le fournisseur de prix actif, selon Config si aucun n'a été défini ---
+def fournisseur_actuel():
+    global _fournisseur
+    if _fournisseur is None:
+        if Config.FOURNISSEUR_PRIX == "fichier":
+            _fournisseur = FournisseurFichier(Config.FICHIER_PRIX)
+        else:
+            _fournisseur = FournisseurYFinance()
+    return _fournisseur
+
+
+# --- Retourner le cache de prix persistant (None si désactivé dans Config) ---
+def cache_actuel():
+    global _cache
+    if _cache is None and Config.CACHE_PRIX_ACTIF:
+        _cache = CachePrix(
+            Config.CACHE_PRIX_FICHIER,
+            ttl=Config.CACHE_PRIX_TTL,
+            max_entrees=Config.CACHE_PRIX_MAX_ENTREES,
+            stale_while_revalidate=Config.CACHE_PRIX_STALE_WHILE_REVALIDATE,
+        )
+    return _cache
+
+
+# --- Statistiques du cache de prix (hits, misses, taux de hit...) ---
+def statistiques_cache():
+    cache = cache_actuel()
+    return cache.statistiques() if cache is not None else {}
+
+
+# --- Date de l'instantané de prix utilisé par les constructions ---
+# Date rapportée par le cache ; aujourd'hui si les prix seront récupérés en direct ; None pour des prix
+# hors ligne (fichier, instantané), qui ne sont pas datés et ne changent pas.
+def date_instantane_prix():
+    if getattr(fournisseur_actuel(), "hors_ligne", False):
+        return None
+    cache = cache_actuel()
+    date_cache = cache.date_instantane() if cache is not None else None
+    return date_cache or date.today().isoformat()
+
+
 # Définition d'une fonction pour récupérer le dernier prix de clôture d'un actif
 def get_price(ticker):
-    data = yf.Ticker(ticker)  # Crée un objet Ticker pour accéder aux données du ticker passé en argument
-    return data.history(period="1d")["Close"].iloc[-1]  # Récupère le prix de clôture du dernier jour disponible
+    return fournisseur_actuel().get_price(ticker)
+
+
+# Définition d'une fonction pour récupérer les derniers prix de clôture de plusieurs actifs en un seul appel
+def get_prices(tickers):
+    cache = cache_actuel()
+    if cache is None:
+        return fournisseur_actuel().get_prices(tickers)
+    # Passer par le cache : seuls les tickers absents (ou périmés) interrogent le fournisseur
+    return cache.get_prices(tickers, lambda manquants: fournisseur_actuel().get_prices(manquants))
+
+
+# --- Résultat structuré d'une récupération de prix ---
+class ResultatPrix:
+    def __init__(self):
+        self.prix = {}  # Prix obtenus {ticker: prix}
+        self.echecs = {}  # Tickers en échec {ticker: raison}
+
+    # Indique si tous les prix demandés ont été obtenus
+    def complet(self):
+        return not self.echecs
+
+
+# Récupère le prix d'un ticker avec des tentatives espacées exponentiellement, sans dépasser l'échéance
+def _get_price_avec_tentatives(ticker, tentatives, backoff, echeance):
+    derniere_erreur = None
+    for tentative in range(tentatives):
+        try:
+            prix = float(fournisseur_actuel().get_price(ticker))
+            if prix != prix or prix <= 0:  # NaN ou prix aberrant
+                raise ValueError(f"prix invalide ({prix})")
+            return prix
+        except Exception as e:
+            derniere_erreur = e
+            attente = backoff * (2 ** tentative)
+            if tentative == tentatives - 1 or time.monotonic() + attente >= echeance:
+                break  # Plus de tentative possible avant l'échéance
+            time.sleep(attente)
+    raise RuntimeError(f"échec après {tentative + 1} tentative(s) : {derniere_erreur}")
+
+
+# Secondes restantes avant l'échéance (jamais négatif)
+def _temps_restant(echeance):
+    return max(0.0, echeance - time.monotonic())
+
+
+# --- Récupérer des prix en parallèle, avec tentatives, le tout borné par une seule échéance ---
+# `echeance` : instant (time.monotonic) à ne pas dépasser ; par défaut maintenant + timeout
+@mesurer("prix")
+def recuperer_prix(tickers, max_workers=None, timeout=None, tentatives=None, backoff=None, echeance=None):
+    max_workers = max_workers or Config.PRIX_MAX_WORKERS
+    timeout = Config.PRIX_TIMEOUT if timeout is None else timeout
+    echeance = time.monotonic() + timeout if echeance is None else echeance
+    tentatives = tentatives or Config.PRIX_TENTATIVES
+    backoff = Config.PRIX_BACKOFF if backoff is None else backoff
+
+    tickers = list(dict.fromkeys(tickers))  # Enlever les doublons en gardant l'ordre
+    resultat = ResultatPrix()
+    ajouter_compteurs(tickers=len(tickers))
+    if not tickers:
+        return resultat
+
+    # Fournisseur hors ligne (fichier, instantané) : lecture directe, sans threads ni timeout
+    fournisseur = fournisseur_actuel()
+    if getattr(fournisseur, "hors_ligne", False):
+        resultat.prix = fournisseur.get_prices(tickers)
+        resultat.echecs = {ticker: "absent des prix hors ligne" for ticker in tickers if ticker not in resultat.prix}
+        ajouter_compteurs(echecs=len(resultat.echecs))
+        return resultat
+
+    executeur = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # 1) Requête groupée (via le cache), bornée par l'échéance
+        groupe = executeur.submit(get_prices, tickers)
+        try:
+            resultat.prix.update(groupe.result(timeout=_temps_restant(echeance)))
+        except Exception:
+            pass  # Requête groupée en échec ou trop lente : on passe ticker par ticker
+
+        # 2) Tickers manquants : un appel par ticker en parallèle, avec tentatives, dans le temps restant
+        manquants = [ticker for ticker in tickers if ticker not in resultat.prix]
+        if manquants:
+            futures = {
+                executeur.submit(_get_price_avec_tentatives, ticker, tentatives, backoff, echeance): ticker
+                for ticker in manquants
+            }
+            termines, en_retard = wait(futures, timeout=_temps_restant(echeance))
+            for future in termines:
+                ticker = futures[future]
+                try:
+                    resultat.prix[ticker] = future.result()
+                except Exception as e:
+                    resultat.echecs[ticker] = str(e)
+            for future in en_retard:
+                resultat.echecs[futures[future]] = "échéance dépassée"
+
+            # Mémoriser les prix obtenus individuellement dans le cache
+            cache = cache_actuel()
+            if cache is not None:
+                cache.ecrire({ticker: resultat.prix[ticker] for ticker in manquants if ticker in resultat.prix})
+    finally:
+        # Ne pas attendre les requêtes bloquées : la latence reste bornée par l'échéance
+        executeur.shutdown(wait=False, cancel_futures=True)
+
+    ajouter_compteurs(echecs=len(resultat.echecs))
+    return resultat
@@ -0,0 +1,114 @@
+# --- Imports nécessaires ---
+import json  # Liste des tickers stockés
+import os  # Gestion des fichiers du stockage
+
+import numpy as np  # Stockage colonnaire et lecture mappée en mémoire
+import pandas as pd  # Mise en forme des historiques
+
+
+# --- Stockage local des clôtures journalières (fichiers binaires en ajout, lus en memmap) ---
+# dates.bin  : un int64 par jour (jours depuis 1970-01-01)
+# closes.bin : une ligne de float64 par jour, une colonne par ticker (ordre de tickers.json)
+class HistoriquePrix:
+    # Constructeur : prépare le dossier du stockage
+    def __init__(self, dossier):
+        self.dossier = dossier
+        os.makedirs(dossier, exist_ok=True)
+        self._chemin_tickers = os.path.join(dossier, "tickers.json")
+        self._chemin_dates = os.path.join(dossier, "dates.bin")
+        self._chemin_closes = os.path.join(dossier, "closes.bin")
+        self.tickers = []
+        if os.path.exists(self._chemin_tickers):
+            with open(self._chemin_tickers, encoding="utf-8") as f:
+                self.tickers = json.load(f)
+
+    # Nombre de jours stockés
+    def nb_jours(self):
+        if not os.path.exists(self._chemin_dates):
+            return 0
+        return os.path.getsize(self._chemin_dates) // 8
+
+    # Dates stockées (lecture mappée, sans copie)
+    def dates(self):
+        if self.nb_jours() == 0:
+            return np.array([], dtype="datetime64[D]")
+        return np.memmap(self._chemin_dates, dtype=np.int64, mode="r").view("datetime64[D]")
+
+    # Matrice des clôtures (jours x tickers), lue en memmap à partir de la ligne `debut`
+    def closes(self, debut=0):
+        nb_jours = self.nb_jours()
+        if nb_jours == 0 or not self.tickers:
+            return np.empty((0, len(self.tickers)))
+        matrice = np.memmap(self._chemin_closes, dtype=np.float64, mode="r", shape=(nb_jours, len(self.tickers)))
+        return matrice[debut:]
+
+    # Dernière date stockée (None si le stockage est vide)
+    def derniere_date(self):
+        dates = self.dates()
+        return pd.Timestamp(dates[-1]) if len(dates) else None
+
+    # Historique sous forme de DataFrame (index = dates, colonnes = tickers)
+    def en_dataframe(self, tickers=None):
+        df = pd.DataFrame(np.asarray(self.closes()), index=pd.DatetimeIndex(self.dates()), columns=self.tickers)
+        return df if tickers is None else df.reindex(columns=tickers)
+
+    # --- Ajouter de nouvelles clôtures (DataFrame index = dates, colonnes = tickers) ---
+    def ajouter(self, nouvelles):
+        if nouvelles is None or nouvelles.empty:
+            return 0
+
+        # Nouveaux tickers : réécriture unique de la matrice avec des colonnes vides
+        nouveaux_tickers = [t for t in nouvelles.columns if t not in self.tickers]
+        if nouveaux_tickers:
+            self._ajouter_colonnes(nouveaux_tickers)
+
+        # Garder uniquement les jours postérieurs au dernier jour stocké
+        nouvelles = nouvelles.reindex(columns=self.tickers).sort_index()
+        derniere = self.derniere_date()
+        if derniere is not None:
+            nouvelles = nouvelles[nouvelles.index.normalize() > derniere]
+        if nouvelles.empty:
+            return 0
+
+        # Prolonger les derniers cours connus (jours fériés propres à une place)
+        if derniere is not None:
+            dernier_cours = pd.DataFrame(
+                [np.asarray(self.closes(self.nb_jours() - 1)[0])], index=[derniere], columns=self.tickers
+            )
+            nouvelles = pd.concat([dernier_cours, nouvelles]).ffill().iloc[1:]
+        else:
+            nouvelles = nouvelles.ffill()
+
+        # Ajout en fin de fichier : seul le nouveau bloc est écrit
+        jours = nouvelles.index.normalize().values.astype("datetime64[D]").astype(np.int64)
+        with open(self._chemin_dates, "ab") as f:
+            f.write(jours.tobytes())
+        with open(self._chemin_closes, "ab") as f:
+            f.write(nouvelles.to_numpy(dtype=np.float64).tobytes())
+        return len(nouvelles)
+
+    # Réécrit la matrice avec des colonnes supplémentaires (remplies avec leur historique s'il est fourni)
+    def _ajouter_colonnes(self, nouveaux_tickers, historique=None):
+        anciennes = np.array(self.closes())
+        complement = np.full((anciennes.shape[0], len(nouveaux_tickers)), np.nan)
+        if historique is not None and not historique.empty and len(anciennes):
+            historique = historique.reindex(columns=nouveaux_tickers).sort_index()
+            historique.index = historique.index.normalize()
+            jours = pd.DatetimeIndex(self.dates())
+            complement = historique.reindex(jours, method="ffill").to_numpy(dtype=np.float64)
+        self.tickers = self.tickers + list(nouveaux_tickers)
+        with open(self._chemin_closes, "wb") as f:
+            f.write(np.hstack([anciennes, complement]).tobytes())
+        with open(self._chemin_tickers, "w", encoding="utf-8") as f:
+            json.dump(self.tickers, f)
+
+    # --- Mettre à jour le stockage avec les jours manquants depuis le fournisseur ---
+    def mettre_a_jour(self, tickers, fournisseur):
+        # Tickers jamais stockés : récupérer tout leur historique pour remplir leurs colonnes
+        nouveaux_tickers = [t for t in tickers if t not in self.tickers]
+        if nouveaux_tickers and self.nb_jours():
+            self._ajouter_colonnes(nouveaux_tickers, fournisseur.get_history(nouveaux_tickers, None))
+
+        derniere = self.derniere_date()
+        debut = None if derniere is None else derniere + pd.Timedelta(days=1)
+        return self.ajouter(fournisseur.get_history(list(tickers), debut))
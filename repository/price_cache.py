@@ -0,0 +1,173 @@
+# --- Imports nécessaires ---
+import sqlite3  # Stockage persistant des prix sur disque
+import threading  # Verrou d'accès à la base et rafraîchissement en arrière-plan
+import time  # Horodatage des entrées (TTL et LRU)
+from datetime import date  # Date de clôture associée à chaque prix
+
+from logger import setup_logger  # Logs de l'application
+
+logger = setup_logger()
+
+
+# --- Cache persistant des derniers prix de clôture (SQLite, clé = ticker + date) ---
+class CachePrix:
+    # Constructeur : ouvre (ou crée) la base SQLite du cache
+    def __init__(self, chemin, ttl, max_entrees, stale_while_revalidate=True):
+        self.chemin = chemin  # Chemin du fichier SQLite
+        self.ttl = ttl  # Durée de validité d'un prix en secondes
+        self.max_entrees = max_entrees  # Nombre maximal de lignes conservées (éviction LRU au-delà)
+        self.stale_while_revalidate = stale_while_revalidate  # Servir un prix périmé et le rafraîchir en fond
+
+        # Compteurs pour vérifier l'efficacité du cache (modifiés sous self._verrou)
+        self.hits = 0  # Prix servis depuis le cache et encore valides
+        self.hits_perimes = 0  # Prix périmés servis immédiatement (rafraîchis en arrière-plan)
+        self.misses = 0  # Prix absents du cache, récupérés auprès du fournisseur
+        self.rafraichissements = 0  # Rafraîchissements en arrière-plan lancés
+
+        self._verrou = threading.Lock()  # Une seule opération SQLite à la fois
+        self._en_rafraichissement = set()  # Tickers dont le rafraîchissement est déjà en cours
+
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False)
+        with self._verrou:
+            self._connexion.execute(
+                "CREATE TABLE IF NOT EXISTS prix ("
+                "ticker TEXT NOT NULL, date TEXT NOT NULL, prix REAL NOT NULL, "
+                "maj REAL NOT NULL, acces REAL NOT NULL, PRIMARY KEY (ticker, date))"
+            )
+            self._connexion.execute("CREATE INDEX IF NOT EXISTS idx_prix_acces ON prix (acces)")
+            self._connexion.commit()
+
+    # Lire le prix le plus récent de chaque ticker : {ticker: (prix, horodatage de mise à jour)}
+    def lire(self, tickers):
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+        marqueurs = ",".join("?" * len(tickers))
+        maintenant = time.time()
+        with self._verrou:
+            lignes = self._connexion.execute(
+                f"SELECT ticker, prix, maj, date FROM prix WHERE ticker IN ({marqueurs}) ORDER BY date",
+                tickers,
+            ).fetchall()
+            # Marquer les entrées lues comme récemment utilisées (LRU)
+            self._connexion.execute(f"UPDATE prix SET acces = ? WHERE ticker IN ({marqueurs})", [maintenant] + tickers)
+            self._connexion.commit()
+        # Trié par date : la dernière ligne de chaque ticker est la plus récente
+        return {ticker: (prix, maj) for ticker, prix, maj, _ in lignes}
+
+    # Enregistrer des prix {ticker: prix} pour la date du jour
+    def ecrire(self, prix_par_ticker):
+        if not prix_par_ticker:
+            return
+        maintenant = time.time()
+        jour = date.today().isoformat()
+        with self._verrou:
+            self._connexion.executemany(
+                "INSERT OR REPLACE INTO prix (ticker, date, prix, maj, acces) VALUES (?, ?, ?, ?, ?)",
+                [(ticker, jour, float(prix), maintenant, maintenant) for ticker, prix in prix_par_ticker.items()],
+            )
+            self._evincer()
+            self._connexion.commit()
+
+    # Supprimer les entrées les moins récemment utilisées au-delà de max_entrees (verrou déjà pris)
+    def _evincer(self):
+        nb = self._connexion.execute("SELECT COUNT(*) FROM prix").fetchone()[0]
+        if nb > self.max_entrees:
+            self._connexion.execute(
+                "DELETE FROM prix WHERE rowid IN (SELECT rowid FROM prix ORDER BY acces LIMIT ?)",
+                (nb - self.max_entrees,),
+            )
+
+    # Récupérer des prix en passant par le cache ; `charger` interroge le fournisseur pour les tickers manquants
+    def get_prices(self, tickers, charger):
+        tickers = list(dict.fromkeys(tickers))  # Enlever les doublons en gardant l'ordre
+        entrees = self.lire(tickers)
+        maintenant = time.time()
+
+        resultat = {}
+        perimes = []  # Tickers servis depuis le cache mais à rafraîchir
+        manquants = []  # Tickers à récupérer immédiatement
+        hits = 0  # Prix valides servis depuis le cache
+        for ticker in tickers:
+            if ticker in entrees:
+                prix, maj = entrees[ticker]
+                if maintenant - maj <= self.ttl:
+                    resultat[ticker] = prix
+                    hits += 1
+                    continue
+                if self.stale_while_revalidate:
+                    resultat[ticker] = prix
+                    perimes.append(ticker)
+                    continue
+            manquants.append(ticker)
+
+        # Compteurs partagés avec les autres sessions et le thread de rafraîchissement
+        with self._verrou:
+            self.hits += hits
+            self.hits_perimes += len(perimes)
+            self.misses += len(manquants)
+
+        # Prix absents ou périmés sans stale-while-revalidate : appel synchrone au fournisseur
+        if manquants:
+            nouveaux = charger(manquants)
+            self.ecrire(nouveaux)
+            resultat.update(nouveaux)
+
+        # Prix périmés : rafraîchissement en arrière-plan
+        if perimes:
+            self._rafraichir_en_fond(perimes, charger)
+
+        return resultat
+
+    # Lancer un thread qui recharge les prix périmés sans bloquer l'appelant
+    def _rafraichir_en_fond(self, tickers, charger):
+        with self._verrou:
+            a_rafraichir = [ticker for ticker in tickers if ticker not in self._en_rafraichissement]
+            self._en_rafraichissement.update(a_rafraichir)
+            if a_rafraichir:
+                self.rafraichissements += 1
+        if not a_rafraichir:
+            return
+
+        def rafraichir():
+            try:
+                self.ecrire(charger(a_rafraichir))
+            except Exception as e:
+                logger.warning(f"Erreur de rafraîchissement du cache pour {a_rafraichir} : {e}")
+            finally:
+                with self._verrou:
+                    self._en_rafraichissement.difference_update(a_rafraichir)
+
+        threading.Thread(target=rafraichir, daemon=True).start()
+
+    # Date de l'instantané servi : date d'enregistrement la plus récente parmi les prix que le cache servirait
+    # (prix valides, ou aussi périmés avec stale-while-revalidate) ; None si le cache n'a rien à servir
+    def date_instantane(self):
+        requete, parametres = "SELECT MAX(date) FROM prix", ()
+        if not self.stale_while_revalidate:
+            requete, parametres = requete + " WHERE maj >= ?", (time.time() - self.ttl,)
+        with self._verrou:
+            return self._connexion.execute(requete, parametres).fetchone()[0]
+
+    # Statistiques d'utilisation du cache
+    def statistiques(self):
+        with self._verrou:
+            nb_entrees = self._connexion.execute("SELECT COUNT(*) FROM prix").fetchone()[0]
+            hits, hits_perimes, misses = self.hits, self.hits_perimes, self.misses
+            rafraichissements = self.rafraichissements
+        demandes = hits + hits_perimes + misses
+        return {
+            "hits": hits,
+            "hits_perimes": hits_perimes,
+            "misses": misses,
+            "rafraichissements": rafraichissements,
+            "taux_hit": (hits + hits_perimes) / demandes if demandes else 0.0,
+            "entrees": nb_entrees,
+        }
+
+    # Vider complètement le cache et remettre les compteurs à zéro
+    def vider(self):
+        with self._verrou:
+            self._connexion.execute("DELETE FROM prix")
+            self._connexion.commit()
+            self.hits = self.hits_perimes = self.misses = self.rafraichissements = 0
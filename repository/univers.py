@@ -0,0 +1,114 @@
+# --- Imports nécessaires ---
+import os  # Chemin du fichier d'univers par défaut
+from functools import lru_cache  # Un seul chargement par fichier
+
+import numpy as np  # Codes catégoriels et index de positions
+import pandas as pd  # Lecture CSV / Parquet
+
+from config import Config  # Fichier d'univers choisi
+
+# Univers fourni avec le projet (une ligne par instrument : ticker, type, secteur, zone)
+FICHIER_UNIVERS_DEFAUT = os.path.join(os.path.dirname(__file__), "univers.csv")
+
+# Dimensions décrivant un instrument, dans l'ordre des tuples (type, secteur, zone)
+DIMENSIONS_UNIVERS = ("type", "secteur", "zone")
+
+
+# --- Univers des instruments : table encodée en catégories avec un index par dimension ---
+class Univers:
+    # Constructeur : encode chaque dimension et construit les index valeur -> positions
+    def __init__(self, table):
+        self.tickers = table["ticker"].to_numpy(dtype=object)
+        self._positions = {ticker: i for i, ticker in enumerate(self.tickers)}  # Ticker -> ligne
+
+        self.categories = {}  # Dimension -> valeurs distinctes (tuple : l'univers est partagé, jamais modifié)
+        self.codes = {}  # Dimension -> code int32 de chaque ligne
+        self._numeros = {}  # Dimension -> {valeur: code}
+        self._index = {}  # Dimension -> {valeur: positions triées des lignes}
+        for dimension in DIMENSIONS_UNIVERS:
+            codes, categories = pd.factorize(table[dimension], use_na_sentinel=False)
+            self.categories[dimension] = tuple(categories)
+            self.codes[dimension] = codes.astype(np.int32)
+            self._numeros[dimension] = {valeur: c for c, valeur in enumerate(categories)}
+            ordre = np.argsort(codes, kind="stable")
+            bornes = np.searchsorted(codes[ordre], np.arange(len(categories) + 1))
+            self._index[dimension] = {
+                valeur: ordre[bornes[c]:bornes[c + 1]] for c, valeur in enumerate(categories)
+            }
+
+        self._filtres = {}  # Résultats de filtrer() déjà calculés
+
+    # Nombre d'instruments
+    def __len__(self):
+        return len(self.tickers)
+
+    # Le ticker fait-il partie de l'univers ?
+    def __contains__(self, ticker):
+        return ticker in self._positions
+
+    # Valeurs distinctes d'une dimension (ex. les types d'actifs disponibles), en tuple non modifiable
+    def valeurs(self, dimension):
+        return self.categories[dimension]
+
+    # (type, secteur, zone) d'un ticker, ou `defaut` s'il est inconnu
+    def info(self, ticker, defaut=None):
+        i = self._positions.get(ticker)
+        if i is None:
+            return defaut
+        return tuple(self.categories[d][self.codes[d][i]] for d in DIMENSIONS_UNIVERS)
+
+    # Valeur d'une dimension pour une liste de tickers (`defaut` pour les tickers inconnus)
+    def colonne(self, dimension, tickers, defaut="Inconnu"):
+        categories = self.categories[dimension]
+        codes = self.codes[dimension]
+        return [
+            categories[codes[i]] if i is not None else defaut
+            for i in (self._positions.get(ticker) for ticker in tickers)
+        ]
+
+    # --- Tickers vérifiant tous les critères donnés (ex. filtrer(type="ETF", zone="Asie")) ---
+    # Part de l'index le plus sélectif puis compare les codes des autres dimensions ; résultat mémorisé.
+    def filtrer(self, **criteres):
+        cle = tuple(sorted(criteres.items()))
+        if cle in self._filtres:
+            return self._filtres[cle]
+
+        # Critères triés du plus sélectif au moins sélectif
+        selectifs = []
+        for dimension, valeur in criteres.items():
+            positions = self._index[dimension].get(valeur)
+            if positions is None:
+                selectifs = None  # Valeur absente de l'univers : aucun résultat
+                break
+            selectifs.append((len(positions), dimension, valeur))
+
+        if selectifs is None:
+            positions = np.array([], dtype=np.int64)
+        elif not selectifs:
+            positions = np.arange(len(self.tickers))
+        else:
+            selectifs.sort(key=lambda critere: critere[0])
+            _, dimension, valeur = selectifs[0]
+            positions = self._index[dimension][valeur]
+            for _, dimension, valeur in selectifs[1:]:
+                positions = positions[self.codes[dimension][positions] == self._numeros[dimension][valeur]]
+
+        resultat = tuple(self.tickers[positions].tolist())
+        self._filtres[cle] = resultat
+        return resultat
+
+
+# --- Lire un fichier d'univers (CSV, ou Parquet si pyarrow est installé), mis en cache par chemin ---
+@lru_cache(maxsize=None)
+def _lire_univers(chemin):
+    colonnes = ["ticker", *DIMENSIONS_UNIVERS]
+    if chemin.endswith(".parquet"):
+        table = pd.read_parquet(chemin, columns=colonnes)  # Dépendance optionnelle (pyarrow)
+    else:
+        table = pd.read_csv(chemin, usecols=colonnes, dtype=str, keep_default_na=False, encoding="utf-8")
+    return Univers(table.drop_duplicates("ticker").reset_index(drop=True))
+
+
+# --- Retourner l'univers configuré (chargé au premier appel, puis partagé) ---
+def univers_actuel(chemin=None):
+    return _lire_univers(chemin or Config.FICHIER_UNIVERS or FICHIER_UNIVERS_DEFAUT)
@@ -1,65 +1,167 @@
+# Import de copy, json et os pour charger le registre des scénarios de stress (copié à chaque lecture)
+import copy
+import json
+import os
+from functools import lru_cache
+
 # Import de pandas pour manipuler des tableaux de données
 import pandas as pd
 
 # Import de numpy pour faire des calculs mathématiques et générer des variations aléatoires
 import numpy as np
 
-# Définition de la fonction principale qui simule les stress tests
-def stress_test_portefeuille(portefeuille):
-    # Récupère la composition actuelle du portefeuille sous forme de DataFrame
+from config import Config  # Horizon, nombre de tirages et registre des scénarios
+from instrumentation import mesurer, ajouter_compteurs  # Durée des stress tests
+from helpers.aleatoire import creer_generateur  # Générateur par défaut (graine de Config)
+
+# Registre des scénarios et sensibilités fournis avec le projet
+FICHIER_SCENARIOS_DEFAUT = os.path.join(os.path.dirname(__file__), "scenarios.json")
+FICHIER_SENSIBILITES_DEFAUT = os.path.join(os.path.dirname(__file__), "sensibilites.json")
+
+# Dimensions sur lesquelles un scénario peut définir des chocs spécifiques (du moins au plus prioritaire)
+DIMENSIONS_CHOC = {"type": "Type", "secteur": "Secteur", "zone": "Zone Géographique"}
+
+
+# --- Charger le registre des scénarios (JSON, ou YAML si PyYAML est installé) ---
+def charger_scenarios(chemin=None):
+    return _lire_registre(chemin or Config.FICHIER_SCENARIOS_STRESS or FICHIER_SCENARIOS_DEFAUT)
+
+
+# --- Charger les sensibilités (bêtas) par type / secteur / zone ---
+def charger_sensibilites(chemin=None):
+    return _lire_registre(chemin or Config.FICHIER_SENSIBILITES_STRESS or FICHIER_SENSIBILITES_DEFAUT)
+
+
+# Registre lu depuis le cache, copié : l'appelant peut le modifier sans altérer les lectures suivantes
+def _lire_registre(chemin):
+    return copy.deepcopy(_lire_fichier_registre(chemin))
+
+
+# Lecture du fichier de registre, mise en cache par chemin
+@lru_cache(maxsize=None)
+def _lire_fichier_registre(chemin):
+    with open(chemin, encoding="utf-8") as f:
+        if chemin.endswith((".yaml", ".yml")):
+            import yaml  # Dépendance optionnelle, seulement pour les registres YAML
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+# Convertit une liste de phases {"mois": [début, fin], "choc": [min, max]} en bornes mensuelles
+def _bornes_mensuelles(phases, nb_mois, bas, haut):
+    for phase in phases:
+        debut, fin = phase["mois"]
+        debut, fin = max(debut, 1), min(fin, nb_mois)
+        bas[debut - 1:fin], haut[debut - 1:fin] = phase["choc"]
+
+
+# --- Compiler les scénarios en tableaux de bornes (scénarios, mois, groupes de positions) ---
+def compiler_scenarios(scenarios, groupes, nb_mois):
+    bas = np.ones((len(scenarios), nb_mois, len(groupes)))  # Facteur 1 = pas de choc par défaut
+    haut = np.ones_like(bas)
+    specifique = np.zeros((len(scenarios), len(groupes)), dtype=bool)  # Groupes ayant leur propre calendrier
+
+    for s, definition in enumerate(scenarios.values()):
+        # Choc de marché appliqué à toutes les positions
+        bas_marche, haut_marche = np.ones(nb_mois), np.ones(nb_mois)
+        _bornes_mensuelles(definition.get("phases", []), nb_mois, bas_marche, haut_marche)
+        bas[s] = bas_marche[:, None]
+        haut[s] = haut_marche[:, None]
+
+        # Chocs spécifiques par type / secteur / zone : le plus spécifique l'emporte
+        specifiques = definition.get("chocs_specifiques", {})
+        for position_dim, dimension in enumerate(DIMENSIONS_CHOC):
+            for valeur, phases in specifiques.get(dimension, {}).items():
+                colonnes = [g for g, groupe in enumerate(groupes) if groupe[position_dim] == valeur]
+                if not colonnes:
+                    continue
+                bas_specifique, haut_specifique = bas_marche.copy(), haut_marche.copy()
+                _bornes_mensuelles(phases, nb_mois, bas_specifique, haut_specifique)
+                bas[s][:, colonnes] = bas_specifique[:, None]
+                haut[s][:, colonnes] = haut_specifique[:, None]
+                specifique[s, colonnes] = True
+
+    return bas, haut, specifique
+
+
+# --- Bêta de chaque groupe de positions pour chaque scénario (produit des bêtas type x secteur x zone) ---
+def calculer_betas(scenarios, groupes, sensibilites):
+    betas = np.ones((len(scenarios), len(groupes)))
+    for s, definition in enumerate(scenarios.values()):
+        # Les sensibilités propres au scénario remplacent celles par défaut
+        surcharges = definition.get("sensibilites", {})
+        sens = {dim: {**sensibilites.get(dim, {}), **surcharges.get(dim, {})} for dim in DIMENSIONS_CHOC}
+        for g, groupe in enumerate(groupes):
+            for position_dim, dimension in enumerate(DIMENSIONS_CHOC):
+                betas[s, g] *= sens[dimension].get(groupe[position_dim], 1.0)
+    return betas
+
+
+# --- Simuler les facteurs cumulés (tirages, scénarios, mois, groupes) en un seul calcul NumPy ---
+def simuler_stress(bas, haut, nb_tirages, rng=None, betas=None):
+    rng = rng or creer_generateur()  # Graine de Config si aucun générateur n'est fourni
+    nb_scenarios, nb_mois, _ = bas.shape
+
+    # Un tirage de marché commun à toutes les positions pour chaque (tirage, scénario, mois)
+    tirages = rng.random((nb_tirages, nb_scenarios, nb_mois, 1))
+    facteurs = bas + tirages * (haut - bas)  # Forme (tirages, scénarios, mois, groupes)
+
+    # Propagation du choc selon le bêta de chaque groupe : rendement = bêta x rendement du scénario
+    if betas is not None:
+        facteurs -= 1
+        facteurs *= betas[None, :, None, :]
+        facteurs += 1
+        np.maximum(facteurs, 0, out=facteurs)  # Une position ne peut pas perdre plus que sa valeur
+
+    np.cumprod(facteurs, axis=2, out=facteurs)
+    return facteurs
+
+
+# --- Résultat détaillé d'un stress test ---
+class ResultatStress:
+    def __init__(self, trajectoires, attribution):
+        self.trajectoires = trajectoires  # Valeur médiane du portefeuille par mois et par scénario
+        self.attribution = attribution  # Perte attendue à l'horizon par position et par scénario ($)
+
+
+# --- Stress test avec propagation par position et attribution des pertes ---
+@mesurer("stress")
+def stress_test_detaille(portefeuille, nb_tirages=None, rng=None, scenarios=None, sensibilites=None):
+    nb_tirages = nb_tirages or Config.NB_TIRAGES_STRESS
+    nb_mois = Config.HORIZON_STRESS_MOIS
+    scenarios = scenarios or charger_scenarios()
+    sensibilites = charger_sensibilites() if sensibilites is None else sensibilites
+    ajouter_compteurs(tirages=nb_tirages, scenarios=len(scenarios), positions=len(portefeuille))
+
+    # Regroupe les positions par (type, secteur, zone) : chocs et bêtas ne dépendent que de ces attributs
     df = portefeuille.composition()
+    colonnes_groupes = list(DIMENSIONS_CHOC.values())
+    valeurs_groupes = df.groupby(colonnes_groupes)["Valeur Totale"].sum()
+    groupes = list(valeurs_groupes.index)
+    groupe_par_position = df.groupby(colonnes_groupes).ngroup().to_numpy()  # Même ordre que valeurs_groupes
+
+    # Chocs et bêtas par (scénario, groupe) ; les groupes à calendrier spécifique gardent un bêta de 1
+    bas, haut, specifique = compiler_scenarios(scenarios, groupes, nb_mois)
+    betas = np.where(specifique, 1.0, calculer_betas(scenarios, groupes, sensibilites))
+
+    # Simule tous les scénarios x mois x tirages x groupes d'un coup
+    facteurs = simuler_stress(bas, haut, nb_tirages, rng, betas)
+
+    # Trajectoire agrégée : produit matriciel des facteurs par les valeurs des groupes, puis médiane des tirages
+    chemins = facteurs @ valeurs_groupes.to_numpy(dtype=float)  # Forme (tirages, scénarios, mois)
+    mois = np.arange(1, nb_mois + 1)
+    trajectoires = pd.DataFrame(np.median(chemins, axis=0).T, index=mois, columns=list(scenarios))
+    trajectoires.index.name = "Mois"
 
-    # Calcule la valeur totale initiale du portefeuille
-    valeur_initiale = df["Valeur Totale"].sum()
-
-    # Crée un tableau représentant les 12 prochains mois
-    mois = np.arange(1, 13)  # De 1 à 12
-
-    # Initialise un dictionnaire pour stocker l'évolution sous chaque scénario de stress
-    stress_scenarios = {
-        "COVID-19": [],  # Scénario d'une crise type COVID
-        "Crise 2008": [],  # Scénario d'une crise financière longue
-        "Inflation forte": [],  # Scénario de forte inflation
-        "Croissance économique": [],  # Scénario de forte croissance
-    }
-
-    # Initialise les valeurs de départ pour chaque scénario à la valeur initiale du portefeuille
-    covid, crise2008, inflation, croissance = valeur_initiale, valeur_initiale, valeur_initiale, valeur_initiale
-
-    # Boucle sur chaque mois
-    for mois_actuel in mois:
-        # --- COVID-19 : Scénario de chute brutale sur 2 mois puis reprise lente ---
-        if mois_actuel <= 2:
-            covid *= np.random.uniform(0.80, 0.85)  # Perte de -15% à -20%
-        else:
-            covid *= np.random.uniform(1.005, 1.01)  # Croissance lente entre +0.5% et +1%
-
-        # --- Crise 2008 : Scénario de longue chute sur 6 mois puis stabilisation ---
-        if mois_actuel <= 6:
-            crise2008 *= np.random.uniform(0.95, 0.98)  # Perte de -2% à -5% par mois
-        else:
-            crise2008 *= np.random.uniform(0.99, 1.005)  # Stagnation légère ensuite
-
-        # --- Inflation forte : Scénario de baisse lente constante ---
-        inflation *= np.random.uniform(0.995, 0.998)  # Perte de -0.2% à -0.5% par mois
-
-        # --- Croissance économique : Forte croissance initiale puis normalisation ---
-        if mois_actuel <= 3:
-            croissance *= np.random.uniform(1.01, 1.02)  # Gain de +1% à +2% sur 3 mois
-        else:
-            croissance *= np.random.uniform(1.002, 1.005)  # Croissance plus lente ensuite
-
-        # Stocke les nouvelles valeurs pour ce mois
-        stress_scenarios["COVID-19"].append(covid)
-        stress_scenarios["Crise 2008"].append(crise2008)
-        stress_scenarios["Inflation forte"].append(inflation)
-        stress_scenarios["Croissance économique"].append(croissance)
-
-    # Convertit le dictionnaire en DataFrame pour avoir un tableau final
-    df_stress = pd.DataFrame(stress_scenarios, index=mois)
-
-    # Nommer l'index "Mois" pour plus de clarté
-    df_stress.index.name = "Mois"
-
-    # Retourne le DataFrame des stress tests
-    return df_stress
+    # Attribution : perte attendue de chaque position = valeur x (1 - facteur cumulé moyen de son groupe)
+    facteurs_finaux = facteurs[:, :, -1, :].mean(axis=0)  # Forme (scénarios, groupes)
+    pertes = df["Valeur Totale"].to_numpy(dtype=float)[:, None] * (1 - facteurs_finaux.T[groupe_par_position])
+    attribution = pd.DataFrame(pertes, index=df["Nom"], columns=list(scenarios))
+
+    return ResultatStress(trajectoires, attribution)
+
+
+# Définition de la fonction principale qui simule les stress tests
+def stress_test_portefeuille(portefeuille, nb_tirages=None, rng=None, scenarios=None):
+    # Retourne le DataFrame des stress tests (trajectoire médiane de chaque scénario)
+    return stress_test_detaille(portefeuille, nb_tirages, rng, scenarios).trajectoires
@@ -0,0 +1,44 @@
+# --- Tests de non-régression des allocateurs (prix hors ligne) ---
+# Lancement depuis la racine du projet : python -m pytest tests
+import numpy as np
+import pytest
+
+from benchmarks.fixtures import configurer_hors_ligne  # Prix figés, sans cache disque ni journal
+from helpers.aleatoire import creer_generateur
+from helpers.allocation import ALLOCATEURS, AllocateurOptimise, allocateur_configure, moyenne_variance
+from helpers.finance_utils import construire_portefeuille, quotas_geo
+from models.investor_preferences import InvestorPreferences
+
+# Seul type choisi sans poids dans l'allocation cible (Actions à 3 ans, tolérance faible)
+PROFIL_TYPE_SANS_POIDS = InvestorPreferences("Acheter une maison", 3, "Faible", ["Actions"])
+
+
+@pytest.fixture(autouse=True)
+def hors_ligne():
+    configurer_hors_ligne()
+
+
+@pytest.mark.parametrize("nom", ALLOCATEURS)
+def test_type_choisi_sans_poids(nom):
+    portefeuille = construire_portefeuille(
+        PROFIL_TYPE_SANS_POIDS, 25000, rng=creer_generateur(1), allocateur=allocateur_configure(nom)
+    )
+    assert len(portefeuille) > 0
+    assert 0 < portefeuille.valeur_totale() <= 25000
+    assert set(portefeuille.expositions("type").index) == {"Actions"}
+
+
+@pytest.mark.parametrize("nom", [nom for nom, classe in ALLOCATEURS.items() if issubclass(classe, AllocateurOptimise)])
+def test_allocateur_optimise_sans_budget(nom):
+    allocateur = allocateur_configure(nom)
+    geo_target = quotas_geo("Acheter une maison")
+    selections = allocateur.selectionner({"Actions": 0.0}, geo_target, ["Actions"], creer_generateur(1))
+    assert selections == []
+    assert allocateur.ponderer(selections, geo_target, "Faible") == {}
+    assert allocateur.ponderer([("Actions", 0.0, ["AAPL", "MSFT"])], geo_target, "Faible") == {}
+
+
+def test_moyenne_variance_covariance_nulle():
+    poids = moyenne_variance(np.array([0.05, 0.08]), np.zeros((2, 2)), np.array([0, 0]), np.array([1.0]), 4.0)
+    assert np.all(np.isfinite(poids))
+    assert poids.sum() == pytest.approx(1.0)